@@ -10,13 +10,70 @@ CREATE TABLE IF NOT EXISTS memories (
   concepts TEXT NOT NULL DEFAULT '[]',
   files_read TEXT NOT NULL DEFAULT '[]',
   files_modified TEXT NOT NULL DEFAULT '[]',
-  metadata_json TEXT NOT NULL DEFAULT ''
+  metadata_json TEXT NOT NULL DEFAULT '',
+  search_tsv TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', summary), 'A')
+    || setweight(to_tsvector('simple', details), 'B')
+    || setweight(to_tsvector('simple', tags || ' ' || concepts), 'C')
+  ) STORED
 );
 
-CREATE INDEX IF NOT EXISTS memories_project_idx ON memories(project);
+-- Searches filter by project (and often type) and return the newest rows first.
+CREATE INDEX IF NOT EXISTS memories_project_epoch_id_idx ON memories(project, created_at_epoch DESC, id DESC);
+CREATE INDEX IF NOT EXISTS memories_project_type_epoch_id_idx ON memories(project, type, created_at_epoch DESC, id DESC);
 CREATE INDEX IF NOT EXISTS memories_created_at_idx ON memories(created_at);
 CREATE INDEX IF NOT EXISTS memories_created_at_epoch_idx ON memories(created_at_epoch);
 CREATE INDEX IF NOT EXISTS memories_type_idx ON memories(type);
+-- The search_tsv GIN index is created by memory_init.py after the column migration:
+-- on an upgraded database the column does not exist yet when this file runs.
+
+-- One row per (memory, concept/file/tag): filters and facet counts become index lookups.
+CREATE TABLE IF NOT EXISTS memory_concepts (
+  memory_id INTEGER NOT NULL REFERENCES memories(id) ON DELETE CASCADE,
+  project TEXT NOT NULL,
+  concept TEXT NOT NULL,
+  PRIMARY KEY (memory_id, concept)
+);
+
+CREATE TABLE IF NOT EXISTS memory_files (
+  memory_id INTEGER NOT NULL REFERENCES memories(id) ON DELETE CASCADE,
+  project TEXT NOT NULL,
+  path TEXT NOT NULL,
+  access TEXT NOT NULL,
+  PRIMARY KEY (memory_id, path, access)
+);
+
+CREATE TABLE IF NOT EXISTS memory_tags (
+  memory_id INTEGER NOT NULL REFERENCES memories(id) ON DELETE CASCADE,
+  project TEXT NOT NULL,
+  tag TEXT NOT NULL,
+  PRIMARY KEY (memory_id, tag)
+);
+
+CREATE INDEX IF NOT EXISTS memory_concepts_project_concept_idx ON memory_concepts(project, concept, memory_id);
+CREATE INDEX IF NOT EXISTS memory_files_project_path_idx ON memory_files(project, path, memory_id);
+CREATE INDEX IF NOT EXISTS memory_tags_project_tag_idx ON memory_tags(project, tag, memory_id);
+
+-- Content hash and 64-bit SimHash per memory, for duplicate detection on write and
+-- in memory_dedup.py. band0..band3 are the SimHash's 16-bit quarters (NULL for text
+-- too short to compare): signatures a few bits apart share at least one band.
+CREATE TABLE IF NOT EXISTS memory_signatures (
+  memory_id INTEGER PRIMARY KEY REFERENCES memories(id) ON DELETE CASCADE,
+  project TEXT NOT NULL,
+  type TEXT NOT NULL,
+  content_hash TEXT NOT NULL,
+  simhash BIGINT NOT NULL,
+  band0 INTEGER,
+  band1 INTEGER,
+  band2 INTEGER,
+  band3 INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS memory_signatures_hash_idx ON memory_signatures(project, type, content_hash);
+CREATE INDEX IF NOT EXISTS memory_signatures_band0_idx ON memory_signatures(project, type, band0);
+CREATE INDEX IF NOT EXISTS memory_signatures_band1_idx ON memory_signatures(project, type, band1);
+CREATE INDEX IF NOT EXISTS memory_signatures_band2_idx ON memory_signatures(project, type, band2);
+CREATE INDEX IF NOT EXISTS memory_signatures_band3_idx ON memory_signatures(project, type, band3);
 
 CREATE TABLE IF NOT EXISTS conversation_turns (
   id SERIAL PRIMARY KEY,
@@ -27,10 +84,79 @@ CREATE TABLE IF NOT EXISTS conversation_turns (
   role TEXT NOT NULL,
   content TEXT NOT NULL,
   context_json TEXT NOT NULL DEFAULT '{}',
-  metadata_json TEXT NOT NULL DEFAULT '{}'
+  metadata_json TEXT NOT NULL DEFAULT '{}',
+  content_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED
 );
 
-CREATE INDEX IF NOT EXISTS conversation_turns_project_idx ON conversation_turns(project);
+-- Turn listings order by (created_at_epoch DESC, id DESC) within a project, session or role.
+CREATE INDEX IF NOT EXISTS conversation_turns_project_epoch_idx
+  ON conversation_turns(project, created_at_epoch DESC, id DESC);
+CREATE INDEX IF NOT EXISTS conversation_turns_project_session_epoch_idx
+  ON conversation_turns(project, session_id, created_at_epoch DESC, id DESC);
+CREATE INDEX IF NOT EXISTS conversation_turns_project_role_epoch_idx
+  ON conversation_turns(project, role, created_at_epoch DESC, id DESC);
 CREATE INDEX IF NOT EXISTS conversation_turns_session_idx ON conversation_turns(session_id);
 CREATE INDEX IF NOT EXISTS conversation_turns_created_at_epoch_idx ON conversation_turns(created_at_epoch);
 CREATE INDEX IF NOT EXISTS conversation_turns_role_idx ON conversation_turns(role);
+-- content_tsv's GIN index, like search_tsv's, is created by memory_init.py.
+
+CREATE TABLE IF NOT EXISTS vector_sync_state (
+  collection TEXT PRIMARY KEY,
+  last_id BIGINT NOT NULL DEFAULT 0,
+  last_epoch BIGINT NOT NULL DEFAULT 0,
+  updated_at_epoch BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS vector_sync_rows (
+  collection TEXT NOT NULL,
+  row_id BIGINT NOT NULL,
+  content_hash TEXT NOT NULL,
+  synced_at_epoch BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (collection, row_id)
+);
+
+CREATE TABLE IF NOT EXISTS vector_outbox (
+  id BIGSERIAL PRIMARY KEY,
+  kind TEXT NOT NULL,
+  row_id BIGINT NOT NULL,
+  project TEXT NOT NULL DEFAULT '',
+  enqueued_at_epoch BIGINT NOT NULL DEFAULT 0,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  last_error TEXT NOT NULL DEFAULT '',
+  UNIQUE (kind, row_id)
+);
+
+CREATE INDEX IF NOT EXISTS vector_outbox_project_idx ON vector_outbox(project);
+
+-- Per-project retention for conversation_turns; see conversation_retention.py.
+CREATE TABLE IF NOT EXISTS retention_policies (
+  project TEXT PRIMARY KEY,
+  max_age_days INTEGER NOT NULL DEFAULT 0,
+  max_turns_per_session INTEGER NOT NULL DEFAULT 0,
+  keep_last INTEGER NOT NULL DEFAULT 0,
+  updated_at_epoch BIGINT NOT NULL DEFAULT 0
+);
+
+-- Expired turns, one zlib-compressed JSON batch per row.
+CREATE TABLE IF NOT EXISTS conversation_turns_archive (
+  id BIGSERIAL PRIMARY KEY,
+  project TEXT NOT NULL,
+  first_turn_id INTEGER NOT NULL,
+  last_turn_id INTEGER NOT NULL,
+  first_epoch BIGINT NOT NULL,
+  last_epoch BIGINT NOT NULL,
+  turn_count INTEGER NOT NULL,
+  archived_at_epoch BIGINT NOT NULL DEFAULT 0,
+  codec TEXT NOT NULL DEFAULT 'zlib-json',
+  payload BYTEA NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS conversation_turns_archive_project_idx
+  ON conversation_turns_archive(project, first_turn_id);
+
+-- A trigram index for the --file substring filter on memory_files.path needs the
+-- pg_trgm extension; memory_init.py creates it when the extension is available.
+
+-- With CODEX_MEM_VECTOR_PROVIDER=pgvector, memory_init.py also adds an
+-- embedding vector(N) column and an HNSW or IVFFlat cosine index to memories
+-- and conversation_turns.
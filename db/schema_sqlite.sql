@@ -13,11 +13,97 @@ CREATE TABLE IF NOT EXISTS memories (
   metadata_json TEXT NOT NULL DEFAULT ''
 );
 
-CREATE INDEX IF NOT EXISTS memories_project_idx ON memories(project);
+-- Searches filter by project (and often type) and return the newest rows first.
+CREATE INDEX IF NOT EXISTS memories_project_epoch_id_idx ON memories(project, created_at_epoch DESC, id DESC);
+CREATE INDEX IF NOT EXISTS memories_project_type_epoch_id_idx ON memories(project, type, created_at_epoch DESC, id DESC);
 CREATE INDEX IF NOT EXISTS memories_created_at_idx ON memories(created_at);
 CREATE INDEX IF NOT EXISTS memories_created_at_epoch_idx ON memories(created_at_epoch);
 CREATE INDEX IF NOT EXISTS memories_type_idx ON memories(type);
 
+CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+  summary,
+  details,
+  tags,
+  concepts,
+  content='memories',
+  content_rowid='id'
+);
+
+CREATE TRIGGER IF NOT EXISTS memories_fts_ai AFTER INSERT ON memories BEGIN
+  INSERT INTO memories_fts(rowid, summary, details, tags, concepts)
+  VALUES (new.id, new.summary, new.details, new.tags, new.concepts);
+END;
+
+CREATE TRIGGER IF NOT EXISTS memories_fts_ad AFTER DELETE ON memories BEGIN
+  INSERT INTO memories_fts(memories_fts, rowid, summary, details, tags, concepts)
+  VALUES ('delete', old.id, old.summary, old.details, old.tags, old.concepts);
+END;
+
+CREATE TRIGGER IF NOT EXISTS memories_fts_au AFTER UPDATE ON memories BEGIN
+  INSERT INTO memories_fts(memories_fts, rowid, summary, details, tags, concepts)
+  VALUES ('delete', old.id, old.summary, old.details, old.tags, old.concepts);
+  INSERT INTO memories_fts(rowid, summary, details, tags, concepts)
+  VALUES (new.id, new.summary, new.details, new.tags, new.concepts);
+END;
+
+-- One row per (memory, concept/file/tag): filters and facet counts become index lookups.
+CREATE TABLE IF NOT EXISTS memory_concepts (
+  memory_id INTEGER NOT NULL,
+  project TEXT NOT NULL,
+  concept TEXT NOT NULL,
+  PRIMARY KEY (memory_id, concept)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS memory_files (
+  memory_id INTEGER NOT NULL,
+  project TEXT NOT NULL,
+  path TEXT NOT NULL,
+  access TEXT NOT NULL,
+  PRIMARY KEY (memory_id, path, access)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS memory_tags (
+  memory_id INTEGER NOT NULL,
+  project TEXT NOT NULL,
+  tag TEXT NOT NULL,
+  PRIMARY KEY (memory_id, tag)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS memory_concepts_project_concept_idx ON memory_concepts(project, concept);
+CREATE INDEX IF NOT EXISTS memory_files_project_path_idx ON memory_files(project, path);
+CREATE INDEX IF NOT EXISTS memory_tags_project_tag_idx ON memory_tags(project, tag);
+
+CREATE TRIGGER IF NOT EXISTS memory_facets_ad AFTER DELETE ON memories BEGIN
+  DELETE FROM memory_concepts WHERE memory_id = old.id;
+  DELETE FROM memory_files WHERE memory_id = old.id;
+  DELETE FROM memory_tags WHERE memory_id = old.id;
+END;
+
+-- Content hash and 64-bit SimHash per memory, for duplicate detection on write and
+-- in memory_dedup.py. band0..band3 are the SimHash's 16-bit quarters (NULL for text
+-- too short to compare): signatures a few bits apart share at least one band.
+CREATE TABLE IF NOT EXISTS memory_signatures (
+  memory_id INTEGER PRIMARY KEY,
+  project TEXT NOT NULL,
+  type TEXT NOT NULL,
+  content_hash TEXT NOT NULL,
+  simhash INTEGER NOT NULL,
+  band0 INTEGER,
+  band1 INTEGER,
+  band2 INTEGER,
+  band3 INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS memory_signatures_hash_idx ON memory_signatures(project, type, content_hash);
+CREATE INDEX IF NOT EXISTS memory_signatures_band0_idx ON memory_signatures(project, type, band0);
+CREATE INDEX IF NOT EXISTS memory_signatures_band1_idx ON memory_signatures(project, type, band1);
+CREATE INDEX IF NOT EXISTS memory_signatures_band2_idx ON memory_signatures(project, type, band2);
+CREATE INDEX IF NOT EXISTS memory_signatures_band3_idx ON memory_signatures(project, type, band3);
+
+CREATE TRIGGER IF NOT EXISTS memory_signatures_ad AFTER DELETE ON memories BEGIN
+  DELETE FROM memory_signatures WHERE memory_id = old.id;
+END;
+
 CREATE TABLE IF NOT EXISTS conversation_turns (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   created_at TEXT NOT NULL DEFAULT (datetime('now')),
@@ -30,7 +116,86 @@ CREATE TABLE IF NOT EXISTS conversation_turns (
   metadata_json TEXT NOT NULL DEFAULT '{}'
 );
 
-CREATE INDEX IF NOT EXISTS conversation_turns_project_idx ON conversation_turns(project);
+-- Turn listings order by (created_at_epoch DESC, id DESC) within a project, session or role.
+CREATE INDEX IF NOT EXISTS conversation_turns_project_epoch_idx
+  ON conversation_turns(project, created_at_epoch DESC, id DESC);
+CREATE INDEX IF NOT EXISTS conversation_turns_project_session_epoch_idx
+  ON conversation_turns(project, session_id, created_at_epoch DESC, id DESC);
+CREATE INDEX IF NOT EXISTS conversation_turns_project_role_epoch_idx
+  ON conversation_turns(project, role, created_at_epoch DESC, id DESC);
 CREATE INDEX IF NOT EXISTS conversation_turns_session_idx ON conversation_turns(session_id);
 CREATE INDEX IF NOT EXISTS conversation_turns_created_at_epoch_idx ON conversation_turns(created_at_epoch);
 CREATE INDEX IF NOT EXISTS conversation_turns_role_idx ON conversation_turns(role);
+
+CREATE TABLE IF NOT EXISTS vector_sync_state (
+  collection TEXT PRIMARY KEY,
+  last_id INTEGER NOT NULL DEFAULT 0,
+  last_epoch INTEGER NOT NULL DEFAULT 0,
+  updated_at_epoch INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS vector_sync_rows (
+  collection TEXT NOT NULL,
+  row_id INTEGER NOT NULL,
+  content_hash TEXT NOT NULL,
+  synced_at_epoch INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (collection, row_id)
+);
+
+CREATE TABLE IF NOT EXISTS vector_outbox (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind TEXT NOT NULL,
+  row_id INTEGER NOT NULL,
+  project TEXT NOT NULL DEFAULT '',
+  enqueued_at_epoch INTEGER NOT NULL DEFAULT 0,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  last_error TEXT NOT NULL DEFAULT '',
+  UNIQUE (kind, row_id)
+);
+
+CREATE INDEX IF NOT EXISTS vector_outbox_project_idx ON vector_outbox(project);
+
+-- Per-project retention for conversation_turns; see conversation_retention.py.
+CREATE TABLE IF NOT EXISTS retention_policies (
+  project TEXT PRIMARY KEY,
+  max_age_days INTEGER NOT NULL DEFAULT 0,
+  max_turns_per_session INTEGER NOT NULL DEFAULT 0,
+  keep_last INTEGER NOT NULL DEFAULT 0,
+  updated_at_epoch INTEGER NOT NULL DEFAULT 0
+);
+
+-- Expired turns, one zlib-compressed JSON batch per row.
+CREATE TABLE IF NOT EXISTS conversation_turns_archive (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  project TEXT NOT NULL,
+  first_turn_id INTEGER NOT NULL,
+  last_turn_id INTEGER NOT NULL,
+  first_epoch INTEGER NOT NULL,
+  last_epoch INTEGER NOT NULL,
+  turn_count INTEGER NOT NULL,
+  archived_at_epoch INTEGER NOT NULL DEFAULT 0,
+  codec TEXT NOT NULL DEFAULT 'zlib-json',
+  payload BLOB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS conversation_turns_archive_project_idx
+  ON conversation_turns_archive(project, first_turn_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS conversation_turns_fts USING fts5(
+  content,
+  content='conversation_turns',
+  content_rowid='id'
+);
+
+CREATE TRIGGER IF NOT EXISTS conversation_turns_fts_ai AFTER INSERT ON conversation_turns BEGIN
+  INSERT INTO conversation_turns_fts(rowid, content) VALUES (new.id, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS conversation_turns_fts_ad AFTER DELETE ON conversation_turns BEGIN
+  INSERT INTO conversation_turns_fts(conversation_turns_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS conversation_turns_fts_au AFTER UPDATE ON conversation_turns BEGIN
+  INSERT INTO conversation_turns_fts(conversation_turns_fts, rowid, content) VALUES ('delete', old.id, old.content);
+  INSERT INTO conversation_turns_fts(rowid, content) VALUES (new.id, new.content);
+END;
@@ -0,0 +1,73 @@
+import argparse
+import json
+from dataclasses import asdict
+
+from db import connect, get_db_url
+from core.client import request_server
+from core.config import get_int, load_settings
+from core.context_pack import DEFAULT_MAX_CHARS, ContextPacker, ContextPackRequest, render_text, tokens_to_chars
+from core.conversation_search import ConversationSearchOrchestrator
+from core.query_cache import QueryCache
+from core.search import SearchOrchestrator
+from core.vector import vector_supported
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Recent session turns plus relevant memories, trimmed to a budget.")
+    p.add_argument("--project", required=True)
+    p.add_argument("--session-id", default="")
+    p.add_argument("--q", default="", help="what the next step is about; ranks memories (default: newest)")
+    p.add_argument("--turns", type=int, default=20, help="most recent turns to consider")
+    p.add_argument("--memories", type=int, default=10, help="top memories to consider")
+    p.add_argument("--max-chars", type=int, default=0, help="character budget (default: CODEX_MEM_CONTEXT_MAX_CHARS)")
+    p.add_argument("--max-tokens", type=int, default=0, help="token budget, estimated at 4 characters per token")
+    p.add_argument("--turn-share", type=float, default=0.5, help="budget fraction reserved for turns")
+    p.add_argument("--strategy", default="auto", choices=["auto", "sqlite", "chroma", "hybrid"])
+    p.add_argument("--json", action="store_true")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    settings = load_settings()
+
+    if args.max_tokens:
+        max_chars = tokens_to_chars(args.max_tokens)
+    else:
+        max_chars = args.max_chars or get_int(settings, "CODEX_MEM_CONTEXT_MAX_CHARS", DEFAULT_MAX_CHARS)
+    request = ContextPackRequest(
+        project=args.project,
+        session_id=args.session_id or None,
+        query=args.q.strip() or None,
+        turns=args.turns,
+        memories=args.memories,
+        max_chars=max_chars,
+        strategy=args.strategy,
+        turn_share=args.turn_share,
+    )
+
+    pack = request_server(settings, "context_pack", {"request": asdict(request)}, get_db_url())
+    if pack is None:
+        conn, dialect = connect(read_only=True)
+        # A second connection, usable from a worker thread, lets the turn fetch run
+        # beside the memory search. It is a query-less listing, so the shared vector
+        # index (bound to ``conn`` under pgvector) is never queried through it.
+        turn_conn, _ = connect(shared=True, read_only=True)
+        vector_enabled = vector_supported(settings, dialect)
+        cache = QueryCache(settings, get_db_url())
+        memories = SearchOrchestrator(conn, dialect, settings, vector_enabled=vector_enabled, cache=cache)
+        conversations = ConversationSearchOrchestrator(
+            turn_conn, dialect, settings, vector_enabled=vector_enabled, vectors=memories.vectors, cache=cache
+        )
+        pack = ContextPacker(memories, conversations).pack(request)
+
+    if args.json:
+        print(json.dumps(pack, ensure_ascii=False, default=str))
+        return 0
+
+    print(render_text(pack))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
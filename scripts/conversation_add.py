@@ -1,25 +1,15 @@
 import argparse
-import json
 import sys
 from datetime import datetime
 
-from db import connect
-from core.chroma_sync import ChromaSync
-from core.config import get_bool, load_settings
-
-VALID_ROLES = {"system", "user", "assistant", "tool"}
-
-
-def _parse_json_object(raw: str, field_name: str):
-    if not raw:
-        return {}
-    try:
-        parsed = json.loads(raw)
-    except Exception as exc:
-        raise SystemExit(f"{field_name} must be valid JSON object") from exc
-    if not isinstance(parsed, dict):
-        raise SystemExit(f"{field_name} must be JSON object")
-    return parsed
+from db import connect, get_db_url
+from core.client import request_server
+from core.config import load_settings
+from core.outbox import indexing_mode
+from core.query_cache import QueryCache
+from core.records import VALID_ROLES, build_turn_record
+from core.store import add_turn
+from core.vector import create_vector_index
 
 
 def parse_args():
@@ -41,68 +31,26 @@ def main() -> int:
     if not content:
         raise SystemExit("content required (use --content or stdin)")
 
-    context_obj = _parse_json_object(args.context, "context")
-    metadata_obj = _parse_json_object(args.meta, "meta")
-
-    created_at_epoch = int(datetime.utcnow().timestamp())
-    conn, dialect = connect()
-
-    if dialect == "sqlite":
-        with conn:
-            cur = conn.execute(
-                """
-                INSERT INTO conversation_turns
-                (project, session_id, role, content, context_json, metadata_json, created_at_epoch)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    args.project,
-                    args.session_id,
-                    args.role,
-                    content,
-                    json.dumps(context_obj),
-                    json.dumps(metadata_obj),
-                    created_at_epoch,
-                ),
-            )
-            turn_id = int(cur.lastrowid)
-    else:
-        with conn:
-            cur = conn.execute(
-                """
-                INSERT INTO conversation_turns
-                (project, session_id, role, content, context_json, metadata_json, created_at_epoch)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-                """,
-                (
-                    args.project,
-                    args.session_id,
-                    args.role,
-                    content,
-                    json.dumps(context_obj),
-                    json.dumps(metadata_obj),
-                    created_at_epoch,
-                ),
-            )
-            row = cur.fetchone()
-            turn_id = int(row[0])
+    try:
+        record = build_turn_record(
+            project=args.project,
+            session_id=args.session_id,
+            role=args.role,
+            content=content,
+            created_at_epoch=int(datetime.utcnow().timestamp()),
+            context=args.context,
+            meta=args.meta,
+        )
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
 
     settings = load_settings()
-    vector_enabled = get_bool(settings, "CODEX_MEM_VECTOR_ENABLED")
-    if vector_enabled and dialect == "sqlite":
-        chroma = ChromaSync(settings)
-        chroma.sync_turn(
-            {
-                "id": turn_id,
-                "project": args.project,
-                "session_id": args.session_id,
-                "role": args.role,
-                "content": content,
-                "context_json": json.dumps(context_obj),
-                "created_at_epoch": created_at_epoch,
-            }
-        )
+    if request_server(settings, "conversation_add", {"record": record}, get_db_url()) is None:
+        conn, dialect = connect()
+        mode = indexing_mode(settings, dialect)
+        vectors = create_vector_index(settings, conn, dialect) if mode == "sync" else None
+        cache = QueryCache(settings, get_db_url())
+        add_turn(conn, dialect, record, vectors, defer_index=mode == "async", cache=cache)
 
     print("ok")
     return 0
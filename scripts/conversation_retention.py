@@ -0,0 +1,107 @@
+import argparse
+import json
+import sys
+from dataclasses import asdict, replace
+
+from db import connect, get_db_url
+from core.config import get_bool, get_int, load_settings
+from core.outbox import indexing_mode
+from core.query_cache import QueryCache
+from core.retention import DEFAULT_BATCH_SIZE, Retention, default_policy
+from core.vector import create_vector_index, vector_supported
+
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Archive conversation turns that fall outside each project's retention policy."
+    )
+    p.add_argument("--project", default="", help="only this project (default: every project with turns)")
+    p.add_argument("--max-age-days", type=int, default=None)
+    p.add_argument("--max-turns-per-session", type=int, default=None)
+    p.add_argument("--keep-last", type=int, default=None, help="never expire the project's newest N turns")
+    p.add_argument("--set-policy", action="store_true", help="store the policy options above for --project and exit")
+    p.add_argument("--show-policies", action="store_true", help="print the stored and default policies and exit")
+    p.add_argument("--dry-run", action="store_true", help="count expired turns without archiving them")
+    p.add_argument("--batch-size", type=int, default=0, help="turns per archive transaction (default: settings)")
+    p.add_argument("--pause", type=float, default=0.05, help="seconds between batches, to let writers in")
+    p.add_argument("--no-vacuum", action="store_true", help="skip incremental vacuum and ANALYZE afterwards")
+    p.add_argument("--vacuum-pages", type=int, default=0, help="sqlite pages to free at most (0 = all)")
+    p.add_argument("--restore", action="store_true", help="move --project's archived turns back")
+    p.add_argument("--reindex", action="store_true", help="with --restore, re-embed restored turns (queued with async indexing)")
+    return p.parse_args()
+
+
+def _policy_overrides(args) -> dict:
+    names = ("max_age_days", "max_turns_per_session", "keep_last")
+    return {n: max(0, getattr(args, n)) for n in names if getattr(args, n) is not None}
+
+
+def _report_progress(archived: int) -> None:
+    print(f"archived {archived}", file=sys.stderr, flush=True)
+
+
+def main() -> int:
+    args = parse_args()
+    settings = load_settings()
+    # Autocommit on Postgres: reads between batches hold no snapshot, and VACUUM can run.
+    conn, dialect = connect(shared=True)
+    cache = QueryCache(settings, get_db_url())
+
+    vectors = None
+    if get_bool(settings, "CODEX_MEM_VECTOR_ENABLED") and vector_supported(settings, dialect):
+        vectors = create_vector_index(settings, conn, dialect)
+        if not vectors.available:
+            print(f"vector index unavailable, vectors are left in place: {vectors.error}", file=sys.stderr)
+            vectors = None
+    retention = Retention(conn, dialect, settings, vectors=vectors, cache=cache)
+
+    if args.show_policies:
+        policies = {project: asdict(policy) for project, policy in retention.policies().items()}
+        print(json.dumps({"default": asdict(default_policy(settings)), "projects": policies}, ensure_ascii=False))
+        return 0
+
+    if args.set_policy:
+        if not args.project:
+            raise SystemExit("--set-policy needs --project")
+        policy = replace(retention.policy(args.project), **_policy_overrides(args))
+        retention.set_policy(args.project, policy)
+        print(json.dumps({"project": args.project, "policy": asdict(policy)}, ensure_ascii=False))
+        return 0
+
+    if args.restore:
+        if not args.project:
+            raise SystemExit("--restore needs --project")
+        if args.reindex and vectors is None and indexing_mode(settings, dialect) == "sync":
+            # Sync indexing never drains the outbox, so queued rows would stay unindexed.
+            raise SystemExit("--reindex needs a working vector index with sync indexing")
+        restored = retention.restore(args.project, reindex=args.reindex)
+        print(json.dumps({"project": args.project, "restored": restored}, ensure_ascii=False))
+        return 0
+
+    batch_size = args.batch_size or get_int(settings, "CODEX_MEM_RETENTION_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    overrides = _policy_overrides(args)
+    results = []
+    for project in [args.project] if args.project else retention.projects():
+        # Options given on the command line apply to this run only.
+        policy = replace(retention.policy(project), **overrides)
+        results.append(
+            retention.apply(
+                project,
+                policy,
+                batch_size=batch_size,
+                pause=args.pause,
+                dry_run=args.dry_run,
+                on_batch=_report_progress,
+            )
+        )
+
+    summary = {"projects": results}
+    archived = sum(int(r.get("archived", 0)) for r in results)
+    if archived and not args.no_vacuum:
+        summary["maintenance"] = retention.maintain(max_pages=args.vacuum_pages)
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,25 @@
 import argparse
 import json
+import sys
+from dataclasses import asdict
 
-from db import connect
-from core.config import get_bool, load_settings
+from db import connect, get_db_url
+from core.client import request_server
+from core.config import load_settings
+from core.pagination import decode_cursor
+from core.query_cache import QueryCache
 from core.conversation_search import ConversationSearchOrchestrator, ConversationSearchRequest
+from core.vector import vector_supported
+
+SNIPPET_FALLBACK_CHARS = 200
+
+
+def _snippet_row(row):
+    out = {key: value for key, value in row.items() if key != "content"}
+    if not out.get("snippet"):
+        content = str(row.get("content", ""))
+        out["snippet"] = content if len(content) <= SNIPPET_FALLBACK_CHARS else content[:SNIPPET_FALLBACK_CHARS] + "..."
+    return out
 
 
 def parse_args():
@@ -12,67 +28,106 @@ def parse_args():
     p.add_argument("--session-id", default="")
     p.add_argument("--role", default="")
     p.add_argument("--q", required=False, default="")
-    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--limit", type=int, default=None, help="rows to return (default 20; all with --stream)")
     p.add_argument("--json", action="store_true")
+    p.add_argument("--cursor", default="", help="continue after the next_cursor of an earlier page")
+    p.add_argument("--paginate", action="store_true", help="newest-first pages with a next_cursor; --q only filters")
+    p.add_argument("--stream", action="store_true", help="write every match as NDJSON, newest first, in constant memory")
+    p.add_argument("--snippets-only", action="store_true", help="return match snippets instead of full turn content")
     p.add_argument("--strategy", default="auto", choices=["auto", "sqlite", "chroma", "hybrid"])
     p.add_argument("--since", default="")
     p.add_argument("--until", default="")
+    p.add_argument("--cache-stats", action="store_true", help="report query cache hit/miss counts")
     return p.parse_args()
 
 
+def stream_rows(settings, request, snippets_only: bool) -> int:
+    # Read locally: the server answers with whole pages, and a stream must not be held in memory.
+    conn, dialect = connect(read_only=True)
+    orchestrator = ConversationSearchOrchestrator(conn, dialect, settings, vector_enabled=False)
+    out = sys.stdout
+    for row in orchestrator.stream(request):
+        out.write(json.dumps(_snippet_row(row) if snippets_only else row, ensure_ascii=False, default=str) + "\n")
+    out.flush()
+    return 0
+
+
 def main() -> int:
     args = parse_args()
+    if args.cursor:
+        try:
+            decode_cursor(args.cursor)
+        except ValueError:
+            raise SystemExit("invalid --cursor")
     settings = load_settings()
-    vector_enabled = get_bool(settings, "CODEX_MEM_VECTOR_ENABLED")
-    conn, dialect = connect()
-
-    if dialect != "sqlite":
-        vector_enabled = False
-
-    orchestrator = ConversationSearchOrchestrator(conn, dialect, settings, vector_enabled=vector_enabled)
-    result = orchestrator.search(
-        ConversationSearchRequest(
-            project=args.project,
-            query=args.q.strip() or None,
-            limit=args.limit,
-            strategy=args.strategy,
-            session_id=args.session_id or None,
-            role=args.role or None,
-            since=args.since or None,
-            until=args.until or None,
-        )
+    request = ConversationSearchRequest(
+        project=args.project,
+        query=args.q.strip() or None,
+        limit=args.limit if args.limit is not None else (0 if args.stream else 20),
+        strategy=args.strategy,
+        session_id=args.session_id or None,
+        role=args.role or None,
+        since=args.since or None,
+        until=args.until or None,
+        cursor=args.cursor or None,
+        paginate=args.paginate,
     )
+    if args.stream:
+        return stream_rows(settings, request, args.snippets_only)
+
+    result = request_server(settings, "conversation_search", {"request": asdict(request)}, get_db_url())
+    if result is None:
+        conn, dialect = connect(read_only=True)
+        vector_enabled = vector_supported(settings, dialect)
+
+        cache = QueryCache(settings, get_db_url())
+        orchestrator = ConversationSearchOrchestrator(conn, dialect, settings, vector_enabled=vector_enabled, cache=cache)
+        result = orchestrator.search(request)
 
     rows = result["rows"]
+    if args.snippets_only:
+        rows = [_snippet_row(row) for row in rows]
+
+    cache_stats = QueryCache(settings, get_db_url()).stats() if args.cache_stats else None
     if args.json:
-        print(
-            json.dumps(
-                {
-                    "strategy": result["strategy"],
-                    "used_chroma": result["used_chroma"],
-                    "fell_back": result["fell_back"],
-                    "count": len(rows),
-                    "rows": rows,
-                },
-                ensure_ascii=False,
-            )
-        )
+        output = {
+            "strategy": result["strategy"],
+            "used_chroma": result["used_chroma"],
+            "fell_back": result["fell_back"],
+            "pending_index": result.get("pending_index", 0),
+            "cache": result.get("cache", "off"),
+            "count": len(rows),
+            "rows": rows,
+            "next_cursor": result.get("next_cursor"),
+        }
+        if cache_stats is not None:
+            output["query_cache"] = cache_stats
+        print(json.dumps(output, ensure_ascii=False, default=str))
         return 0
 
+    if cache_stats is not None:
+        print(f"query cache hits={cache_stats['hits']} misses={cache_stats['misses']} entries={cache_stats['entries']}")
+
     if not rows:
         print("no results")
         return 0
 
     marker = f"strategy={result['strategy']} used_chroma={result['used_chroma']} fell_back={result['fell_back']}"
+    if result.get("pending_index"):
+        marker += f" pending_index={result['pending_index']}"
+    if result.get("cache"):
+        marker += f" cache={result['cache']}"
     print(marker)
     for row in rows:
         print(
             f"#{row['id']} {row['created_at']} [{row['project']}] "
             f"session={row['session_id']} role={row['role']}"
         )
-        print(row["content"])
+        print(row["snippet"] if args.snippets_only else row["content"])
         print("-")
 
+    if result.get("next_cursor"):
+        print(f"next_cursor={result['next_cursor']}")
     return 0
 
 
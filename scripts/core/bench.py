@@ -0,0 +1,282 @@
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+from .facets import backfill_facets
+from .records import build_memory_record, build_turn_record
+
+WORDS = (
+    "api auth bug build cache chroma cli config cursor database debug deploy docker embed error "
+    "export fixture flaky format handler hook import index ingest init json lint lock logging "
+    "memory merge migration mock model module network parser patch path pipeline plugin pool "
+    "postgres query queue ranking refactor regression release retry schema search server session "
+    "settings shard snapshot socket sqlite stream sync table test thread timeout token trigger "
+    "upgrade vector version watcher worker"
+).split()
+
+# Compound identifiers give the corpus a long tail of rare terms, like real code notes.
+VOCABULARY = WORDS + [a + b for a in WORDS for b in WORDS if a != b]
+_CUM_WEIGHTS = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+TYPES = ("discovery", "decision", "bugfix", "feature", "refactor")
+ROLES = ("user", "assistant", "tool")
+
+
+def _sentence(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, cum_weights=_CUM_WEIGHTS, k=rng.randint(low, high)))
+
+
+def synthetic_memories(count: int, project: str, seed: int = 7, start_epoch: int = 1700000000) -> Iterator[Tuple]:
+    """Yield memory rows in the column order of ``MEMORY_INSERT_COLUMNS``."""
+    rng = random.Random(seed)
+    for i in range(count):
+        concepts = sorted({rng.choice(WORDS) for _ in range(rng.randint(1, 3))})
+        files_read = [f"src/{rng.choice(WORDS)}/{rng.choice(WORDS)}.py" for _ in range(rng.randint(0, 3))]
+        files_modified = [f"src/{rng.choice(WORDS)}/{rng.choice(WORDS)}.py" for _ in range(rng.randint(0, 2))]
+        yield (
+            project,
+            rng.choice(TYPES),
+            ",".join(rng.sample(WORDS, 2)),
+            _sentence(rng, 6, 14),
+            _sentence(rng, 15, 40),
+            json.dumps(concepts),
+            json.dumps(files_read),
+            json.dumps(files_modified),
+            start_epoch + i * 60,
+        )
+
+
+MEMORY_INSERT_COLUMNS = (
+    "project",
+    "type",
+    "tags",
+    "summary",
+    "details",
+    "concepts",
+    "files_read",
+    "files_modified",
+    "created_at_epoch",
+)
+
+
+def seed_sqlite_memories(conn, count: int, project: str, chunk_size: int = 10000, seed: int = 7) -> None:
+    _seed_sqlite(conn, "memories", MEMORY_INSERT_COLUMNS, synthetic_memories(count, project, seed=seed), chunk_size)
+    # Raw inserts bypass store.py, so fill the facet side tables the way a migration would.
+    with conn:
+        backfill_facets(conn, "sqlite")
+
+
+TURN_INSERT_COLUMNS = (
+    "project",
+    "session_id",
+    "role",
+    "content",
+    "context_json",
+    "metadata_json",
+    "created_at_epoch",
+)
+
+
+def synthetic_turns(
+    count: int, project: str, turns_per_session: int = 40, seed: int = 13, start_epoch: int = 1700000000
+) -> Iterator[Tuple]:
+    """Yield conversation turn rows in the column order of ``TURN_INSERT_COLUMNS``."""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield (
+            project,
+            f"session-{i // turns_per_session}",
+            ROLES[i % len(ROLES)],
+            _sentence(rng, 20, 120),
+            "{}",
+            "{}",
+            start_epoch + i * 15,
+        )
+
+
+def synthetic_memory_records(
+    count: int, project: str, seed: int = 7, start_epoch: int = 1700000000
+) -> Iterator[Dict[str, object]]:
+    """``synthetic_memories`` as records for ``store.add_memories``, the path the CLIs write through."""
+    for row in synthetic_memories(count, project, seed=seed, start_epoch=start_epoch):
+        values = dict(zip(MEMORY_INSERT_COLUMNS, row))
+        yield build_memory_record(
+            project=project,
+            summary=values["summary"],
+            created_at_epoch=values["created_at_epoch"],
+            details=values["details"],
+            tags=values["tags"],
+            memory_type=values["type"],
+            concepts=values["concepts"],
+            files_read=values["files_read"],
+            files_modified=values["files_modified"],
+        )
+
+
+def synthetic_turn_records(
+    count: int, project: str, seed: int = 13, start_epoch: int = 1700000000
+) -> Iterator[Dict[str, object]]:
+    """``synthetic_turns`` as records for ``store.add_turns``."""
+    for row in synthetic_turns(count, project, seed=seed, start_epoch=start_epoch):
+        values = dict(zip(TURN_INSERT_COLUMNS, row))
+        yield build_turn_record(
+            project=project,
+            session_id=values["session_id"],
+            role=values["role"],
+            content=values["content"],
+            created_at_epoch=values["created_at_epoch"],
+        )
+
+
+def _seed_sqlite(conn, table: str, columns: Sequence[str], rows: Iterator[Tuple], chunk_size: int) -> None:
+    placeholders = ",".join(["?"] * len(columns))
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    chunk: List[Tuple] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            with conn:
+                conn.executemany(sql, chunk)
+            chunk = []
+    if chunk:
+        with conn:
+            conn.executemany(sql, chunk)
+
+
+def seed_sqlite_turns(conn, count: int, project: str, chunk_size: int = 10000, seed: int = 13) -> None:
+    _seed_sqlite(conn, "conversation_turns", TURN_INSERT_COLUMNS, synthetic_turns(count, project, seed=seed), chunk_size)
+
+
+def sample_queries(count: int, seed: int = 11) -> List[str]:
+    rng = random.Random(seed)
+    # Lookups name specific things, so draw terms uniformly rather than by corpus frequency.
+    return [" ".join(rng.sample(VOCABULARY, rng.randint(1, 2))) for _ in range(count)]
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def time_calls(fn: Callable[[object], object], inputs: Sequence[object]) -> Dict[str, float]:
+    samples: List[float] = []
+    for item in inputs:
+        started = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return {
+        "calls": len(samples),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(sum(samples) / len(samples), 3) if samples else 0.0,
+    }
+
+
+def rss_mb() -> float:
+    """Resident set size of this process; the peak where ``/proc`` is unavailable."""
+    try:
+        with open("/proc/self/statm") as handle:
+            pages = int(handle.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 1048576, 1)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return round(peak / (1048576 if sys.platform == "darwin" else 1024), 1)
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return out.stdout.strip() if out.returncode == 0 else ""
+
+
+def report_meta(options: Dict[str, object]) -> Dict[str, object]:
+    """Where and how a report was produced, so runs on different machines are not compared blindly."""
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlite": sqlite3.sqlite_version,
+        "cpus": os.cpu_count(),
+        "options": options,
+    }
+
+
+# Metric name suffixes and whether a larger value is better.
+_METRICS = (("_ms", False), ("_seconds", False), ("rss_mb", False), ("_per_sec", True))
+
+
+def _metric_direction(name: str):
+    for suffix, higher_better in _METRICS:
+        if name.endswith(suffix):
+            return higher_better
+    return None
+
+
+def flatten_metrics(node, prefix: str = "") -> Dict[str, float]:
+    """Numeric metrics of a report by dotted path; result entries are keyed by their ``rows``."""
+    out: Dict[str, float] = {}
+    if isinstance(node, dict):
+        for key, value in node.items():
+            out.update(flatten_metrics(value, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(node, list):
+        for i, value in enumerate(node):
+            label = f"rows={value['rows']}" if isinstance(value, dict) and "rows" in value else str(i)
+            out.update(flatten_metrics(value, f"{prefix}[{label}]"))
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        if _metric_direction(prefix.rsplit(".", 1)[-1]) is not None:
+            out[prefix] = float(node)
+    return out
+
+
+def compare_reports(
+    current: Dict[str, object], baseline: Dict[str, object], threshold_pct: float = 20.0, floor_ms: float = 0.1
+) -> Dict[str, object]:
+    """Metrics that moved by at least ``threshold_pct`` between two reports of the same suite.
+
+    Millisecond changes under ``floor_ms`` are ignored; at that scale they are timer noise.
+    """
+    now = flatten_metrics(current.get("results", []), "results")
+    before = flatten_metrics(baseline.get("results", []), "results")
+    regressions, improvements = [], []
+    shared = sorted(now.keys() & before.keys())
+    for key in shared:
+        old, new = before[key], now[key]
+        if old <= 0 or (key.endswith("_ms") and abs(new - old) < floor_ms):
+            continue
+        change = (new - old) / old * 100.0
+        if abs(change) < threshold_pct:
+            continue
+        worse = change < 0 if _metric_direction(key.rsplit(".", 1)[-1]) else change > 0
+        entry = {"metric": key, "baseline": old, "current": new, "change_pct": round(change, 1)}
+        (regressions if worse else improvements).append(entry)
+    return {
+        "baseline_commit": baseline.get("meta", {}).get("commit", ""),
+        "compared": len(shared),
+        "threshold_pct": threshold_pct,
+        "regressions": regressions,
+        "improvements": improvements,
+    }
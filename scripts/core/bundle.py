@@ -0,0 +1,268 @@
+import base64
+import gzip
+import io
+import json
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .vector_index import MEMORY_KIND, TURN_KIND
+
+FORMAT_NAME = "codex-mem-bundle"
+FORMAT_VERSION = 1
+
+# Rows per SQL page, embedding batch and Parquet row group.
+EXPORT_CHUNK = 1000
+
+MEMORY_FIELDS = (
+    "created_at",
+    "created_at_epoch",
+    "type",
+    "tags",
+    "summary",
+    "details",
+    "concepts",
+    "files_read",
+    "files_modified",
+    "metadata_json",
+)
+TURN_FIELDS = ("created_at", "created_at_epoch", "session_id", "role", "content", "context_json", "metadata_json")
+
+TABLES = {MEMORY_KIND: ("memories", MEMORY_FIELDS), TURN_KIND: ("conversation_turns", TURN_FIELDS)}
+PARQUET_FILES = {MEMORY_KIND: "memories.parquet", TURN_KIND: "turns.parquet"}
+MANIFEST_FILE = "manifest.json"
+
+
+def bundle_format(path: str) -> str:
+    """``jsonl.zst``, ``jsonl.gz``, ``jsonl`` or ``parquet``, from the bundle path."""
+    name = str(path).lower()
+    for suffix in (".jsonl.zst", ".jsonl.gz", ".jsonl", ".parquet"):
+        if name.endswith(suffix):
+            return suffix[1:]
+    raise ValueError("bundle path must end in .jsonl.zst, .jsonl.gz, .jsonl or .parquet")
+
+
+def pack_vector(vector: Sequence[float]) -> bytes:
+    # float32, as the embedding cache stores them: exact and a quarter of the JSON text.
+    return array("f", vector).tobytes()
+
+
+def unpack_vector(blob: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+def export_rows(conn, dialect: str, kind: str, project: str, chunk: int = EXPORT_CHUNK) -> Iterator[List[Dict[str, object]]]:
+    """A project's rows of one kind, oldest first, one keyset page at a time.
+
+    Oldest first keeps the id order of the source when the bundle is imported. The
+    ``(project, created_at_epoch DESC, id DESC)`` indexes serve the pages read backwards.
+    """
+    table, fields = TABLES[kind]
+    mark = "?" if dialect == "sqlite" else "%s"
+    columns = ", ".join(("id",) + fields)
+    after: Tuple[int, int] = (-(2**62), 0)
+    while True:
+        cur = conn.execute(
+            f"SELECT {columns} FROM {table} "
+            f"WHERE project = {mark} AND (created_at_epoch, id) > ({mark}, {mark}) "
+            f"ORDER BY created_at_epoch, id LIMIT {mark}",
+            (project, after[0], after[1], chunk),
+        )
+        names = [d[0] for d in cur.description]
+        rows = [dict(zip(names, row)) for row in cur.fetchall()]
+        if not rows:
+            return
+        after = (int(rows[-1]["created_at_epoch"]), int(rows[-1]["id"]))
+        for row in rows:
+            del row["id"]
+            if row["created_at"] is not None:
+                row["created_at"] = str(row["created_at"])
+        yield rows
+        if len(rows) < chunk:
+            return
+
+
+def new_manifest(project: str, model: Optional[str]) -> Dict[str, object]:
+    return {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "project": project,
+        "exported_at_epoch": int(time.time()),
+        # Set when rows carry an ``embedding``; vectors are only reused under the same model.
+        "embedding_model": model,
+    }
+
+
+def _check_manifest(manifest: Dict[str, object]) -> Dict[str, object]:
+    if manifest.get("format") != FORMAT_NAME:
+        raise ValueError("not a codex-mem bundle")
+    if int(manifest.get("version", 0)) > FORMAT_VERSION:
+        raise ValueError(f"bundle version {manifest.get('version')} is newer than this codex-mem")
+    return manifest
+
+
+def _zstandard():
+    try:
+        import zstandard  # type: ignore
+    except Exception as exc:
+        raise SystemExit("zstandard is required for .jsonl.zst bundles. Install with: pip install zstandard") from exc
+    return zstandard
+
+
+def _pyarrow():
+    try:
+        import pyarrow  # type: ignore
+        import pyarrow.parquet  # type: ignore
+    except Exception as exc:
+        raise SystemExit("pyarrow is required for .parquet bundles. Install with: pip install pyarrow") from exc
+    return pyarrow
+
+
+def _open_text(path: Path, fmt: str, mode: str):
+    if fmt == "jsonl.zst":
+        zstandard = _zstandard()
+        raw = open(path, mode + "b")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor(level=10, threads=-1).stream_writer(raw)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    if fmt == "jsonl.gz":
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    return open(path, mode, encoding="utf-8")
+
+
+class BundleWriter:
+    """Write a bundle incrementally: ``write`` per chunk, then ``close``.
+
+    JSONL bundles are one file: the manifest line, then one line per row tagged with
+    its ``kind``, then an ``end`` line with the row counts so a truncated file is
+    detected on import. Parquet bundles are a directory holding ``manifest.json`` and
+    one zstd-compressed file per kind, written a row group per chunk. Embeddings are
+    float32 bytes, base64 encoded in JSONL.
+    """
+
+    def __init__(self, path: str, manifest: Dict[str, object]):
+        self.path = Path(path)
+        self.format = bundle_format(path)
+        self.manifest = manifest
+        self.counts = {MEMORY_KIND: 0, TURN_KIND: 0}
+        self._parquet: Dict[str, object] = {}
+        if self.format == "parquet":
+            self._pa = _pyarrow()
+            self.path.mkdir(parents=True, exist_ok=True)
+            # The manifest marks a finished export; a stale one must not outlive a failed rewrite.
+            (self.path / MANIFEST_FILE).unlink(missing_ok=True)
+            self._out = None
+        else:
+            self._out = _open_text(self.path, self.format, "w")
+            self._out.write(json.dumps(manifest, ensure_ascii=False) + "\n")
+
+    def _schema(self, kind: str):
+        pa = self._pa
+        fields = [pa.field(name, pa.int64() if name == "created_at_epoch" else pa.string()) for name in TABLES[kind][1]]
+        if self.manifest.get("embedding_model"):
+            fields.append(pa.field("embedding", pa.binary()))
+        return pa.schema(fields)
+
+    def write(self, kind: str, rows: Sequence[Dict[str, object]], vectors: Optional[Sequence[Sequence[float]]] = None) -> None:
+        if not rows:
+            return
+        if self.format == "parquet":
+            writer = self._parquet.get(kind)
+            if writer is None:
+                schema = self._schema(kind)
+                writer = self._pa.parquet.ParquetWriter(str(self.path / PARQUET_FILES[kind]), schema, compression="zstd")
+                self._parquet[kind] = writer
+            columns = {name: [row[name] for row in rows] for name in TABLES[kind][1]}
+            if vectors is not None:
+                columns["embedding"] = [pack_vector(v) for v in vectors]
+            writer.write_table(self._pa.table(columns, schema=writer.schema))
+        else:
+            lines = []
+            for i, row in enumerate(rows):
+                line = {"kind": kind, **row}
+                if vectors is not None:
+                    line["embedding"] = base64.b64encode(pack_vector(vectors[i])).decode("ascii")
+                lines.append(json.dumps(line, ensure_ascii=False, default=str))
+            self._out.write("\n".join(lines) + "\n")
+        self.counts[kind] += len(rows)
+
+    def close(self, complete: bool = True) -> None:
+        """Finish the bundle; with ``complete`` unset it stays unreadable as a truncated one."""
+        if self.format == "parquet":
+            for writer in self._parquet.values():
+                writer.close()
+            if complete:
+                manifest = {**self.manifest, "counts": self.counts}
+                (self.path / MANIFEST_FILE).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+            return
+        if complete:
+            self._out.write(json.dumps({"kind": "end", "counts": self.counts}) + "\n")
+        self._out.close()
+
+
+def read_manifest(path: str) -> Dict[str, object]:
+    fmt = bundle_format(path)
+    if fmt == "parquet":
+        return _check_manifest(json.loads((Path(path) / MANIFEST_FILE).read_text(encoding="utf-8")))
+    with _open_text(Path(path), fmt, "r") as handle:
+        return _check_manifest(json.loads(handle.readline()))
+
+
+def read_bundle(path: str, chunk: int = EXPORT_CHUNK) -> Iterator[Tuple[str, List[Dict[str, object]]]]:
+    """``(kind, rows)`` chunks in bundle order; a row's ``embedding`` is decoded to floats.
+
+    Raises ``ValueError`` on a malformed or truncated bundle.
+    """
+    fmt = bundle_format(path)
+    if fmt == "parquet":
+        yield from _read_parquet(Path(path), chunk)
+        return
+
+    with _open_text(Path(path), fmt, "r") as handle:
+        _check_manifest(json.loads(handle.readline()))
+        kind: Optional[str] = None
+        rows: List[Dict[str, object]] = []
+        ended = False
+        for lineno, line in enumerate(handle, start=2):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                row_kind = row.pop("kind")
+            except Exception as exc:
+                raise ValueError(f"line {lineno}: malformed bundle row") from exc
+            if row_kind == "end":
+                ended = True
+                break
+            if row_kind not in TABLES:
+                raise ValueError(f"line {lineno}: unknown kind {row_kind!r}")
+            if rows and (row_kind != kind or len(rows) >= chunk):
+                yield kind, rows
+                rows = []
+            kind = row_kind
+            if row.get("embedding"):
+                row["embedding"] = unpack_vector(base64.b64decode(row["embedding"]))
+            rows.append(row)
+        if rows:
+            yield kind, rows
+        if not ended:
+            raise ValueError("bundle is truncated (no end record)")
+
+
+def _read_parquet(path: Path, chunk: int) -> Iterator[Tuple[str, List[Dict[str, object]]]]:
+    pa = _pyarrow()
+    for kind, name in PARQUET_FILES.items():
+        target = path / name
+        if not target.exists():
+            continue
+        for batch in pa.parquet.ParquetFile(str(target)).iter_batches(batch_size=chunk):
+            rows = batch.to_pylist()
+            for row in rows:
+                if row.get("embedding"):
+                    row["embedding"] = unpack_vector(row["embedding"])
+            yield kind, rows
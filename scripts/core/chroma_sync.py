@@ -1,21 +1,26 @@
-import json
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List
 
+from .embeddings import Embedder
+from .sync_state import Record
+from .vector_index import MEMORY_KIND, Condition, VectorIndex, empty_result
 
-class ChromaSync:
+_CHROMA_OPERATORS = {"=": "$eq", ">=": "$gte", "<=": "$lte"}
+
+
+class ChromaSync(VectorIndex):
     def __init__(self, settings: Dict[str, str]):
-        self.settings = settings
-        self.collection_name = settings.get("CODEX_MEM_VECTOR_COLLECTION", "codex-mem")
-        self.turns_collection_name = settings.get("CODEX_MEM_VECTOR_COLLECTION_TURNS", "codex-mem-turns")
+        super().__init__(settings)
         self.data_dir = Path(settings.get("CODEX_MEM_DATA_DIR", str(Path.home() / ".codex-mem")))
         self.vector_dir = self.data_dir / "vector-db"
         self.vector_dir.mkdir(parents=True, exist_ok=True)
+        # Embedding here rather than in the collection lets queries and re-backfills
+        # reuse cached vectors; it is the same MiniLM model Chroma's default runs.
+        self.embedder = Embedder(settings)
 
         self._client = None
         self._collection = None
         self._turns_collection = None
-        self._error: Optional[str] = None
         self._init_client()
 
     def _init_client(self) -> None:
@@ -35,128 +40,53 @@ class ChromaSync:
     def available(self) -> bool:
         return self._collection is not None
 
-    @property
-    def error(self) -> Optional[str]:
-        return self._error
-
-    def _doc_id(self, memory_id: int) -> str:
-        return f"mem_{memory_id}"
-
-    def _turn_doc_id(self, turn_id: int) -> str:
-        return f"turn_{turn_id}"
-
-    def sync_memory(self, memory: Dict[str, object]) -> None:
-        if not self.available:
-            return
-
-        memory_id = int(memory["id"])
-        summary = str(memory.get("summary", ""))
-        details = str(memory.get("details", ""))
-        document = (summary + "\n\n" + details).strip() or summary
-
-        metadata = {
-            "sqlite_id": memory_id,
-            "project": str(memory.get("project", "")),
-            "type": str(memory.get("type", "")),
-            "tags": str(memory.get("tags", "")),
-            "created_at_epoch": int(memory.get("created_at_epoch", 0)),
-        }
-
-        if self._collection is None:
-            return
-
-        self._collection.upsert(
-            ids=[self._doc_id(memory_id)],
-            documents=[document],
-            metadatas=[metadata],
-        )
+    def _collection_for(self, kind: str):
+        return self._collection if kind == MEMORY_KIND else self._turns_collection
 
-    def query(self, query: str, limit: int, project: Optional[str] = None) -> Dict[str, object]:
-        if not self.available or self._collection is None:
-            return {"ids": [], "distances": [], "metadatas": []}
+    def _doc_id(self, kind: str, row_id: int) -> str:
+        return f"mem_{row_id}" if kind == MEMORY_KIND else f"turn_{row_id}"
 
-        where = {"project": project} if project else None
-        response = self._collection.query(
-            query_texts=[query],
-            n_results=max(limit, 1),
-            where=where,
-            include=["metadatas", "distances"],
+    def _upsert(self, kind: str, records: List[Record]) -> None:
+        # One upsert call embeds the whole batch at once; cached texts are not recomputed.
+        documents = [r[1] for r in records]
+        self._collection_for(kind).upsert(
+            ids=[r[0] for r in records],
+            documents=documents,
+            embeddings=self.embedder.embed(documents),
+            metadatas=[r[2] for r in records],
         )
 
-        ids: List[int] = []
-        metadatas = (response.get("metadatas") or [[]])[0]
-        distances = (response.get("distances") or [[]])[0]
+    def _delete(self, kind: str, row_ids: List[int]) -> None:
+        self._collection_for(kind).delete(ids=[self._doc_id(kind, row_id) for row_id in row_ids])
 
-        for meta in metadatas:
-            if not isinstance(meta, dict):
-                continue
-            sqlite_id = meta.get("sqlite_id")
-            try:
-                sqlite_id_int = int(sqlite_id)
-            except Exception:
-                continue
-            if sqlite_id_int not in ids:
-                ids.append(sqlite_id_int)
-
-        return {"ids": ids, "distances": distances, "metadatas": metadatas}
-
-    def sync_turn(self, turn: Dict[str, object]) -> None:
-        if not self.available:
-            return
-
-        turn_id = int(turn["id"])
-        role = str(turn.get("role", ""))
-        content = str(turn.get("content", ""))
-        context = str(turn.get("context_json", ""))
-        document = (role + "\n\n" + content + "\n\n" + context).strip() or content
-
-        metadata = {
-            "sqlite_id": turn_id,
-            "project": str(turn.get("project", "")),
-            "session_id": str(turn.get("session_id", "")),
-            "role": role,
-            "created_at_epoch": int(turn.get("created_at_epoch", 0)),
-        }
-
-        if self._turns_collection is None:
-            return
-
-        self._turns_collection.upsert(
-            ids=[self._turn_doc_id(turn_id)],
-            documents=[document],
-            metadatas=[metadata],
-        )
+    def _nearest(self, kind: str, query: str, limit: int, where: List[Condition]) -> Dict[str, object]:
+        return self._nearest_many(kind, [query], limit, where)[0]
+
+    def _nearest_many(self, kind: str, queries: List[str], limit: int, where: List[Condition]) -> List[Dict[str, object]]:
+        collection = self._collection_for(kind)
+        if collection is None:
+            return [empty_result() for _ in queries]
 
-    def query_turns(
-        self, query: str, limit: int, project: Optional[str] = None, session_id: Optional[str] = None
-    ) -> Dict[str, object]:
-        if not self.available or self._turns_collection is None:
-            return {"ids": [], "distances": [], "metadatas": []}
-
-        where_parts = []
-        if project:
-            where_parts.append({"project": project})
-        if session_id:
-            where_parts.append({"session_id": session_id})
-
-        where = None
-        if len(where_parts) == 1:
-            where = where_parts[0]
-        elif len(where_parts) > 1:
-            where = {"$and": where_parts}
-
-        response = self._turns_collection.query(
-            query_texts=[query],
-            n_results=max(limit, 1),
-            where=where,
+        # All query texts go through one embedding call and one collection query.
+        clauses = [{key: {_CHROMA_OPERATORS[op]: value}} for key, op, value in where]
+        response = collection.query(
+            query_embeddings=self.embedder.embed(queries),
+            n_results=limit,
+            where=None if not clauses else clauses[0] if len(clauses) == 1 else {"$and": clauses},
             include=["metadatas", "distances"],
         )
+        metadatas = response.get("metadatas") or [[] for _ in queries]
+        distances = response.get("distances") or [[] for _ in queries]
+        return [self._hits(m, d) for m, d in zip(metadatas, distances)]
 
+    def _hits(self, metadatas: List[object], raw_distances: List[float]) -> Dict[str, object]:
         ids: List[int] = []
-        metadatas = (response.get("metadatas") or [[]])[0]
-        distances = (response.get("distances") or [[]])[0]
+        distances: List[float] = []
+        kept: List[Dict[str, object]] = []
+        seen = set()
 
-        for meta in metadatas:
+        # Keep distances and metadatas aligned with ids so callers can report per-hit similarity.
+        for meta, distance in zip(metadatas, raw_distances):
             if not isinstance(meta, dict):
                 continue
             sqlite_id = meta.get("sqlite_id")
@@ -164,25 +94,11 @@ class ChromaSync:
                 sqlite_id_int = int(sqlite_id)
             except Exception:
                 continue
-            if sqlite_id_int not in ids:
-                ids.append(sqlite_id_int)
-
-        return {"ids": ids, "distances": distances, "metadatas": metadatas}
-
-    def backfill(self, memories: List[Dict[str, object]]) -> int:
-        if not self.available:
-            return 0
-        synced = 0
-        for memory in memories:
-            self.sync_memory(memory)
-            synced += 1
-        return synced
-
-    def backfill_turns(self, turns: List[Dict[str, object]]) -> int:
-        if not self.available:
-            return 0
-        synced = 0
-        for turn in turns:
-            self.sync_turn(turn)
-            synced += 1
-        return synced
+            if sqlite_id_int in seen:
+                continue
+            seen.add(sqlite_id_int)
+            ids.append(sqlite_id_int)
+            distances.append(float(distance))
+            kept.append(meta)
+
+        return {"ids": ids, "distances": distances, "metadatas": kept}
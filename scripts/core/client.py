@@ -0,0 +1,58 @@
+import json
+import socket
+from pathlib import Path
+from typing import Dict, Optional
+
+from .config import get_bool, get_int
+
+DEFAULT_SOCKET_NAME = "codex-mem.sock"
+
+
+def socket_path(settings: Dict[str, str]) -> Path:
+    configured = settings.get("CODEX_MEM_SERVER_SOCKET", "").strip()
+    if configured:
+        return Path(configured).expanduser()
+    return Path(settings.get("CODEX_MEM_DATA_DIR", str(Path.home() / ".codex-mem"))) / DEFAULT_SOCKET_NAME
+
+
+def request_server(settings: Dict[str, str], op: str, payload: Dict[str, object], db_url: str) -> Optional[object]:
+    """Run ``op`` on a running memory server.
+
+    Returns ``None`` when no server is reachable (or it serves another database)
+    so the caller can fall back to doing the work in-process. Once the request is
+    sent the server may already have done it, so a failure after that point raises
+    instead: retrying in-process could write the same row twice.
+    """
+    if not get_bool(settings, "CODEX_MEM_SERVER_ENABLED") or not hasattr(socket, "AF_UNIX"):
+        return None
+    path = socket_path(settings)
+    if not path.exists():
+        return None
+
+    message = json.dumps({"op": op, "payload": payload, "db_url": db_url}, ensure_ascii=False) + "\n"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(get_int(settings, "CODEX_MEM_SERVER_TIMEOUT", 30))
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return None
+        try:
+            sock.sendall(message.encode("utf-8"))
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+        except OSError as exc:
+            raise SystemExit(f"memory server did not answer {op}: {exc}")
+    if not line:
+        raise SystemExit(f"memory server closed the connection during {op}")
+
+    try:
+        response = json.loads(line)
+    except ValueError as exc:
+        raise SystemExit(f"memory server sent an invalid reply to {op}: {exc}")
+    if not isinstance(response, dict):
+        raise SystemExit(f"memory server sent an invalid reply to {op}")
+    if response.get("ok"):
+        return response.get("result")
+    if response.get("fallback"):
+        return None
+    raise SystemExit(f"memory server error: {response.get('error')}")
@@ -1,7 +1,7 @@
 import json
 import os
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable
 
 DEFAULTS: Dict[str, str] = {
     "CODEX_MEM_DATA_DIR": str(Path.home() / ".codex-mem"),
@@ -10,6 +10,43 @@ DEFAULTS: Dict[str, str] = {
     "CODEX_MEM_VECTOR_COLLECTION": "codex-mem",
     "CODEX_MEM_VECTOR_COLLECTION_TURNS": "codex-mem-turns",
     "CODEX_MEM_VECTOR_TOP_K": "50",
+    "CODEX_MEM_VECTOR_BATCH_SIZE": "256",
+    "CODEX_MEM_VECTOR_INDEXING": "sync",
+    "CODEX_MEM_VECTOR_DRAIN_INTERVAL": "2",
+    "CODEX_MEM_VECTOR_MAX_FETCH": "1000",
+    "CODEX_MEM_VECTOR_DIM": "384",
+    "CODEX_MEM_PGVECTOR_INDEX": "hnsw",
+    "CODEX_MEM_PGVECTOR_LISTS": "100",
+    "CODEX_MEM_HYBRID_FUSION": "rrf",
+    "CODEX_MEM_HYBRID_RRF_K": "60",
+    "CODEX_MEM_HYBRID_VECTOR_WEIGHT": "0.5",
+    "CODEX_MEM_FTS_ENABLED": "true",
+    "CODEX_MEM_QUERY_CACHE_ENABLED": "true",
+    "CODEX_MEM_QUERY_CACHE_SIZE": "512",
+    "CODEX_MEM_QUERY_CACHE_TTL": "300",
+    "CODEX_MEM_EMBEDDING_CACHE_ENABLED": "true",
+    "CODEX_MEM_EMBEDDING_CACHE_MAX_ROWS": "100000",
+    "CODEX_MEM_CONTEXT_MAX_CHARS": "8000",
+    "CODEX_MEM_DEDUP_ENABLED": "true",
+    "CODEX_MEM_DEDUP_MAX_DISTANCE": "0",
+    "CODEX_MEM_RETENTION_MAX_AGE_DAYS": "0",
+    "CODEX_MEM_RETENTION_MAX_TURNS_PER_SESSION": "0",
+    "CODEX_MEM_RETENTION_KEEP_LAST": "0",
+    "CODEX_MEM_RETENTION_BATCH_SIZE": "500",
+    "CODEX_MEM_SQLITE_JOURNAL_MODE": "wal",
+    "CODEX_MEM_SQLITE_SYNCHRONOUS": "normal",
+    "CODEX_MEM_SQLITE_MMAP_SIZE": "268435456",
+    "CODEX_MEM_SQLITE_CACHE_SIZE": "-65536",
+    "CODEX_MEM_SQLITE_TEMP_STORE": "memory",
+    "CODEX_MEM_SQLITE_BUSY_TIMEOUT": "5000",
+    "CODEX_MEM_PG_POOL_MIN_SIZE": "1",
+    "CODEX_MEM_PG_POOL_MAX_SIZE": "4",
+    "CODEX_MEM_PG_POOL_TIMEOUT": "30",
+    "CODEX_MEM_PG_POOL_MAX_IDLE": "600",
+    "CODEX_MEM_PG_PREPARE": "true",
+    "CODEX_MEM_SERVER_ENABLED": "true",
+    "CODEX_MEM_SERVER_SOCKET": "",
+    "CODEX_MEM_SERVER_TIMEOUT": "30",
     "CODEX_MEM_PYTHON_VERSION": "3.13",
     "CODEX_MEM_LOG_LEVEL": "INFO",
 }
@@ -66,3 +103,27 @@ def get_int(settings: Dict[str, str], key: str, fallback: int) -> int:
         return int(settings.get(key, str(fallback)))
     except Exception:
         return fallback
+
+
+def _get_choice(settings: Dict[str, str], key: str, choices: Iterable[str]) -> str:
+    value = str(settings.get(key, "")).strip().lower()
+    return value if value in choices else DEFAULTS[key]
+
+
+def sqlite_profile(settings: Dict[str, str]) -> Dict[str, object]:
+    """PRAGMA values every SQLite connection to the memory database is opened with.
+
+    WAL lets readers run alongside a writer, and ``synchronous=NORMAL`` is durable
+    under WAL except for the last commits on power loss. ``cache_size`` follows the
+    PRAGMA convention: negative values are KiB, positive values pages.
+    """
+    return {
+        "journal_mode": _get_choice(
+            settings, "CODEX_MEM_SQLITE_JOURNAL_MODE", ("wal", "delete", "truncate", "persist", "memory")
+        ),
+        "synchronous": _get_choice(settings, "CODEX_MEM_SQLITE_SYNCHRONOUS", ("off", "normal", "full", "extra")),
+        "mmap_size": max(0, get_int(settings, "CODEX_MEM_SQLITE_MMAP_SIZE", 0)),
+        "cache_size": get_int(settings, "CODEX_MEM_SQLITE_CACHE_SIZE", -2000),
+        "temp_store": _get_choice(settings, "CODEX_MEM_SQLITE_TEMP_STORE", ("default", "file", "memory")),
+        "busy_timeout": max(0, get_int(settings, "CODEX_MEM_SQLITE_BUSY_TIMEOUT", 5000)),
+    }
@@ -0,0 +1,167 @@
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .conversation_search import ConversationSearchOrchestrator, ConversationSearchRequest
+from .fusion import submit
+from .search import SearchOrchestrator, SearchRequest
+
+DEFAULT_MAX_CHARS = 8000
+# Rough English average for BPE tokenizers; budgets in tokens are converted with it.
+CHARS_PER_TOKEN = 4
+# Below this many characters a truncated item is dropped instead of cut.
+MIN_ITEM_CHARS = 80
+TURN_FIELDS = ("id", "created_at", "created_at_epoch", "session_id", "role", "content")
+MEMORY_FIELDS = ("id", "created_at", "created_at_epoch", "type", "tags", "summary", "details", "scores")
+
+
+@dataclass
+class ContextPackRequest:
+    project: str
+    session_id: Optional[str] = None
+    query: Optional[str] = None
+    turns: int = 20
+    memories: int = 10
+    max_chars: int = DEFAULT_MAX_CHARS
+    strategy: str = "auto"
+    turn_share: float = 0.5
+
+
+def tokens_to_chars(tokens: int) -> int:
+    return tokens * CHARS_PER_TOKEN
+
+
+def _turn_text(row: Dict[str, object]) -> str:
+    return str(row.get("content") or "")
+
+
+def _memory_text(row: Dict[str, object]) -> str:
+    return (str(row.get("summary") or "") + "\n" + str(row.get("details") or "")).strip()
+
+
+def _cut(row: Dict[str, object], field: str, keep: int) -> Dict[str, object]:
+    text = str(row.get(field) or "")
+    return {**row, field: text[: max(0, keep - 3)] + "...", "truncated": True}
+
+
+class ContextPacker:
+    """Recent session turns plus the memories most relevant to the step, in one call.
+
+    Both searches go through the regular orchestrators, so filters, hybrid fusion and
+    the query cache behave as in ``conversation_search.py``/``memory_search.py``. With
+    ``concurrent`` and a connection per orchestrator, the turn fetch runs on the search
+    thread pool while the memory search runs here; the turn connection must then be
+    usable from another thread (``connect(shared=True)``). On one shared connection
+    the two run in turn, since its callers serialize access.
+
+    The result is trimmed to ``max_chars`` of turn content and memory text. Turns get
+    ``turn_share`` of it, newest first, and memories the rest in rank order; budget one
+    side leaves unused goes to the other.
+    """
+
+    def __init__(
+        self,
+        memories: SearchOrchestrator,
+        conversations: ConversationSearchOrchestrator,
+        concurrent: bool = True,
+    ):
+        self.memories = memories
+        self.conversations = conversations
+        self.concurrent = concurrent
+
+    def pack(self, req: ContextPackRequest) -> Dict[str, object]:
+        turn_req = ConversationSearchRequest(
+            project=req.project, query=None, limit=max(0, req.turns), strategy="sqlite", session_id=req.session_id
+        )
+        memory_req = SearchRequest(
+            project=req.project, query=req.query, limit=max(0, req.memories), strategy=req.strategy
+        )
+
+        concurrent = self.concurrent and self.conversations.conn is not self.memories.conn
+        pending = submit(self.conversations.search, turn_req) if concurrent and req.turns > 0 else None
+        memory_result = self.memories.search(memory_req) if req.memories > 0 else None
+        if pending is not None:
+            turn_result = pending.result()
+        elif req.turns > 0:
+            turn_result = self.conversations.search(turn_req)
+        else:
+            turn_result = None
+
+        turns = [{k: r.get(k) for k in TURN_FIELDS} for r in (turn_result or {}).get("rows", [])]
+        memories = [{k: r[k] for k in MEMORY_FIELDS if k in r} for r in (memory_result or {}).get("rows", [])]
+        kept_turns, kept_memories, used = self._trim(turns, memories, req)
+        budget = {"max_chars": req.max_chars, "used_chars": used, "approx_tokens": math.ceil(used / CHARS_PER_TOKEN)}
+
+        return {
+            "project": req.project,
+            "session_id": req.session_id,
+            # Oldest first, so the bundle reads as a transcript.
+            "turns": list(reversed(kept_turns)),
+            "memories": kept_memories,
+            "strategy": memory_result["strategy"] if memory_result else None,
+            "cache": memory_result.get("cache") if memory_result else None,
+            "budget": budget,
+            "dropped": {"turns": len(turns) - len(kept_turns), "memories": len(memories) - len(kept_memories)},
+        }
+
+    def _trim(
+        self, turns: List[Dict[str, object]], memories: List[Dict[str, object]], req: ContextPackRequest
+    ) -> Tuple[List[Dict[str, object]], List[Dict[str, object]], int]:
+        budget = max(0, req.max_chars)
+        share = min(1.0, max(0.0, req.turn_share))
+        turn_costs = [len(_turn_text(r)) for r in turns]
+        memory_costs = [len(_memory_text(r)) for r in memories]
+
+        # Each side keeps whole items within its share; leftovers pass to the other side.
+        turn_budget = int(budget * share)
+        turn_fit = self._fit(turn_costs, turn_budget)
+        memory_budget = budget - sum(turn_costs[:turn_fit])
+        memory_fit = self._fit(memory_costs, memory_budget)
+        turn_fit = self._fit(turn_costs, budget - sum(memory_costs[:memory_fit]))
+
+        kept_turns = turns[:turn_fit]
+        kept_memories = memories[:memory_fit]
+        used = sum(turn_costs[:turn_fit]) + sum(memory_costs[:memory_fit])
+
+        # Spend what is left on a cut-down copy of the next item, turns first.
+        remaining = budget - used
+        if remaining >= MIN_ITEM_CHARS and turn_fit < len(turns):
+            kept_turns.append(_cut(turns[turn_fit], "content", remaining))
+            used += remaining
+        elif remaining >= MIN_ITEM_CHARS and memory_fit < len(memories):
+            row = memories[memory_fit]
+            summary = str(row.get("summary") or "")
+            if len(summary) < remaining:
+                kept_memories.append(_cut(row, "details", remaining - len(summary) - 1))
+            else:
+                kept_memories.append(_cut({**row, "details": ""}, "summary", remaining))
+            used += remaining
+        return kept_turns, kept_memories, used
+
+    @staticmethod
+    def _fit(costs: List[int], budget: int) -> int:
+        total = 0
+        for count, cost in enumerate(costs):
+            if total + cost > budget:
+                return count
+            total += cost
+        return len(costs)
+
+
+def render_text(pack: Dict[str, object]) -> str:
+    """Plain-text form of a pack, ready to paste into a prompt."""
+    lines: List[str] = []
+    if pack["turns"]:
+        lines.append("## Recent turns")
+        for turn in pack["turns"]:
+            lines.append(f"[{turn['role']}] {turn['content']}")
+    if pack["memories"]:
+        if lines:
+            lines.append("")
+        lines.append("## Relevant memories")
+        for memory in pack["memories"]:
+            kind = f" ({memory['type']})" if memory.get("type") else ""
+            lines.append(f"#{memory['id']}{kind} {memory['summary']}")
+            if memory.get("details"):
+                lines.append(str(memory["details"]))
+    return "\n".join(lines)
@@ -1,8 +1,19 @@
+import json
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Optional, Sequence
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
-from .chroma_sync import ChromaSync
+from .config import get_bool, get_int
+from .fts import POSTGRES_TS_CONFIG, build_match_expression, postgres_column_exists, sqlite_table_exists
+from .fusion import fuse, fusion_settings, rank_lexical, submit, vector_scored
+from .outbox import TURN_KIND, VectorOutbox, indexing_mode
+from .pagination import STREAM_PAGE_SIZE, decode_cursor, keyset_condition, next_cursor
+from .postgres import prepare_enabled
+from .query_cache import QueryCache
+from .vector import create_vector_index, vector_provider
+from .vector_index import Condition
+
+SNIPPET_TOKENS = 16
 
 
 @dataclass
@@ -15,50 +26,197 @@ class ConversationSearchRequest:
     role: Optional[str] = None
     since: Optional[str] = None
     until: Optional[str] = None
+    # Keyset paging: newest first, the query only filters (see ``core.pagination``).
+    cursor: Optional[str] = None
+    paginate: bool = False
 
 
 class ConversationSearchOrchestrator:
-    def __init__(self, conn, dialect: str, settings: Dict[str, str], vector_enabled: bool):
+    def __init__(
+        self,
+        conn,
+        dialect: str,
+        settings: Dict[str, str],
+        vector_enabled: bool,
+        vectors=None,
+        cache: Optional[QueryCache] = None,
+    ):
         self.conn = conn
         self.dialect = dialect
         self.vector_enabled = vector_enabled
-        self.chroma = ChromaSync(settings) if vector_enabled else None
+        if vector_enabled and vectors is None:
+            vectors = create_vector_index(settings, conn, dialect)
+        self.vectors = vectors if vector_enabled else None
+        self.max_fetch = max(1, get_int(settings, "CODEX_MEM_VECTOR_MAX_FETCH", 1000))
+        self.fusion = fusion_settings(settings)
+        self.cache = cache
+        # Providers settle availability when built (missing package, model or columns), so a
+        # fallback for that reason repeats on every call and is worth caching.
+        self.vectors_ready = bool(self.vectors is not None and self.vectors.available)
+        # Settings that change results, so differently configured callers never share entries.
+        self.cache_scope = json.dumps(
+            [dialect, self.vectors_ready, vector_provider(settings), self.fusion, self.max_fetch], sort_keys=True
+        )
+        self.fts_enabled = get_bool(settings, "CODEX_MEM_FTS_ENABLED")
+        self.async_indexing = vector_enabled and indexing_mode(settings, dialect) == "async"
+        # Each filter combination is one fixed SQL text, worth preparing once per connection.
+        self.prepare = dialect != "sqlite" and prepare_enabled(settings)
+        self._fts_available: Optional[bool] = None
+
+    def _use_fts(self) -> bool:
+        if not self.fts_enabled:
+            return False
+        if self._fts_available is None:
+            if self.dialect == "sqlite":
+                self._fts_available = sqlite_table_exists(self.conn, "conversation_turns_fts")
+            else:
+                self._fts_available = postgres_column_exists(self.conn, "conversation_turns", "content_tsv")
+        return self._fts_available
 
     def search(self, req: ConversationSearchRequest) -> Dict[str, object]:
+        result = self._cached_search(req)
+        result["pending_index"] = self.pending_index(req.project)
+        return result
+
+    def _cached_search(self, req: ConversationSearchRequest) -> Dict[str, object]:
+        if self.cache is None or not self.cache.active:
+            return self._search(req)
+        key = self.cache.key(TURN_KIND, req, self.cache_scope)
+        result, generation = self.cache.get(key, req.project)
+        if result is not None:
+            result["cache"] = "hit"
+            return result
+        result = self._search(req)
+        # A failing query against a ready provider is usually transient; keep that fallback out.
+        if not (result["fell_back"] and self.vectors_ready):
+            self.cache.put(key, req.project, generation, result)
+        result["cache"] = "miss"
+        return result
+
+    def pending_index(self, project: Optional[str] = None) -> int:
+        """Rows written but still waiting in the outbox for vector indexing."""
+        if not self.async_indexing:
+            return 0
+        return VectorOutbox(self.conn, self.dialect).pending_count(project, kind=TURN_KIND)
+
+    def _search(self, req: ConversationSearchRequest) -> Dict[str, object]:
         strategy = (req.strategy or "auto").lower()
         if strategy not in {"auto", "sqlite", "chroma", "hybrid"}:
             strategy = "auto"
 
-        if not req.query:
-            rows = self._sql_search(req, include_query=False)
-            return self._result(rows, strategy="sqlite", used_chroma=False, fell_back=False)
+        if req.cursor or req.paginate or not req.query:
+            after = decode_cursor(req.cursor) if req.cursor else None
+            rows = self._sql_search(req, include_query=bool(req.query), recent=True, after=after)
+            result = self._result(rows, strategy="sqlite", used_chroma=False, fell_back=False)
+            result["next_cursor"] = next_cursor(rows, req.limit)
+            return result
 
         if strategy == "sqlite":
-            rows = self._sql_search(req, include_query=True)
+            rows = rank_lexical(self._sql_search(req, include_query=True))
             return self._result(rows, strategy="sqlite", used_chroma=False, fell_back=False)
 
         attempted_chroma = strategy in {"auto", "chroma", "hybrid"} and bool(req.query) and self.vector_enabled
-        if self.chroma and self.chroma.available and strategy in {"auto", "chroma", "hybrid"}:
+        if self.vectors and self.vectors.available and strategy in {"auto", "chroma", "hybrid"}:
             try:
-                vector = self.chroma.query_turns(req.query, req.limit * 4, req.project, req.session_id)
-                ids = vector.get("ids", [])
                 if strategy == "chroma":
-                    rows = self._hydrate_ids(ids, req)
+                    rows = self._vector_search(req, req.limit)
                     return self._result(rows, strategy="chroma", used_chroma=True, fell_back=False)
-
-                metadata_rows = self._sql_search(req, include_query=False, limit=req.limit * 6)
-                allowed = {int(r["id"]) for r in metadata_rows}
-                ranked = [turn_id for turn_id in ids if int(turn_id) in allowed]
-                if not ranked and strategy == "hybrid":
-                    return self._result(metadata_rows[: req.limit], strategy="hybrid", used_chroma=True, fell_back=False)
-                rows = self._hydrate_ids(ranked, req)
+                rows = self._hybrid_search(req)
+                if not rows and strategy == "hybrid":
+                    rows = self._sql_search(req, include_query=False)
                 return self._result(rows, strategy="hybrid", used_chroma=True, fell_back=False)
             except Exception:
                 pass
 
-        rows = self._sql_search(req, include_query=True)
+        rows = rank_lexical(self._sql_search(req, include_query=True))
         return self._result(rows, strategy="sqlite", used_chroma=False, fell_back=attempted_chroma)
 
+    def stream(self, req: ConversationSearchRequest, page_size: int = STREAM_PAGE_SIZE) -> Iterator[Dict[str, object]]:
+        """Every match newest first (after ``req.cursor``), read one keyset page at a time.
+
+        ``req.limit`` caps the total; 0 means no cap. Memory stays at one page whatever
+        the number of rows. Bypasses the query cache.
+        """
+        after = decode_cursor(req.cursor) if req.cursor else None
+        remaining = req.limit if req.limit > 0 else None
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            rows = self._sql_search(req, include_query=bool(req.query), limit=size, recent=True, after=after)
+            yield from rows
+            if len(rows) < size:
+                return
+            after = (int(rows[-1]["created_at_epoch"]), int(rows[-1]["id"]))
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def _hybrid_search(self, req: ConversationSearchRequest) -> List[Dict[str, object]]:
+        """Lexical and vector retrieval side by side, merged by rank fusion.
+
+        Only the vector lookup leaves this thread, and with pgvector only the query
+        embedding: every statement on the connection runs here.
+        """
+        depth = min(req.limit * 4, self.max_fetch)
+        if self.vectors.in_database:
+            pending = submit(self.vectors.embed_query, req.query)
+            lexical = rank_lexical(self._sql_search(req, include_query=True, limit=depth))
+            vector = self._vector_search(req, depth, embedding=pending.result())
+        else:
+            fetch = self._initial_fetch(depth)
+            conditions = self._vector_conditions(req)
+            pending = submit(self.vectors.query_turns, req.query, fetch, req.project, req.session_id, conditions)
+            lexical = rank_lexical(self._sql_search(req, include_query=True, limit=depth))
+            vector = self._vector_search(req, depth, first=pending.result())
+        return fuse(lexical, vector, req.limit, **self.fusion)
+
+    def _vector_conditions(self, req: ConversationSearchRequest) -> List[Condition]:
+        conditions: List[Condition] = []
+        if req.role:
+            conditions.append(("role", "=", req.role))
+        since_epoch = self._parse_epoch(req.since)
+        if since_epoch is not None:
+            conditions.append(("created_at_epoch", ">=", since_epoch))
+        until_epoch = self._parse_epoch(req.until, end_of_day=True)
+        if until_epoch is not None:
+            conditions.append(("created_at_epoch", "<=", until_epoch))
+        return conditions
+
+    def _vector_search(
+        self,
+        req: ConversationSearchRequest,
+        limit: int,
+        first: Optional[Dict[str, object]] = None,
+        embedding: Optional[str] = None,
+    ) -> List[Dict[str, object]]:
+        """Rank by similarity with the request filters pushed into the vector query.
+
+        Hydration re-checks every filter in SQL, and the candidate pool grows while
+        a provider that could not apply some of them leaves fewer than ``limit`` rows.
+        ``first`` is an already fetched result for the initial candidate pool, and
+        ``embedding`` an already computed pgvector query literal.
+        """
+        if self.vectors.in_database:
+            # pgvector: filters and nearest-neighbour ordering in one statement.
+            if embedding is None:
+                embedding = self.vectors.embed_query(req.query)
+            rows = self._sql_search(req, include_query=False, limit=limit, embedding=embedding)
+            return vector_scored(rows, {int(row["id"]): row.pop("vector_distance", None) for row in rows})
+
+        conditions = self._vector_conditions(req)
+        fetch = self._initial_fetch(limit)
+        while True:
+            if first is None:
+                result = self.vectors.query_turns(req.query, fetch, req.project, req.session_id, conditions)
+            else:
+                result, first = first, None
+            ids = result.get("ids", [])
+            rows = self._hydrate_ids(ids, req)
+            if len(rows) >= limit or len(ids) < fetch or fetch >= self.max_fetch:
+                return vector_scored(rows[:limit], dict(zip(ids, result.get("distances", []))))
+            fetch = min(fetch * 4, self.max_fetch)
+
+    def _initial_fetch(self, limit: int) -> int:
+        return min(limit * 4, self.max_fetch)
+
     def _result(self, rows: Sequence[Dict[str, object]], strategy: str, used_chroma: bool, fell_back: bool):
         return {
             "rows": list(rows),
@@ -84,46 +242,90 @@ class ConversationSearchOrchestrator:
             return None
 
     def _sql_search(
-        self, req: ConversationSearchRequest, include_query: bool, limit: Optional[int] = None
+        self,
+        req: ConversationSearchRequest,
+        include_query: bool,
+        limit: Optional[int] = None,
+        embedding: Optional[str] = None,
+        ids: Optional[Sequence[int]] = None,
+        recent: bool = False,
+        after: Optional[Tuple[int, int]] = None,
     ) -> List[Dict[str, object]]:
+        """Matching turns, ranked by relevance when the query is searched, else newest first.
+
+        ``recent`` keeps newest-first order with a query (it only filters); ``after``
+        starts past a keyset cursor position.
+        """
         if self.dialect == "sqlite":
-            return self._sqlite_search(req, include_query, limit)
-        return self._postgres_search(req, include_query, limit)
+            return self._sqlite_search(req, include_query, limit, ids, recent, after)
+        return self._postgres_search(req, include_query, limit, embedding, ids, recent, after)
 
     def _sqlite_search(
-        self, req: ConversationSearchRequest, include_query: bool, limit: Optional[int] = None
+        self,
+        req: ConversationSearchRequest,
+        include_query: bool,
+        limit: Optional[int] = None,
+        ids: Optional[Sequence[int]] = None,
+        recent: bool = False,
+        after: Optional[Tuple[int, int]] = None,
     ) -> List[Dict[str, object]]:
         limit_value = limit if limit is not None else req.limit
-        params: List[object] = [req.project]
-        where: List[str] = ["project = ?"]
+        params: List[object] = []
+        joins = ""
+        snippet = ""
+        order_by = "t.created_at_epoch DESC, t.id DESC"
+        where: List[str] = []
+
+        match = build_match_expression(req.query) if include_query and self._use_fts() else None
+        if match:
+            joins = "JOIN conversation_turns_fts ON conversation_turns_fts.rowid = t.id "
+            snippet = f", snippet(conversation_turns_fts, 0, '[', ']', '...', {SNIPPET_TOKENS}) AS snippet"
+            where.append("conversation_turns_fts MATCH ?")
+            params.append(match)
+            snippet += ", -bm25(conversation_turns_fts) AS lexical_score"
+            if not recent:
+                order_by = "lexical_score DESC, " + order_by
+
+        where.append("t.project = ?")
+        params.append(req.project)
+
+        if ids is not None:
+            where.append(f"t.id IN ({','.join(['?'] * len(ids))})")
+            params.extend(ids)
 
         if req.session_id:
-            where.append("session_id = ?")
+            where.append("t.session_id = ?")
             params.append(req.session_id)
 
         if req.role:
-            where.append("role = ?")
+            where.append("t.role = ?")
             params.append(req.role)
 
-        if include_query and req.query:
-            where.append("content LIKE ?")
+        if include_query and req.query and not match:
+            where.append("t.content LIKE ?")
             params.append(f"%{req.query}%")
 
         since_epoch = self._parse_epoch(req.since)
         if since_epoch is not None:
-            where.append("created_at_epoch >= ?")
+            where.append("t.created_at_epoch >= ?")
             params.append(since_epoch)
 
         until_epoch = self._parse_epoch(req.until, end_of_day=True)
         if until_epoch is not None:
-            where.append("created_at_epoch <= ?")
+            where.append("t.created_at_epoch <= ?")
             params.append(until_epoch)
 
+        if after is not None:
+            where.append(keyset_condition("t.", "?"))
+            params.extend(after)
+
         sql = (
-            "SELECT id, created_at, created_at_epoch, project, session_id, role, content, context_json, metadata_json "
-            "FROM conversation_turns "
+            "SELECT t.id, t.created_at, t.created_at_epoch, t.project, t.session_id, t.role, t.content, "
+            f"t.context_json, t.metadata_json{snippet} "
+            "FROM conversation_turns t "
+            f"{joins}"
             f"WHERE {' AND '.join(where)} "
-            "ORDER BY created_at_epoch DESC, id DESC "
+            f"ORDER BY {order_by} "
             "LIMIT ?"
         )
         params.append(limit_value)
@@ -131,11 +333,25 @@ class ConversationSearchOrchestrator:
         return [dict(r) for r in rows]
 
     def _postgres_search(
-        self, req: ConversationSearchRequest, include_query: bool, limit: Optional[int] = None
+        self,
+        req: ConversationSearchRequest,
+        include_query: bool,
+        limit: Optional[int] = None,
+        embedding: Optional[str] = None,
+        ids: Optional[Sequence[int]] = None,
+        recent: bool = False,
+        after: Optional[Tuple[int, int]] = None,
     ) -> List[Dict[str, object]]:
         limit_value = limit if limit is not None else req.limit
         params: List[object] = [req.project]
         where: List[str] = ["project = %s"]
+        order_by = "created_at_epoch DESC, id DESC"
+        rank_select = ""
+
+        if ids is not None:
+            # One array parameter keeps the statement text the same for any number of ids.
+            where.append("id = ANY(%s)")
+            params.append(list(ids))
 
         if req.session_id:
             where.append("session_id = %s")
@@ -145,10 +361,25 @@ class ConversationSearchOrchestrator:
             where.append("role = %s")
             params.append(req.role)
 
-        if include_query and req.query:
+        use_fts = include_query and build_match_expression(req.query) is not None and self._use_fts()
+        if use_fts:
+            where.append(f"content_tsv @@ plainto_tsquery('{POSTGRES_TS_CONFIG}', %s)")
+            params.append(req.query)
+            rank_select = f", ts_rank_cd(content_tsv, plainto_tsquery('{POSTGRES_TS_CONFIG}', %s)) AS lexical_score"
+            if not recent:
+                order_by = "lexical_score DESC, " + order_by
+            params.insert(0, req.query)
+        elif include_query and req.query:
             where.append("content ILIKE %s")
             params.append(f"%{req.query}%")
 
+        if embedding is not None:
+            # Cosine distance matches the HNSW/IVFFlat opclass, so the index drives the ORDER BY.
+            where.append("embedding IS NOT NULL")
+            rank_select = ", embedding <=> %s::vector AS vector_distance"
+            order_by = "vector_distance"
+            params.insert(0, embedding)
+
         since_epoch = self._parse_epoch(req.since)
         if since_epoch is not None:
             where.append("created_at_epoch >= %s")
@@ -159,63 +390,51 @@ class ConversationSearchOrchestrator:
             where.append("created_at_epoch <= %s")
             params.append(until_epoch)
 
+        if after is not None:
+            where.append(keyset_condition("", "%s"))
+            params.extend(after)
+
         sql = (
-            "SELECT id, created_at, created_at_epoch, project, session_id, role, content, context_json, metadata_json "
+            "SELECT id, created_at, created_at_epoch, project, session_id, role, content, context_json, metadata_json"
+            f"{rank_select} "
             "FROM conversation_turns "
             f"WHERE {' AND '.join(where)} "
-            "ORDER BY created_at_epoch DESC, id DESC "
+            f"ORDER BY {order_by} "
             "LIMIT %s"
         )
         params.append(limit_value)
+
+        if use_fts:
+            # Headline only the rows that survive the LIMIT; ts_headline re-parses the text.
+            outer_order = "page.created_at_epoch DESC, page.id DESC"
+            if not recent:
+                outer_order = "page.lexical_score DESC, " + outer_order
+            sql = (
+                "SELECT page.id, page.created_at, page.created_at_epoch, page.project, page.session_id, page.role, "
+                "page.content, page.context_json, page.metadata_json, page.lexical_score, "
+                f"ts_headline('{POSTGRES_TS_CONFIG}', page.content, plainto_tsquery('{POSTGRES_TS_CONFIG}', %s), "
+                f"'StartSel=[, StopSel=], MaxWords={SNIPPET_TOKENS}, MinWords=4') AS snippet "
+                f"FROM ({sql}) AS page "
+                f"ORDER BY {outer_order}"
+            )
+            params.insert(0, req.query)
         with self.conn.cursor() as cur:
-            cur.execute(sql, tuple(params))
+            cur.execute(sql, tuple(params), prepare=self.prepare)
             columns = [c.name for c in cur.description]
             fetched = cur.fetchall()
         return [dict(zip(columns, row)) for row in fetched]
 
     def _hydrate_ids(self, ids: Sequence[int], req: ConversationSearchRequest) -> List[Dict[str, object]]:
+        """Load vector hits in rank order, applying every request filter in SQL."""
         normalized = []
         for value in ids:
             try:
                 normalized.append(int(value))
             except Exception:
                 continue
-
         if not normalized:
-            if req.strategy == "chroma":
-                return []
-            return self._sql_search(req, include_query=True)
+            return []
 
-        if self.dialect == "sqlite":
-            placeholders = ",".join(["?"] * len(normalized))
-            params: List[object] = [req.project, *normalized]
-            sql = (
-                "SELECT id, created_at, created_at_epoch, project, session_id, role, content, context_json, metadata_json "
-                "FROM conversation_turns "
-                f"WHERE project = ? AND id IN ({placeholders})"
-            )
-            rows = self.conn.execute(sql, tuple(params)).fetchall()
-            indexed = {int(row["id"]): dict(row) for row in rows}
-        else:
-            placeholders = ",".join(["%s"] * len(normalized))
-            params = [req.project, *normalized]
-            sql = (
-                "SELECT id, created_at, created_at_epoch, project, session_id, role, content, context_json, metadata_json "
-                "FROM conversation_turns "
-                f"WHERE project = %s AND id IN ({placeholders})"
-            )
-            with self.conn.cursor() as cur:
-                cur.execute(sql, tuple(params))
-                columns = [c.name for c in cur.description]
-                fetched = cur.fetchall()
-            indexed = {int(row[0]): dict(zip(columns, row)) for row in fetched}
-
-        ordered = [indexed[turn_id] for turn_id in normalized if turn_id in indexed]
-        filtered: List[Dict[str, object]] = []
-        for row in ordered:
-            if req.session_id and row.get("session_id") != req.session_id:
-                continue
-            if req.role and row.get("role") != req.role:
-                continue
-            filtered.append(row)
-        return filtered[: req.limit]
+        rows = self._sql_search(req, include_query=False, limit=len(normalized), ids=normalized)
+        indexed = {int(row["id"]): row for row in rows}
+        return [indexed[turn_id] for turn_id in normalized if turn_id in indexed]
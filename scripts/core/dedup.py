@@ -0,0 +1,504 @@
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .config import get_bool, get_int
+from .facets import insert_facets, normalize_tag
+from .records import csv_or_json_list
+from .vector_index import MEMORY_KIND
+
+SIGNATURE_BITS = 64
+BANDS = 4
+BAND_BITS = SIGNATURE_BITS // BANDS
+# Near-duplicate merging is opt-in: a SimHash cannot tell a note from one that
+# contradicts it in a word or two, so by default only exact content matches merge.
+DEFAULT_MAX_DISTANCE = 0
+# Below this many content words a SimHash is too coarse to call two memories the
+# same; such memories only merge on an exact content hash.
+MIN_NEAR_DUP_WORDS = 4
+# Candidates taken per hash or band value, so a crowded bucket stays cheap to compare.
+BAND_CANDIDATES = 100
+# Values per IN list when looking up a batch (below SQLite's 999 parameters).
+_LOOKUP_CHUNK = 500
+# Rows of one bucket each row is compared against in the offline pass.
+BUCKET_WINDOW = 256
+
+_MASK = (1 << SIGNATURE_BITS) - 1
+_WORD = re.compile(r"\w+")
+
+# Columns a merge reads and rewrites, plus what the vector index needs afterwards.
+_MERGE_COLUMNS = (
+    "id",
+    "project",
+    "type",
+    "summary",
+    "details",
+    "tags",
+    "concepts",
+    "files_read",
+    "files_modified",
+    "metadata_json",
+    "created_at_epoch",
+)
+_LIST_COLUMNS = ("concepts", "files_read", "files_modified")
+
+
+def dedup_enabled(settings: Dict[str, str]) -> bool:
+    return get_bool(settings, "CODEX_MEM_DEDUP_ENABLED")
+
+
+# Rewordings of one note mostly differ in these; they carry no content. Negations
+# ("no", "not", "do not") stay: dropping them makes a note equal to its opposite.
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have in into is it its of on or "
+    "so than that the their then these this those to was we were when with".split()
+)
+_SUFFIXES = ("ations", "ation", "ings", "ing", "ies", "ied", "ed", "es", "s")
+
+
+def _words(record: Dict[str, object]) -> List[str]:
+    return _WORD.findall(f"{record.get('summary', '')}\n{record.get('details', '')}".lower())
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) > len(suffix) + 2:
+            return word[: -len(suffix)]
+    return word
+
+
+def features(words: Sequence[str]) -> List[str]:
+    """Content words, crudely stemmed: "Fixed caches" and "fix the cache" match."""
+    return [_stem(w) for w in words if w not in _STOPWORDS]
+
+
+def shingles(terms: Sequence[str]) -> List[str]:
+    """Adjacent term pairs, so word order counts: "sqlite to postgres" is not "postgres to sqlite"."""
+    if len(terms) < 2:
+        return list(terms)
+    return [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+
+
+@lru_cache(maxsize=65536)
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _signed(value: int) -> int:
+    # SQLite INTEGER and BIGINT are signed 64-bit.
+    return value - (1 << SIGNATURE_BITS) if value >= 1 << (SIGNATURE_BITS - 1) else value
+
+
+def simhash(features: Iterable[str]) -> int:
+    """64-bit SimHash: bit i is set when most feature hashes have bit i set.
+
+    Per-bit counts are kept as bit planes (plane j holds bit j of every count), so
+    adding a feature is a few integer operations instead of a loop over 64 bits.
+    """
+    planes: List[int] = []
+    total = 0
+    for feature in features:
+        carry = _feature_hash(feature)
+        total += 1
+        for j, plane in enumerate(planes):
+            planes[j] = plane ^ carry
+            carry &= plane
+            if not carry:
+                break
+        if carry:
+            planes.append(carry)
+    # Bitwise "count > total // 2", comparing the planes from the top.
+    half = total // 2
+    greater, equal = 0, _MASK
+    for j in range(max(len(planes), half.bit_length()) - 1, -1, -1):
+        plane = planes[j] if j < len(planes) else 0
+        if (half >> j) & 1:
+            equal &= plane
+        else:
+            greater |= equal & plane
+            equal &= ~plane & _MASK
+    return greater
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK).count("1")
+
+
+def signature(record: Dict[str, object]) -> Tuple[str, int, Optional[List[int]]]:
+    """(content hash, SimHash, bands) of a memory's summary and details.
+
+    The hash ignores case, punctuation and spacing. The SimHash is taken over
+    ``shingles`` of the content words. Bands are None for memories too short for
+    near-duplicate matching.
+    """
+    words = _words(record)
+    content_hash = hashlib.sha1(" ".join(words).encode("utf-8")).hexdigest()
+    terms = features(words)
+    value = simhash(shingles(terms))
+    if len(terms) < MIN_NEAR_DUP_WORDS:
+        return content_hash, value, None
+    return content_hash, value, [(value >> (BAND_BITS * i)) & ((1 << BAND_BITS) - 1) for i in range(BANDS)]
+
+
+def insert_signatures(
+    conn, dialect: str, records: Sequence[Dict[str, object]], ids: Sequence[int], signatures=None
+) -> None:
+    """Write ``memory_signatures`` rows for freshly inserted memories; call inside the insert transaction."""
+    rows = []
+    for index, (record, memory_id) in enumerate(zip(records, ids)):
+        content_hash, value, bands = signatures[index] if signatures else signature(record)
+        rows.append(
+            (int(memory_id), str(record["project"]), str(record["type"]), content_hash, _signed(value),
+             *(bands or [None] * BANDS))
+        )
+    if not rows:
+        return
+    columns = "memory_id, project, type, content_hash, simhash, " + ", ".join(f"band{i}" for i in range(BANDS))
+    if dialect == "sqlite":
+        conn.executemany(
+            f"INSERT OR IGNORE INTO memory_signatures ({columns}) VALUES ({', '.join(['?'] * (5 + BANDS))})", rows
+        )
+        return
+    with conn.cursor() as cur:
+        cur.executemany(
+            f"INSERT INTO memory_signatures ({columns}) VALUES ({', '.join(['%s'] * (5 + BANDS))}) "
+            "ON CONFLICT DO NOTHING",
+            rows,
+        )
+
+
+def backfill_signatures(conn, dialect: str, rebuild: bool = False, batch: int = 1000) -> int:
+    """Sign existing memories past the highest id already signed (all with ``rebuild``)."""
+    mark = "?" if dialect == "sqlite" else "%s"
+    if rebuild:
+        conn.execute("DELETE FROM memory_signatures")
+        last_id = 0
+    else:
+        last_id = int(conn.execute("SELECT COALESCE(MAX(memory_id), 0) FROM memory_signatures").fetchone()[0])
+
+    done = 0
+    while True:
+        rows = conn.execute(
+            f"SELECT id, project, type, summary, details FROM memories WHERE id > {mark} ORDER BY id LIMIT {mark}",
+            (last_id, batch),
+        ).fetchall()
+        if not rows:
+            return done
+        records = [dict(zip(("id", "project", "type", "summary", "details"), tuple(row))) for row in rows]
+        insert_signatures(conn, dialect, records, [r["id"] for r in records])
+        last_id = int(records[-1]["id"])
+        done += len(records)
+
+
+def _union(existing: Sequence[str], incoming: Sequence[str], key=lambda v: v) -> List[str]:
+    seen = {key(v) for v in existing}
+    merged = list(existing)
+    for value in incoming:
+        if key(value) not in seen:
+            seen.add(key(value))
+            merged.append(value)
+    return merged
+
+
+def merge_records(target: Dict[str, object], source: Dict[str, object]) -> Dict[str, object]:
+    """``target`` with the tags, concepts and files of ``source`` added.
+
+    The target keeps its summary and type; empty details are taken from the source.
+    ``metadata_json`` counts the duplicates folded into the row.
+    """
+    merged = dict(target)
+    tags = _union(csv_or_json_list(target.get("tags")), csv_or_json_list(source.get("tags")), normalize_tag)
+    merged["tags"] = ",".join(tags)
+    for column in _LIST_COLUMNS:
+        merged[column] = json.dumps(_union(csv_or_json_list(target.get(column)), csv_or_json_list(source.get(column))))
+    if not str(target.get("details") or "").strip():
+        merged["details"] = source.get("details") or ""
+
+    try:
+        metadata = json.loads(str(target.get("metadata_json") or "{}"))
+    except ValueError:
+        metadata = {}
+    if not isinstance(metadata, dict):
+        metadata = {"value": metadata}
+    for column in _LIST_COLUMNS:
+        metadata[column] = json.loads(str(merged[column]))
+    metadata["duplicates"] = int(metadata.get("duplicates", 0)) + 1
+    merged["metadata_json"] = json.dumps(metadata)
+    return merged
+
+
+def _fetch_rows(conn, dialect: str, ids: Sequence[int]) -> Dict[int, Dict[str, object]]:
+    if dialect == "sqlite":
+        sql = f"SELECT {', '.join(_MERGE_COLUMNS)} FROM memories WHERE id IN ({','.join(['?'] * len(ids))})"
+        rows = conn.execute(sql, tuple(ids)).fetchall()
+    else:
+        rows = conn.execute(f"SELECT {', '.join(_MERGE_COLUMNS)} FROM memories WHERE id = ANY(%s)", (list(ids),)).fetchall()
+    return {int(row[0]): dict(zip(_MERGE_COLUMNS, tuple(row))) for row in rows}
+
+
+def _update_merged(conn, dialect: str, row: Dict[str, object]) -> None:
+    mark = "?" if dialect == "sqlite" else "%s"
+    columns = ("details", "tags", *_LIST_COLUMNS, "metadata_json")
+    conn.execute(
+        f"UPDATE memories SET {', '.join(f'{c} = {mark}' for c in columns)} WHERE id = {mark}",
+        (*(row[c] for c in columns), row["id"]),
+    )
+    # New concepts, files and tags only; existing side-table rows are ignored.
+    insert_facets(conn, dialect, [row], [row["id"]])
+
+
+@dataclass
+class DedupPlan:
+    """Outcome of ``Deduplicator.resolve`` for one batch.
+
+    ``fresh`` are the records to insert (later duplicates in the batch folded in) with
+    their ``signatures``. ``targets`` has one entry per input record: a stored memory
+    id it merged into, or ``-(k + 1)`` for ``fresh[k]``. ``merged`` are the stored rows
+    rewritten by a merge; they need re-indexing.
+    """
+
+    fresh: List[Dict[str, object]] = field(default_factory=list)
+    signatures: List[tuple] = field(default_factory=list)
+    targets: List[int] = field(default_factory=list)
+    merged: List[Dict[str, object]] = field(default_factory=list)
+
+    def ids(self, fresh_ids: Sequence[int]) -> List[int]:
+        """Row id per input record, given the ids ``fresh`` was inserted under."""
+        return [t if t > 0 else int(fresh_ids[-t - 1]) for t in self.targets]
+
+
+class Deduplicator:
+    """Finds the memory a new one duplicates and folds the new one into it.
+
+    A duplicate is a memory of the same project and type with the same content hash,
+    or a SimHash within ``max_distance`` bits (0, the default, disables the latter).
+    Candidates come from the hash and the
+    four 16-bit bands of the SimHash: two signatures at most 3 bits apart agree on
+    at least one band. ``merged`` counts the memories folded so far.
+    """
+
+    def __init__(self, settings: Dict[str, str]):
+        self.max_distance = max(0, get_int(settings, "CODEX_MEM_DEDUP_MAX_DISTANCE", DEFAULT_MAX_DISTANCE))
+        self.merged = 0
+
+    def _candidates(
+        self, conn, dialect: str, records: Sequence[Dict[str, object]], sigs: Sequence[tuple]
+    ) -> List[List[Tuple[int, int, str]]]:
+        """Stored memories sharing the content hash or a band, per record.
+
+        One query per key and (project, type) group, whatever the batch size.
+        """
+        mark = "?" if dialect == "sqlite" else "%s"
+        keys = ["content_hash"] + ([f"band{i}" for i in range(BANDS)] if self.max_distance else [])
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for index, record in enumerate(records):
+            groups.setdefault((str(record["project"]), str(record["type"])), []).append(index)
+
+        found: List[Dict[int, Tuple[int, int, str]]] = [{} for _ in records]
+        for (project, memory_type), indexes in groups.items():
+            for position, key in enumerate(keys):
+                # Position 0 is the content hash; 1..4 are the bands.
+                wanted: Dict[object, List[int]] = {}
+                for index in indexes:
+                    content_hash, _, bands = sigs[index]
+                    if position == 0:
+                        wanted.setdefault(content_hash, []).append(index)
+                    elif bands is not None:
+                        wanted.setdefault(bands[position - 1], []).append(index)
+                values = list(wanted)
+                for start in range(0, len(values), _LOOKUP_CHUNK):
+                    chunk = values[start : start + _LOOKUP_CHUNK]
+                    if dialect == "sqlite":
+                        clause, params = f"IN ({','.join(['?'] * len(chunk))})", tuple(chunk)
+                    else:
+                        clause, params = "= ANY(%s)", (chunk,)
+                    rows = conn.execute(
+                        f"SELECT memory_id, simhash, content_hash, {key} FROM memory_signatures "
+                        f"WHERE project = {mark} AND type = {mark} AND {key} {clause}",
+                        (project, memory_type, *params),
+                    ).fetchall()
+                    per_value: Dict[object, int] = {}
+                    for row in rows:
+                        # A crowded bucket contributes a bounded number of candidates.
+                        seen = per_value.get(row[3], 0)
+                        if seen >= BAND_CANDIDATES:
+                            continue
+                        per_value[row[3]] = seen + 1
+                        candidate = (int(row[0]), int(row[1]) & _MASK, str(row[2]))
+                        for index in wanted[row[3]]:
+                            found[index][candidate[0]] = candidate
+        return [list(candidates.values()) for candidates in found]
+
+    def _closest(self, sig, candidates: Iterable[Tuple[int, int, str]]) -> Optional[int]:
+        content_hash, value, bands = sig
+        best: Optional[Tuple[int, int]] = None
+        for memory_id, other, other_hash in candidates:
+            if other_hash == content_hash:
+                distance = -1
+            elif bands is None or not self.max_distance:
+                continue
+            else:
+                distance = hamming(value, other)
+                if distance > self.max_distance:
+                    continue
+            if best is None or (distance, memory_id) < best:
+                best = (distance, memory_id)
+        return best[1] if best else None
+
+    def resolve(
+        self, conn, dialect: str, records: Sequence[Dict[str, object]], stored: bool = True
+    ) -> DedupPlan:
+        """Split a batch into records to insert and merges into stored memories.
+
+        Merged stored rows are written back here, so call inside the insert transaction.
+        With ``stored`` unset (no ``memory_signatures`` yet) only the batch is searched.
+        """
+        plan = DedupPlan()
+        pending: Dict[int, List[Dict[str, object]]] = {}
+        sigs = [signature(record) for record in records]
+        if stored:
+            stored_candidates = self._candidates(conn, dialect, records, sigs)
+        else:
+            stored_candidates = [[] for _ in records]
+        # Earlier records of the batch are candidates too, blocked the same way and
+        # standing in as ids -1, -2, ...
+        blocks: Dict[tuple, List[int]] = {}
+        for record, sig, candidates in zip(records, sigs, stored_candidates):
+            content_hash, _, bands = sig
+            scope = (record["project"], record["type"])
+            keys = [(*scope, -1, content_hash)]
+            if bands is not None and self.max_distance:
+                keys.extend((*scope, i, band) for i, band in enumerate(bands))
+            nearby = {i for key in keys for i in blocks.get(key, ())}
+            local = self._closest(sig, ((-(i + 1), plan.signatures[i][1], plan.signatures[i][0]) for i in nearby))
+            if local is not None:
+                plan.fresh[-local - 1] = merge_records(plan.fresh[-local - 1], record)
+                plan.targets.append(local)
+                self.merged += 1
+                continue
+            stored = self._closest(sig, candidates)
+            if stored is not None:
+                pending.setdefault(stored, []).append(record)
+                plan.targets.append(stored)
+                self.merged += 1
+                continue
+            for key in keys:
+                blocks.setdefault(key, []).append(len(plan.fresh))
+            plan.fresh.append(dict(record))
+            plan.signatures.append(sig)
+            plan.targets.append(-len(plan.fresh))
+
+        if pending:
+            rows = _fetch_rows(conn, dialect, list(pending))
+            for memory_id, duplicates in pending.items():
+                row = rows[memory_id]
+                for duplicate in duplicates:
+                    row = merge_records(row, duplicate)
+                _update_merged(conn, dialect, row)
+                plan.merged.append(row)
+        return plan
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+
+    def find(self, x: int) -> int:
+        root = self.parent.setdefault(x, x)
+        while root != self.parent[root]:
+            root = self.parent[root]
+        while x != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # The oldest memory ends up as the root, and so as the survivor.
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def find_duplicate_clusters(
+    conn, dialect: str, max_distance: int = DEFAULT_MAX_DISTANCE, project: Optional[str] = None
+) -> List[List[int]]:
+    """Groups of duplicate memory ids, oldest first, from ``memory_signatures``.
+
+    Blocking: rows are only compared within a bucket that shares the content hash or
+    one SimHash band, and against at most ``BUCKET_WINDOW`` bucket neighbours, so the
+    work grows with bucket sizes rather than with the square of the table.
+    """
+    mark = "?" if dialect == "sqlite" else "%s"
+    sets = _UnionFind()
+    keys = ["content_hash"] + ([f"band{i}" for i in range(BANDS)] if max_distance else [])
+    for key in keys:
+        where = [f"{key} IS NOT NULL"]
+        params: List[object] = []
+        if project:
+            where.append(f"project = {mark}")
+            params.append(project)
+        cursor = conn.execute(
+            f"SELECT project, type, {key}, memory_id, simhash, content_hash FROM memory_signatures "
+            f"WHERE {' AND '.join(where)} ORDER BY project, type, {key}, memory_id",
+            tuple(params),
+        )
+        bucket_key = None
+        bucket: List[Tuple[int, int]] = []
+        for row in cursor:
+            row_key = (row[0], row[1], row[2])
+            if row_key != bucket_key:
+                bucket_key, bucket = row_key, []
+            memory_id, value = int(row[3]), int(row[4]) & _MASK
+            for other_id, other_value in bucket[-BUCKET_WINDOW:]:
+                if key == "content_hash" or hamming(value, other_value) <= max_distance:
+                    sets.union(memory_id, other_id)
+            bucket.append((memory_id, value))
+
+    clusters: Dict[int, List[int]] = {}
+    for memory_id in list(sets.parent):
+        clusters.setdefault(sets.find(memory_id), []).append(memory_id)
+    return sorted((sorted(ids) for ids in clusters.values() if len(ids) > 1), key=lambda ids: ids[0])
+
+
+def collapse_clusters(
+    conn, dialect: str, clusters: Sequence[Sequence[int]], sync_collection: Optional[str] = None
+) -> Tuple[List[Dict[str, object]], List[int]]:
+    """Merge every cluster into its oldest memory and delete the rest.
+
+    Call inside a transaction. Returns the surviving rows, which need re-indexing,
+    and the deleted ids, whose vectors must go. Their outbox entries, and their
+    ``vector_sync_rows`` under ``sync_collection``, are deleted here.
+    """
+    ids = [memory_id for cluster in clusters for memory_id in cluster]
+    if not ids:
+        return [], []
+    rows = _fetch_rows(conn, dialect, ids)
+    survivors: List[Dict[str, object]] = []
+    removed: List[int] = []
+    for cluster in clusters:
+        members = [rows[memory_id] for memory_id in cluster if memory_id in rows]
+        if len(members) < 2:
+            continue
+        keeper = members[0]
+        for duplicate in members[1:]:
+            keeper = merge_records(keeper, duplicate)
+        _update_merged(conn, dialect, keeper)
+        survivors.append(keeper)
+        removed.extend(int(m["id"]) for m in members[1:])
+
+    if removed:
+        mark = "?" if dialect == "sqlite" else "%s"
+        if dialect == "sqlite":
+            clause, params = f"IN ({','.join(['?'] * len(removed))})", tuple(removed)
+        else:
+            clause, params = "= ANY(%s)", (removed,)
+        # Facets and signatures follow through the delete trigger (SQLite) or ON DELETE CASCADE.
+        conn.execute(f"DELETE FROM memories WHERE id {clause}", params)
+        conn.execute(f"DELETE FROM vector_outbox WHERE kind = {mark} AND row_id {clause}", (MEMORY_KIND, *params))
+        if sync_collection:
+            conn.execute(
+                f"DELETE FROM vector_sync_rows WHERE collection = {mark} AND row_id {clause}", (sync_collection, *params)
+            )
+    return survivors, removed
@@ -0,0 +1,137 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .config import get_bool, get_int
+
+DEFAULT_MAX_ROWS = 100000
+CACHE_FILE = "embedding-cache.sqlite3"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS embeddings ("
+    "model TEXT NOT NULL, text_hash TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL, "
+    "used_at REAL NOT NULL, PRIMARY KEY (model, text_hash)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS idx_embeddings_used_at ON embeddings(used_at)",
+)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _pack(vector: Sequence[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """Content-addressed embeddings in ``<data dir>/embedding-cache.sqlite3``.
+
+    Rows are keyed by model name and the SHA-1 of the text and hold the vector as
+    a float32 blob (1.5 KB at 384 dimensions). Beyond ``max_rows`` the least
+    recently used tenth is evicted. Lookups and stores never raise; a broken
+    cache only means recomputing.
+
+    Stores keep a running row count instead of counting the table each time: it is
+    counted once, grows by each batch (replacements overcount it) and is recounted
+    only when it passes ``max_rows``, which also picks up other processes' writes.
+    """
+
+    def __init__(self, settings: Dict[str, str]):
+        self.enabled = get_bool(settings, "CODEX_MEM_EMBEDDING_CACHE_ENABLED")
+        self.max_rows = max(1, get_int(settings, "CODEX_MEM_EMBEDDING_CACHE_MAX_ROWS", DEFAULT_MAX_ROWS))
+        data_dir = Path(settings.get("CODEX_MEM_DATA_DIR", str(Path.home() / ".codex-mem")))
+        self.path = data_dir / CACHE_FILE
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._rows: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                for statement in _SCHEMA:
+                    conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def lookup(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached vectors aligned with ``texts``; ``None`` where the text is not cached."""
+        found: List[Optional[List[float]]] = [None] * len(texts)
+        if not self.enabled or not texts:
+            return found
+        hashes = [text_hash(t) for t in texts]
+        unique = sorted(set(hashes))
+        try:
+            with self._lock:
+                conn = self._connection()
+                blobs: Dict[str, bytes] = {}
+                # Stay under SQLite's bound-parameter limit on large backfill batches.
+                for start in range(0, len(unique), 500):
+                    part = unique[start : start + 500]
+                    placeholders = ",".join(["?"] * len(part))
+                    rows = conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                        (model, *part),
+                    ).fetchall()
+                    blobs.update({row[0]: row[1] for row in rows})
+                if blobs:
+                    with conn:
+                        conn.executemany(
+                            "UPDATE embeddings SET used_at = ? WHERE model = ? AND text_hash = ?",
+                            [(time.time(), model, h) for h in blobs],
+                        )
+        except sqlite3.Error:
+            return found
+        for i, h in enumerate(hashes):
+            if h in blobs:
+                found[i] = _unpack(blobs[h])
+        hit_count = sum(1 for v in found if v is not None)
+        self.hits += hit_count
+        self.misses += len(texts) - hit_count
+        return found
+
+    def store(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        if not self.enabled or not texts:
+            return
+        now = time.time()
+        rows = [(model, text_hash(t), len(v), _pack(v), now) for t, v in zip(texts, vectors)]
+        try:
+            with self._lock:
+                conn = self._connection()
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector, used_at) VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    if self._rows is not None:
+                        self._rows += len(rows)
+                    if self._rows is None or self._rows > self.max_rows:
+                        self._rows = int(conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0])
+                    if self._rows > self.max_rows:
+                        # Evict down to 90% so a full cache is not trimmed on every store.
+                        excess = self._rows - int(self.max_rows * 0.9)
+                        conn.execute(
+                            "DELETE FROM embeddings WHERE (model, text_hash) IN "
+                            "(SELECT model, text_hash FROM embeddings ORDER BY used_at LIMIT ?)",
+                            (excess,),
+                        )
+                        self._rows -= excess
+        except sqlite3.Error:
+            # The transaction rolled back; count again next time.
+            self._rows = None
+            return
@@ -0,0 +1,129 @@
+import hashlib
+import importlib.util
+import tarfile
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .embedding_cache import EmbeddingCache
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Same archive and cache location chromadb's DefaultEmbeddingFunction uses, so a model
+# already downloaded by Chroma is reused and vectors match across providers.
+MODEL_URL = "https://chroma-onnx-models.s3.amazonaws.com/all-MiniLM-L6-v2/onnx.tar.gz"
+# chromadb pins the same digest for this archive; anything else is never extracted.
+MODEL_SHA256 = "913d7300ceae3b2dbc2c50d1de4baacab4be7b9380491c27fab7418616a16ec3"
+MODEL_DIR = Path.home() / ".cache" / "chroma" / "onnx_models" / DEFAULT_EMBEDDING_MODEL
+MAX_TOKENS = 256
+
+
+def _installed(*modules: str) -> bool:
+    return all(importlib.util.find_spec(m) is not None for m in modules)
+
+
+def _download_model(archive: Path) -> None:
+    """Fetch ``MODEL_URL`` to ``archive``, keeping it only if its SHA-256 matches."""
+    partial = archive.with_name(archive.name + ".part")
+    digest = hashlib.sha256()
+    try:
+        with urllib.request.urlopen(MODEL_URL, timeout=60) as response, open(partial, "wb") as out:
+            for block in iter(lambda: response.read(1 << 20), b""):
+                digest.update(block)
+                out.write(block)
+        if digest.hexdigest() != MODEL_SHA256:
+            raise RuntimeError(f"{MODEL_URL} does not match the expected SHA-256; refusing to use it")
+        partial.replace(archive)
+    finally:
+        partial.unlink(missing_ok=True)
+
+
+class Embedder:
+    """Text embedding shared by every vector provider (pgvector, numpy and Chroma).
+
+    Runs all-MiniLM-L6-v2 directly through onnxruntime and tokenizers when they are
+    installed, skipping the chromadb import; otherwise falls back to chromadb's
+    bundled function. The model is loaded on first use, and only for texts missing
+    from the ``EmbeddingCache``. The ONNX archive is checked against ``MODEL_SHA256``
+    before it is unpacked.
+    """
+
+    def __init__(self, settings: Dict[str, str]):
+        self.settings = settings
+        self.model_name = DEFAULT_EMBEDDING_MODEL
+        self.cache = EmbeddingCache(settings)
+        self._fn = None
+        self._error: Optional[str] = None
+        if _installed("numpy", "onnxruntime", "tokenizers"):
+            self._backend = "onnx"
+        elif _installed("chromadb"):
+            self._backend = "chromadb"
+        else:
+            self._backend = None
+            self._error = "install numpy, onnxruntime and tokenizers (or chromadb) to compute embeddings"
+
+    @property
+    def available(self) -> bool:
+        return self._backend is not None
+
+    @property
+    def error(self) -> Optional[str]:
+        return self._error
+
+    def _load(self):
+        if self._fn is None:
+            self._fn = self._load_onnx() if self._backend == "onnx" else self._load_chromadb()
+        return self._fn
+
+    def _load_chromadb(self):
+        from chromadb.utils import embedding_functions  # type: ignore
+
+        return embedding_functions.DefaultEmbeddingFunction()
+
+    def _load_onnx(self):
+        import numpy as np  # type: ignore
+        import onnxruntime  # type: ignore
+        from tokenizers import Tokenizer  # type: ignore
+
+        model_dir = MODEL_DIR / "onnx"
+        if not (model_dir / "model.onnx").exists():
+            MODEL_DIR.mkdir(parents=True, exist_ok=True)
+            archive = MODEL_DIR / "onnx.tar.gz"
+            _download_model(archive)
+            with tarfile.open(archive, "r:gz") as tar:
+                tar.extractall(MODEL_DIR, filter="data")
+            archive.unlink()
+
+        tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        tokenizer.enable_truncation(max_length=MAX_TOKENS)
+        tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        session = onnxruntime.InferenceSession(str(model_dir / "model.onnx"), providers=["CPUExecutionProvider"])
+
+        def embed(texts: List[str]):
+            encoded = tokenizer.encode_batch(texts)
+            input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+            hidden = session.run(
+                None,
+                {"input_ids": input_ids, "attention_mask": mask, "token_type_ids": np.zeros_like(input_ids)},
+            )[0]
+            # Mean pooling over real tokens, then L2 normalisation (sentence-transformers recipe).
+            weights = mask[:, :, None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+            return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+        return embed
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if self._backend is None:
+            raise RuntimeError(self._error or "embedding model unavailable")
+        vectors = self.cache.lookup(self.model_name, texts)
+        missing = list(dict.fromkeys(texts[i] for i, vector in enumerate(vectors) if vector is None))
+        if missing:
+            computed = [[float(x) for x in vector] for vector in self._load()(missing)]
+            self.cache.store(self.model_name, missing, computed)
+            by_text = dict(zip(missing, computed))
+            vectors = [vector if vector is not None else by_text[text] for text, vector in zip(texts, vectors)]
+        return vectors
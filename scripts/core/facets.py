@@ -0,0 +1,168 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .postgres import pipeline
+from .records import csv_or_json_list
+
+# Side tables normalizing the JSON/CSV list columns of ``memories``: one row per
+# (memory, value), so concept/file/tag filters and facet counts are index lookups.
+FACET_TABLES = ("memory_concepts", "memory_files", "memory_tags")
+
+# Facet kind -> (table, value column).
+FACET_KINDS = {
+    "concept": ("memory_concepts", "concept"),
+    "file": ("memory_files", "path"),
+    "tag": ("memory_tags", "tag"),
+}
+
+FILE_ACCESS_READ = "read"
+FILE_ACCESS_MODIFIED = "modified"
+
+_BACKFILL_BATCH = 1000
+
+
+def normalize_tag(tag: str) -> str:
+    # Tags matched with LIKE before, which is case-insensitive; keep that for lookups.
+    return tag.strip().lower()
+
+
+def split_tags(raw) -> List[str]:
+    return list(dict.fromkeys(t for t in (normalize_tag(v) for v in csv_or_json_list(raw)) if t))
+
+
+def facet_rows(
+    memory_id: int, record: Dict[str, object]
+) -> Tuple[List[Tuple[int, str, str]], List[Tuple[int, str, str, str]], List[Tuple[int, str, str]]]:
+    """Side-table rows for one memory: (concepts, files, tags)."""
+    project = str(record["project"])
+    concepts = [(memory_id, project, c) for c in dict.fromkeys(csv_or_json_list(record.get("concepts")))]
+    files = [
+        (memory_id, project, path, access)
+        for column, access in (("files_read", FILE_ACCESS_READ), ("files_modified", FILE_ACCESS_MODIFIED))
+        for path in dict.fromkeys(csv_or_json_list(record.get(column)))
+    ]
+    tags = [(memory_id, project, t) for t in split_tags(record.get("tags"))]
+    return concepts, files, tags
+
+
+def _executemany(conn, dialect: str, sql: str, rows: Sequence[tuple]) -> None:
+    if not rows:
+        return
+    if dialect == "sqlite":
+        conn.executemany(sql, rows)
+        return
+    with conn.cursor() as cur:
+        cur.executemany(sql, rows)
+
+
+def insert_facets(conn, dialect: str, records: Sequence[Dict[str, object]], ids: Sequence[int]) -> None:
+    """Write side-table rows for freshly inserted memories; call inside the insert transaction."""
+    concepts: List[tuple] = []
+    files: List[tuple] = []
+    tags: List[tuple] = []
+    for record, memory_id in zip(records, ids):
+        c, f, t = facet_rows(int(memory_id), record)
+        concepts.extend(c)
+        files.extend(f)
+        tags.extend(t)
+
+    if dialect == "sqlite":
+        insert, conflict, mark = "INSERT OR IGNORE", "", "?"
+    else:
+        insert, conflict, mark = "INSERT", " ON CONFLICT DO NOTHING", "%s"
+    _executemany(
+        conn,
+        dialect,
+        f"{insert} INTO memory_concepts (memory_id, project, concept) VALUES ({mark}, {mark}, {mark}){conflict}",
+        concepts,
+    )
+    _executemany(
+        conn,
+        dialect,
+        f"{insert} INTO memory_files (memory_id, project, path, access) "
+        f"VALUES ({mark}, {mark}, {mark}, {mark}){conflict}",
+        files,
+    )
+    _executemany(
+        conn,
+        dialect,
+        f"{insert} INTO memory_tags (memory_id, project, tag) VALUES ({mark}, {mark}, {mark}){conflict}",
+        tags,
+    )
+
+
+def backfill_facets(conn, dialect: str, rebuild: bool = False) -> int:
+    """Populate the side tables from the list columns of existing memories.
+
+    Without ``rebuild`` only memories past the highest id already present are read,
+    so rerunning the migration is cheap. Returns the number of memories processed.
+    """
+    mark = "?" if dialect == "sqlite" else "%s"
+    if rebuild:
+        for table in FACET_TABLES:
+            conn.execute(f"DELETE FROM {table}")
+        last_id = 0
+    else:
+        last_id = max(
+            int(conn.execute(f"SELECT COALESCE(MAX(memory_id), 0) FROM {table}").fetchone()[0])
+            for table in FACET_TABLES
+        )
+
+    done = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, project, tags, concepts, files_read, files_modified FROM memories "
+            f"WHERE id > {mark} ORDER BY id LIMIT {mark}",
+            (last_id, _BACKFILL_BATCH),
+        ).fetchall()
+        if not rows:
+            return done
+        columns = ("id", "project", "tags", "concepts", "files_read", "files_modified")
+        records = [dict(zip(columns, tuple(row))) for row in rows]
+        insert_facets(conn, dialect, records, [r["id"] for r in records])
+        last_id = int(records[-1]["id"])
+        done += len(records)
+
+
+def _facet_query(
+    dialect: str, project: str, kind: str, limit: int, prefix: Optional[str]
+) -> Tuple[str, Tuple[object, ...]]:
+    if kind not in FACET_KINDS:
+        raise ValueError(f"facet must be one of {', '.join(sorted(FACET_KINDS))}")
+    table, column = FACET_KINDS[kind]
+    mark = "?" if dialect == "sqlite" else "%s"
+    where = [f"project = {mark}"]
+    params: List[object] = [project]
+    if prefix:
+        where.append(f"{column} LIKE {mark} ESCAPE '\\'")
+        params.append(prefix.replace("%", r"\%").replace("_", r"\_") + "%")
+    # A file read and modified by the same memory has two rows; count it once.
+    count = "COUNT(DISTINCT memory_id)" if kind == "file" else "COUNT(*)"
+    sql = (
+        f"SELECT {column} AS value, {count} AS memories FROM {table} "
+        f"WHERE {' AND '.join(where)} "
+        f"GROUP BY {column} ORDER BY memories DESC, value LIMIT {mark}"
+    )
+    params.append(limit)
+    return sql, tuple(params)
+
+
+def _facet_rows(cursor) -> List[Dict[str, object]]:
+    return [{"value": row[0], "memories": int(row[1])} for row in cursor.fetchall()]
+
+
+def facet_counts(
+    conn, dialect: str, project: str, kind: str, limit: int = 20, prefix: Optional[str] = None
+) -> List[Dict[str, object]]:
+    """Most frequent values of one facet in a project, counted in memories."""
+    return _facet_rows(conn.execute(*_facet_query(dialect, project, kind, limit, prefix)))
+
+
+def project_facets(
+    conn, dialect: str, project: str, kinds: Sequence[str] = (), limit: int = 20, prefix: Optional[str] = None
+) -> Dict[str, List[Dict[str, object]]]:
+    """Top values per facet kind (all kinds by default) for one project."""
+    queries = [(kind, _facet_query(dialect, project, kind, limit, prefix)) for kind in (kinds or FACET_KINDS)]
+    # Send every count before reading any, so Postgres answers them in one round trip.
+    with pipeline(conn, dialect):
+        cursors = [(kind, conn.execute(*query)) for kind, query in queries]
+    return {kind: _facet_rows(cursor) for kind, cursor in cursors}
@@ -0,0 +1,40 @@
+import re
+from typing import Optional
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# Postgres text search config for the generated tsvector columns. "simple" skips
+# stemming and stop words, matching the unicode61 tokenizer used by SQLite FTS5.
+POSTGRES_TS_CONFIG = "simple"
+
+
+def build_match_expression(query: Optional[str]) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression (all terms, quoted)."""
+    if not query:
+        return None
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    return " ".join('"' + token.replace('"', '""') + '"' for token in tokens)
+
+
+def sqlite_table_exists(conn, name: str) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row is not None
+
+
+def postgres_column_exists(conn, table: str, column: str) -> bool:
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s",
+            (table, column),
+        )
+        return cur.fetchone() is not None
+
+
+def postgres_table_exists(conn, table: str) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+        row = cur.fetchone()
+        return bool(row and row[0])
@@ -0,0 +1,114 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .config import get_int
+
+DEFAULT_RRF_K = 60
+DEFAULT_VECTOR_WEIGHT = 0.5
+
+# Shared across searches so hybrid queries do not pay for thread start-up each time.
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="codex-mem-search")
+
+
+def submit(fn: Callable, *args) -> Future:
+    """Run ``fn`` on the search thread pool, e.g. the vector lookup beside a lexical one."""
+    return _EXECUTOR.submit(fn, *args)
+
+
+def fusion_settings(settings: Dict[str, str]) -> Dict[str, object]:
+    method = str(settings.get("CODEX_MEM_HYBRID_FUSION", "rrf")).strip().lower()
+    try:
+        weight = float(settings.get("CODEX_MEM_HYBRID_VECTOR_WEIGHT", DEFAULT_VECTOR_WEIGHT))
+    except ValueError:
+        weight = DEFAULT_VECTOR_WEIGHT
+    return {
+        "method": method if method in {"rrf", "weighted"} else "rrf",
+        "rrf_k": max(1, get_int(settings, "CODEX_MEM_HYBRID_RRF_K", DEFAULT_RRF_K)),
+        "vector_weight": min(1.0, max(0.0, weight)),
+    }
+
+
+def rank_lexical(rows: Sequence[Dict[str, object]]) -> List[Dict[str, object]]:
+    """Attach ``scores.lexical_rank`` (and ``scores.lexical`` when the engine scored it)."""
+    out = []
+    for rank, row in enumerate(rows, start=1):
+        row = dict(row)
+        scores: Dict[str, object] = {"lexical_rank": rank}
+        raw = row.pop("lexical_score", None)
+        if raw is not None:
+            scores["lexical"] = float(raw)
+        row["scores"] = {**row.get("scores", {}), **scores}
+        out.append(row)
+    return out
+
+
+def vector_scored(rows: Sequence[Dict[str, object]], distances: Dict[int, float]) -> List[Dict[str, object]]:
+    """Attach ``scores.vector_rank`` and ``scores.vector_distance`` to hydrated vector hits."""
+    out = []
+    for rank, row in enumerate(rows, start=1):
+        row = dict(row)
+        scores: Dict[str, object] = {"vector_rank": rank}
+        distance = distances.get(int(row["id"]))
+        if distance is not None:
+            scores["vector_distance"] = round(float(distance), 6)
+        row["scores"] = {**row.get("scores", {}), **scores}
+        out.append(row)
+    return out
+
+
+def _normalize(values: Dict[int, float]) -> Dict[int, float]:
+    if not values:
+        return {}
+    low, high = min(values.values()), max(values.values())
+    if high == low:
+        return {key: 1.0 for key in values}
+    return {key: (value - low) / (high - low) for key, value in values.items()}
+
+
+def _source_scores(rows: Sequence[Dict[str, object]], score_key: str, rank_key: str, sign: float) -> Dict[int, float]:
+    # Engine scores when every row has one, otherwise rank position (LIKE matches are unscored).
+    if rows and all(score_key in row["scores"] for row in rows):
+        return _normalize({int(row["id"]): sign * float(row["scores"][score_key]) for row in rows})
+    return _normalize({int(row["id"]): -float(row["scores"][rank_key]) for row in rows})
+
+
+def fuse(
+    lexical: Sequence[Dict[str, object]],
+    vector: Sequence[Dict[str, object]],
+    limit: int,
+    method: str = "rrf",
+    rrf_k: int = DEFAULT_RRF_K,
+    vector_weight: float = DEFAULT_VECTOR_WEIGHT,
+) -> List[Dict[str, object]]:
+    """Merge ranked lexical and vector rows into one list carrying per-source scores.
+
+    ``rrf`` sums 1 / (k + rank) over the lists a row appears in. ``weighted`` blends
+    min-max normalised engine scores: ``vector_weight`` for similarity, the rest for
+    the lexical score. Rows must come from ``rank_lexical`` or carry
+    ``scores.vector_rank``/``scores.vector_distance``.
+    """
+    merged: Dict[int, Dict[str, object]] = {}
+    for row in list(lexical) + list(vector):
+        row_id = int(row["id"])
+        if row_id in merged:
+            merged[row_id]["scores"] = {**merged[row_id]["scores"], **row["scores"]}
+        else:
+            merged[row_id] = dict(row)
+
+    if method == "weighted":
+        lexical_part = _source_scores(lexical, "lexical", "lexical_rank", 1.0)
+        vector_part = _source_scores(vector, "vector_distance", "vector_rank", -1.0)
+        for row_id, row in merged.items():
+            fused = vector_weight * vector_part.get(row_id, 0.0) + (1.0 - vector_weight) * lexical_part.get(row_id, 0.0)
+            row["scores"]["fused"] = round(fused, 6)
+    else:
+        for row in merged.values():
+            fused = 0.0
+            for rank_key in ("lexical_rank", "vector_rank"):
+                rank: Optional[int] = row["scores"].get(rank_key)
+                if rank is not None:
+                    fused += 1.0 / (rrf_k + rank)
+            row["scores"]["fused"] = round(fused, 6)
+
+    ordered = sorted(merged.values(), key=lambda r: r["scores"]["fused"], reverse=True)
+    return ordered[:limit]
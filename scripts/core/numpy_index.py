@@ -0,0 +1,247 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .embeddings import Embedder
+from .sync_state import Record
+from .vector_index import Condition, VectorIndex, empty_result
+
+MIN_CAPACITY = 1024
+_FREE = -1
+# Queries scored per matrix product in a batch lookup.
+QUERY_BLOCK = 16
+
+# Columns of the int64 row matrix. Memories put their type in LABEL_COL, turns their role.
+ID_COL, PROJECT_COL, SESSION_COL, LABEL_COL, EPOCH_COL = range(5)
+ROW_WIDTH = 5
+_LABEL_COLUMNS = {"project": PROJECT_COL, "session_id": SESSION_COL, "type": LABEL_COL, "role": LABEL_COL}
+
+
+class _Collection:
+    """One collection on disk: float32 vectors, row metadata and a small JSON header.
+
+    ``<name>.npy`` holds a (capacity, dim) float32 matrix of unit vectors and
+    ``<name>.rows.npy`` a (capacity, 5) int64 matrix of (row id, project code,
+    session code, type/role code, created_at_epoch); free slots have row id -1.
+    ``<name>.json`` records the used
+    slot count, the dimension and the label table the codes index into. Both
+    matrices are memory-mapped, so opening a collection reads only the header.
+    Writers hold an exclusive ``flock``; files are only replaced atomically.
+    """
+
+    def __init__(self, directory: Path, name: str):
+        self.vectors_path = directory / f"{name}.npy"
+        self.rows_path = directory / f"{name}.rows.npy"
+        self.header_path = directory / f"{name}.json"
+        self.lock_path = directory / f"{name}.lock"
+        self.header: Dict[str, object] = {"version": 0, "count": 0, "dim": 0, "labels": [""]}
+        self.vectors = None
+        self.rows = None
+        self.slots: Dict[int, int] = {}
+        self.free: List[int] = []
+        self.codes: Dict[str, int] = {"": 0}
+        self._loaded_version: Optional[int] = None
+
+    @contextmanager
+    def locked(self):
+        with open(self.lock_path, "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def refresh(self, np) -> None:
+        """Re-open the memory maps if another process changed the collection."""
+        try:
+            header = json.loads(self.header_path.read_text())
+        except FileNotFoundError:
+            return
+        if header["version"] == self._loaded_version:
+            return
+        self.header = header
+        self.vectors = np.load(self.vectors_path, mmap_mode="r+")
+        self.rows = np.load(self.rows_path, mmap_mode="r+")
+        count = int(header["count"])
+        ids = self.rows[:count, ID_COL]
+        self.slots = {int(row_id): slot for slot, row_id in enumerate(ids.tolist()) if row_id != _FREE}
+        self.free = np.flatnonzero(ids == _FREE).tolist()
+        self.codes = {label: code for code, label in enumerate(header["labels"])}
+        self._loaded_version = int(header["version"])
+
+    def code(self, label: str) -> int:
+        if label not in self.codes:
+            self.codes[label] = len(self.header["labels"])
+            self.header["labels"].append(label)
+        return self.codes[label]
+
+    def reserve(self, np, needed: int, dim: int) -> None:
+        capacity = 0 if self.vectors is None else int(self.vectors.shape[0])
+        if needed <= capacity:
+            return
+        new_capacity = max(MIN_CAPACITY, capacity * 2, needed)
+        count = int(self.header["count"])
+        vectors = np.lib.format.open_memmap(
+            str(self.vectors_path) + ".tmp", mode="w+", dtype=np.float32, shape=(new_capacity, dim)
+        )
+        rows = np.lib.format.open_memmap(
+            str(self.rows_path) + ".tmp", mode="w+", dtype=np.int64, shape=(new_capacity, ROW_WIDTH)
+        )
+        rows[:, ID_COL] = _FREE
+        if count:
+            vectors[:count] = self.vectors[:count]
+            rows[:count] = self.rows[:count]
+        vectors.flush()
+        rows.flush()
+        os.replace(str(self.vectors_path) + ".tmp", self.vectors_path)
+        os.replace(str(self.rows_path) + ".tmp", self.rows_path)
+        self.vectors, self.rows = vectors, rows
+        self.header["dim"] = dim
+
+    def commit(self) -> None:
+        self.vectors.flush()
+        self.rows.flush()
+        self.header["version"] = int(self.header["version"]) + 1
+        tmp = str(self.header_path) + ".tmp"
+        with open(tmp, "w") as handle:
+            json.dump(self.header, handle)
+        os.replace(tmp, self.header_path)
+        self._loaded_version = int(self.header["version"])
+
+
+class NumpyIndex(VectorIndex):
+    """In-process flat index: exact cosine top-k over memory-mapped ``.npy`` files.
+
+    Needs only numpy plus an embedding backend (see ``Embedder``), so single-user
+    installs avoid chromadb's import time and its SQLite metadata store. Search is
+    a brute-force matrix-vector product, which stays fast into the low millions of
+    rows at 384 dimensions.
+    """
+
+    def __init__(self, settings: Dict[str, str]):
+        super().__init__(settings)
+        self.data_dir = Path(settings.get("CODEX_MEM_DATA_DIR", str(Path.home() / ".codex-mem")))
+        self.vector_dir = self.data_dir / "vector-npy"
+        self.embedder = Embedder(settings)
+        self._error = self.embedder.error
+        self._np = None
+        self._collections: Dict[str, _Collection] = {}
+        try:
+            import numpy  # type: ignore
+
+            self._np = numpy
+            self.vector_dir.mkdir(parents=True, exist_ok=True)
+        except Exception as exc:
+            self._error = str(exc)
+
+    @property
+    def available(self) -> bool:
+        return self._np is not None and self.embedder.available
+
+    def sync_state_name(self, kind: str) -> str:
+        return "numpy:" + self.collection_for(kind)
+
+    def _collection(self, kind: str) -> _Collection:
+        name = self.collection_for(kind)
+        if name not in self._collections:
+            self._collections[name] = _Collection(self.vector_dir, name)
+        collection = self._collections[name]
+        collection.refresh(self._np)
+        return collection
+
+    def _upsert(self, kind: str, records: List[Record]) -> None:
+        np = self._np
+        # Embed outside the lock; only the slot writes need to be serialized.
+        matrix = np.asarray(self.embedder.embed([r[1] for r in records]), dtype=np.float32)
+        matrix /= np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+
+        collection = self._collection(kind)
+        with collection.locked():
+            collection.refresh(np)
+            new = sum(1 for r in records if int(r[2]["sqlite_id"]) not in collection.slots)
+            count = int(collection.header["count"])
+            collection.reserve(np, count + max(0, new - len(collection.free)), matrix.shape[1])
+            for record, vector in zip(records, matrix):
+                meta = record[2]
+                row_id = int(meta["sqlite_id"])
+                slot = collection.slots.get(row_id)
+                if slot is None:
+                    if collection.free:
+                        slot = collection.free.pop()
+                    else:
+                        slot = count
+                        count += 1
+                    collection.slots[row_id] = slot
+                collection.vectors[slot] = vector
+                collection.rows[slot] = (
+                    row_id,
+                    collection.code(str(meta.get("project", ""))),
+                    collection.code(str(meta.get("session_id", ""))),
+                    collection.code(str(meta.get("type", meta.get("role", "")))),
+                    int(meta.get("created_at_epoch", 0)),
+                )
+            collection.header["count"] = count
+            collection.commit()
+
+    def _delete(self, kind: str, row_ids: List[int]) -> None:
+        collection = self._collection(kind)
+        if collection.rows is None:
+            return
+        with collection.locked():
+            collection.refresh(self._np)
+            for row_id in row_ids:
+                slot = collection.slots.pop(row_id, None)
+                if slot is not None:
+                    collection.rows[slot, ID_COL] = _FREE
+                    collection.free.append(slot)
+            collection.commit()
+
+    def _nearest(self, kind: str, query: str, limit: int, where: List[Condition]) -> Dict[str, object]:
+        return self._nearest_many(kind, [query], limit, where)[0]
+
+    def _nearest_many(self, kind: str, queries: List[str], limit: int, where: List[Condition]) -> List[Dict[str, object]]:
+        np = self._np
+        collection = self._collection(kind)
+        count = int(collection.header["count"])
+        if collection.vectors is None or not count:
+            return [empty_result() for _ in queries]
+
+        rows = collection.rows[:count]
+        mask = rows[:, ID_COL] != _FREE
+        for key, op, value in where:
+            if key == "created_at_epoch":
+                mask &= rows[:, EPOCH_COL] >= int(value) if op == ">=" else rows[:, EPOCH_COL] <= int(value)
+            elif key in _LABEL_COLUMNS and op == "=":
+                code = collection.codes.get(str(value))
+                if code is None:
+                    return [empty_result() for _ in queries]
+                mask &= rows[:, _LABEL_COLUMNS[key]] == code
+            # Concept flags are not stored here; callers re-check them in SQL.
+        candidates = int(mask.sum())
+        if not candidates:
+            return [empty_result() for _ in queries]
+
+        q = np.asarray(self.embedder.embed(queries), dtype=np.float32)
+        q /= np.clip(np.linalg.norm(q, axis=1, keepdims=True), 1e-12, None)
+        k = min(limit, candidates)
+        results = []
+        # One matrix product scores a block of queries in a single pass over the vectors;
+        # blocks bound the (count x block) score matrix.
+        for start in range(0, len(queries), QUERY_BLOCK):
+            scores = collection.vectors[:count] @ q[start : start + QUERY_BLOCK].T
+            scores[~mask] = -np.inf
+            for column in scores.T:
+                top = np.argpartition(-column, k - 1)[:k]
+                top = top[np.argsort(-column[top])]
+                ids = [int(i) for i in rows[top, ID_COL]]
+                results.append(
+                    {
+                        "ids": ids,
+                        "distances": [float(1.0 - s) for s in column[top]],
+                        "metadatas": [{"sqlite_id": row_id} for row_id in ids],
+                    }
+                )
+        return results
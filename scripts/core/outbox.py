@@ -0,0 +1,128 @@
+import time
+from typing import Dict, List, Optional, Sequence
+
+from .vector import vector_supported
+from .vector_index import MEMORY_KIND, TURN_KIND
+
+_HYDRATE_SQL = {
+    MEMORY_KIND: (
+        "SELECT id, project, type, tags, summary, details, concepts, created_at_epoch "
+        "FROM memories WHERE id IN ({})"
+    ),
+    TURN_KIND: (
+        "SELECT id, project, session_id, role, content, context_json, created_at_epoch "
+        "FROM conversation_turns WHERE id IN ({})"
+    ),
+}
+
+
+def indexing_mode(settings: Dict[str, str], dialect: str) -> str:
+    """Return how new rows reach the vector index: ``off``, ``sync`` or ``async``."""
+    if not vector_supported(settings, dialect):
+        return "off"
+    mode = str(settings.get("CODEX_MEM_VECTOR_INDEXING", "sync")).strip().lower()
+    return "async" if mode == "async" else "sync"
+
+
+def enqueue(conn, dialect: str, kind: str, row_ids: Sequence[int], project: str) -> None:
+    """Queue rows for embedding; call inside the transaction that wrote them."""
+    if not row_ids:
+        return
+    now = int(time.time())
+    values = [(kind, int(row_id), project, now) for row_id in row_ids]
+    if dialect == "sqlite":
+        conn.executemany(
+            "INSERT OR IGNORE INTO vector_outbox (kind, row_id, project, enqueued_at_epoch) VALUES (?, ?, ?, ?)",
+            values,
+        )
+        return
+    with conn.cursor() as cur:
+        cur.executemany(
+            "INSERT INTO vector_outbox (kind, row_id, project, enqueued_at_epoch) VALUES (%s, %s, %s, %s) "
+            "ON CONFLICT (kind, row_id) DO NOTHING",
+            values,
+        )
+
+
+class VectorOutbox:
+    def __init__(self, conn, dialect: str):
+        self.conn = conn
+        self.dialect = dialect
+        self.mark = "?" if dialect == "sqlite" else "%s"
+
+    def _fetchall(self, sql: str, params: Sequence[object]) -> List[Dict[str, object]]:
+        if self.dialect == "sqlite":
+            return [dict(r) for r in self.conn.execute(sql, tuple(params)).fetchall()]
+        with self.conn.cursor() as cur:
+            cur.execute(sql, tuple(params))
+            columns = [c.name for c in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    def _execute(self, sql: str, params: Sequence[object]) -> None:
+        if self.dialect == "sqlite":
+            with self.conn:
+                self.conn.execute(sql, tuple(params))
+            return
+        with self.conn.transaction():
+            self.conn.execute(sql, tuple(params))
+
+    def pending_count(self, project: Optional[str] = None, kind: Optional[str] = None) -> int:
+        where: List[str] = []
+        params: List[object] = []
+        if project:
+            where.append(f"project = {self.mark}")
+            params.append(project)
+        if kind:
+            where.append(f"kind = {self.mark}")
+            params.append(kind)
+        sql = "SELECT COUNT(*) AS n FROM vector_outbox" + (" WHERE " + " AND ".join(where) if where else "")
+        try:
+            rows = self._fetchall(sql, params)
+        except Exception:
+            # Databases initialized before the outbox existed have nothing pending.
+            return 0
+        return int(rows[0]["n"]) if rows else 0
+
+    def drain(self, vectors, batch_size: int, max_batches: Optional[int] = None, cache=None) -> Dict[str, int]:
+        """Embed queued rows oldest first, deleting each batch once the vector index accepted it.
+
+        Newly indexed rows change vector results, so their projects are invalidated in ``cache``.
+        """
+        stats = {"indexed": 0, "dropped": 0, "batches": 0}
+        while max_batches is None or stats["batches"] < max_batches:
+            entries = self._fetchall(
+                f"SELECT id, kind, row_id, project FROM vector_outbox ORDER BY id LIMIT {self.mark}", [batch_size]
+            )
+            if not entries:
+                break
+
+            entry_ids = [int(e["id"]) for e in entries]
+            try:
+                for kind in (MEMORY_KIND, TURN_KIND):
+                    row_ids = [int(e["row_id"]) for e in entries if e["kind"] == kind]
+                    if not row_ids:
+                        continue
+                    placeholders = ",".join([self.mark] * len(row_ids))
+                    rows = self._fetchall(_HYDRATE_SQL[kind].format(placeholders), row_ids)
+                    # Rows deleted after they were queued have nothing left to embed.
+                    stats["dropped"] += len(row_ids) - len(rows)
+                    if kind == MEMORY_KIND:
+                        vectors.sync_memories(rows)
+                    else:
+                        vectors.sync_turns(rows)
+                    stats["indexed"] += len(rows)
+            except Exception as exc:
+                placeholders = ",".join([self.mark] * len(entry_ids))
+                self._execute(
+                    "UPDATE vector_outbox SET attempts = attempts + 1, "
+                    f"last_error = {self.mark} WHERE id IN ({placeholders})",
+                    [str(exc)[:500], *entry_ids],
+                )
+                raise
+
+            placeholders = ",".join([self.mark] * len(entry_ids))
+            self._execute(f"DELETE FROM vector_outbox WHERE id IN ({placeholders})", entry_ids)
+            if cache is not None:
+                cache.invalidate(e["project"] for e in entries)
+            stats["batches"] += 1
+        return stats
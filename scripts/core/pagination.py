@@ -0,0 +1,34 @@
+import base64
+import json
+from typing import Dict, Optional, Sequence, Tuple
+
+# Rows per keyset page when streaming every match.
+STREAM_PAGE_SIZE = 500
+
+
+def encode_cursor(row: Dict[str, object]) -> str:
+    """Opaque position after ``row`` in newest-first (created_at_epoch, id) order."""
+    raw = json.dumps([int(row["created_at_epoch"]), int(row["id"])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        epoch, row_id = json.loads(raw)
+        return int(epoch), int(row_id)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def next_cursor(rows: Sequence[Dict[str, object]], limit: int) -> Optional[str]:
+    # A full page may be followed by more rows; a short one is the last.
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1])
+
+
+def keyset_condition(prefix: str, mark: str) -> str:
+    """Rows strictly after a cursor position, as a row-value comparison that the
+    ``(..., created_at_epoch DESC, id DESC)`` indexes serve directly."""
+    return f"({prefix}created_at_epoch, {prefix}id) < ({mark}, {mark})"
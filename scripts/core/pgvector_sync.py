@@ -0,0 +1,141 @@
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from .embeddings import Embedder
+from .postgres import prepare_enabled
+from .sync_state import Record
+from .vector_index import Condition, VectorIndex
+
+DEFAULT_VECTOR_DIM = 384
+
+_FILTER_COLUMNS = {"project", "session_id", "type", "role", "created_at_epoch"}
+
+
+def vector_literal(vector: Sequence[float]) -> str:
+    return "[" + ",".join(f"{x:.7g}" for x in vector) + "]"
+
+
+class PgVectorSync(VectorIndex):
+    """Vector index stored in ``embedding`` columns on the Postgres tables themselves.
+
+    Search orchestrators skip ``query``/``query_turns`` and rank with ``<=>`` inside
+    their own filtered SQL, so metadata filters and ANN ordering run in one round trip.
+    """
+
+    in_database = True
+
+    def __init__(self, settings: Dict[str, str], conn):
+        super().__init__(settings)
+        self.conn = conn
+        self.collection_name = "memories"
+        self.turns_collection_name = "conversation_turns"
+        self.embedder = Embedder(settings)
+        self.prepare = prepare_enabled(settings)
+        self._error = self.embedder.error
+        self._ready = self.embedder.available and self._has_embedding_columns()
+
+    def _has_embedding_columns(self) -> bool:
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    "SELECT COUNT(*) FROM information_schema.columns "
+                    "WHERE table_name IN ('memories', 'conversation_turns') AND column_name = 'embedding'"
+                )
+                found = int(cur.fetchone()[0])
+        except Exception as exc:
+            self._error = str(exc)
+            return False
+        if found < 2:
+            self._error = "embedding columns missing; run memory_init.py with CODEX_MEM_VECTOR_PROVIDER=pgvector"
+            return False
+        return True
+
+    @property
+    def available(self) -> bool:
+        return self._ready
+
+    def embed_query(self, query: str) -> str:
+        return vector_literal(self.embedder.embed([query])[0])
+
+    def embed_queries(self, queries: Sequence[str]) -> List[str]:
+        """Vector literals for several queries, embedded in one model call."""
+        return [vector_literal(v) for v in self.embedder.embed(list(queries))]
+
+    def _upsert(self, kind: str, records: List[Record]) -> None:
+        vectors = self.embedder.embed([r[1] for r in records])
+        with self.conn.transaction():
+            with self.conn.cursor() as cur:
+                cur.executemany(
+                    f"UPDATE {self.collection_for(kind)} SET embedding = %s::vector WHERE id = %s",
+                    [(vector_literal(v), int(r[2]["sqlite_id"])) for r, v in zip(records, vectors)],
+                )
+
+    def _delete(self, kind: str, row_ids: List[int]) -> None:
+        # One array parameter: a fixed statement however many ids, and no bind limit.
+        with self.conn.transaction():
+            self.conn.execute(
+                f"UPDATE {self.collection_for(kind)} SET embedding = NULL WHERE id = ANY(%s)", (list(row_ids),)
+            )
+
+    def _nearest(self, kind: str, query: str, limit: int, where: List[Condition]) -> Dict[str, object]:
+        return self._nearest_many(kind, [query], limit, where)[0]
+
+    def _nearest_many(self, kind: str, queries: List[str], limit: int, where: List[Condition]) -> List[Dict[str, object]]:
+        pushed = [(key, op, value) for key, op, value in where if key in _FILTER_COLUMNS]
+        clauses = ["embedding IS NOT NULL", *[f"{key} {op} %s" for key, op, _ in pushed]]
+        sql = (
+            f"SELECT id, embedding <=> %s::vector AS distance FROM {self.collection_for(kind)} "
+            f"WHERE {' AND '.join(clauses)} ORDER BY embedding <=> %s::vector LIMIT %s"
+        )
+        results = []
+        # One model call for every query; each still gets its own index scan.
+        for literal in self.embed_queries(queries):
+            with self.conn.cursor() as cur:
+                cur.execute(sql, (literal, *[value for _, _, value in pushed], literal, limit), prepare=self.prepare)
+                fetched = cur.fetchall()
+            results.append(
+                {
+                    "ids": [int(r[0]) for r in fetched],
+                    "distances": [float(r[1]) for r in fetched],
+                    "metadatas": [{"sqlite_id": int(r[0])} for r in fetched],
+                }
+            )
+        return results
+
+    def missing_rows(
+        self,
+        table: str,
+        columns: Sequence[str],
+        filters: Dict[str, Optional[str]],
+        include_embedded: bool = False,
+        limit: int = 0,
+    ) -> Iterator[Dict[str, object]]:
+        """Stream rows without an embedding in id order, one keyset page per transaction.
+
+        Each page is read in its own short transaction, so embeddings written for
+        earlier pages are committed and an interrupted backfill resumes where it stopped.
+        """
+        where = [] if include_embedded else ["embedding IS NULL"]
+        params: List[object] = []
+        for column, value in filters.items():
+            if value:
+                where.append(f"{column} = %s")
+                params.append(value)
+        where.append("id > %s")
+        sql = f"SELECT {', '.join(columns)} FROM {table} WHERE {' AND '.join(where)} ORDER BY id LIMIT %s"
+
+        last_id = 0
+        remaining = limit if limit > 0 else None
+        while remaining is None or remaining > 0:
+            page = self.batch_size if remaining is None else min(self.batch_size, remaining)
+            with self.conn.transaction():
+                with self.conn.cursor() as cur:
+                    cur.execute(sql, (*params, last_id, page))
+                    names = [c.name for c in cur.description]
+                    fetched = cur.fetchall()
+            if not fetched:
+                return
+            for row in fetched:
+                yield dict(zip(names, row))
+            last_id = int(fetched[-1][0])
+            if remaining is not None:
+                remaining -= len(fetched)
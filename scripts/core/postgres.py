@@ -0,0 +1,176 @@
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+from .config import get_bool, get_int
+
+# psycopg's own default: a query is prepared server-side after this many executions.
+DEFAULT_PREPARE_THRESHOLD = 5
+
+_pipeline_supported: Optional[bool] = None
+
+
+def prepare_enabled(settings: Dict[str, str]) -> bool:
+    """Whether fixed query shapes are sent as server-side prepared statements.
+
+    Turn it off behind PgBouncer in transaction mode (before 1.21), which cannot
+    route a prepared statement back to the session that prepared it.
+    """
+    return get_bool(settings, "CODEX_MEM_PG_PREPARE")
+
+
+def connect_kwargs(settings: Dict[str, str], autocommit: bool) -> Dict[str, object]:
+    # Without prepares, also stop psycopg from preparing repeated queries on its own.
+    threshold = DEFAULT_PREPARE_THRESHOLD if prepare_enabled(settings) else None
+    return {"autocommit": autocommit, "prepare_threshold": threshold}
+
+
+def set_read_only(conn) -> None:
+    # ``read_only`` only shapes the BEGIN psycopg sends; autocommit statements need
+    # the session default instead.
+    if conn.autocommit:
+        conn.execute("SET default_transaction_read_only = on")
+    else:
+        conn.read_only = True
+
+
+def pipeline(conn, dialect: str):
+    """Send the statements of a block without waiting for each result (pipeline mode).
+
+    A fetch inside the block still waits for its own result. Needs libpq 14+; elsewhere,
+    and on SQLite, the block runs statement by statement as before.
+    """
+    global _pipeline_supported
+    if dialect == "sqlite":
+        return nullcontext()
+    if _pipeline_supported is None:
+        try:
+            from psycopg import Pipeline  # type: ignore
+
+            _pipeline_supported = bool(Pipeline.is_supported())
+        except Exception:
+            _pipeline_supported = False
+    return conn.pipeline() if _pipeline_supported else nullcontext()
+
+
+def open_pool(target: str, settings: Dict[str, str], read_only: bool = False):
+    try:
+        from psycopg_pool import ConnectionPool  # type: ignore
+    except Exception as exc:
+        raise SystemExit(
+            "psycopg_pool is required for pooled PostgreSQL connections. Install with: pip install psycopg_pool"
+        ) from exc
+
+    def configure(conn) -> None:
+        if read_only:
+            set_read_only(conn)
+
+    options: Dict[str, object] = {}
+    if hasattr(ConnectionPool, "check_connection"):
+        # psycopg_pool 3.2+: test each connection on checkout, so a server restart or an
+        # idle timeout on the database side costs one reconnect instead of a failed request.
+        options["check"] = ConnectionPool.check_connection
+    return ConnectionPool(
+        target,
+        min_size=max(0, get_int(settings, "CODEX_MEM_PG_POOL_MIN_SIZE", 1)),
+        max_size=max(1, get_int(settings, "CODEX_MEM_PG_POOL_MAX_SIZE", 4)),
+        timeout=max(1, get_int(settings, "CODEX_MEM_PG_POOL_TIMEOUT", 30)),
+        max_idle=max(1, get_int(settings, "CODEX_MEM_PG_POOL_MAX_IDLE", 600)),
+        kwargs=connect_kwargs(settings, autocommit=True),
+        configure=configure,
+        name="codex-mem",
+        open=True,
+        **options,
+    )
+
+
+class BufferedResult:
+    """The rows and status of an executed cursor, readable after its connection is released."""
+
+    def __init__(self, cur):
+        self.description = cur.description
+        self.rowcount = cur.rowcount
+        self.statusmessage = getattr(cur, "statusmessage", None)
+        self._rows = list(cur.fetchall()) if cur.description is not None else []
+        self._pos = 0
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        self._pos += 1
+        return self._rows[self._pos - 1]
+
+    def fetchmany(self, size: int = 1):
+        rows = self._rows[self._pos : self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._pos :]
+        self._pos = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+
+class PooledConnection:
+    """Connection-shaped facade over a ``psycopg_pool.ConnectionPool``.
+
+    Orchestrators, stores and vector indexes take it wherever they take a psycopg
+    connection. Each statement or cursor borrows a pooled connection (autocommit) and
+    hands it back when done. A ``transaction()`` or ``pipeline()`` block pins one
+    connection to the calling thread until it exits, so everything inside runs in
+    one session. Threads borrow separately, up to the pool's ``max_size``. Outside
+    such a block, ``execute`` reads the whole result before the connection goes back
+    and returns it as a ``BufferedResult``.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._local = threading.local()
+
+    @contextmanager
+    def _borrow(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        with self.pool.connection() as conn:
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+
+    @contextmanager
+    def transaction(self):
+        with self._borrow() as conn, conn.transaction() as tx:
+            yield tx
+
+    @contextmanager
+    def pipeline(self):
+        with self._borrow() as conn, conn.pipeline() as p:
+            yield p
+
+    @contextmanager
+    def cursor(self, *args, **kwargs):
+        with self._borrow() as conn, conn.cursor(*args, **kwargs) as cur:
+            yield cur
+
+    def execute(self, query, params=None, **kwargs):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            # Pinned by a transaction or pipeline block: the cursor stays valid while it runs.
+            return conn.execute(query, params, **kwargs)
+        # Read the result before the connection goes back to the pool, where another
+        # thread may already be running its own statement on it.
+        with self._borrow() as conn:
+            return BufferedResult(conn.execute(query, params, **kwargs))
+
+    def close(self) -> None:
+        self.pool.close()
@@ -0,0 +1,231 @@
+import atexit
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from .config import get_bool, get_int
+
+DEFAULT_CAPACITY = 512
+DEFAULT_TTL_SECONDS = 300
+CACHE_FILE = "query-cache.sqlite3"
+# Lookups between writes of the hit/miss counters and LRU timestamps.
+FLUSH_EVERY = 32
+
+# Generation row bumped by invalidations that cover every project (e.g. a full backfill).
+_ALL_PROJECTS = "*"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS entries ("
+    "key TEXT PRIMARY KEY, project TEXT NOT NULL, generation INTEGER NOT NULL, "
+    "result_json TEXT NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_entries_used_at ON entries(used_at)",
+    "CREATE INDEX IF NOT EXISTS idx_entries_project ON entries(project)",
+    "CREATE TABLE IF NOT EXISTS generations (project TEXT PRIMARY KEY, generation INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+)
+
+
+def _normalize(value: object) -> object:
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        return value or None
+    return value
+
+
+class QueryCache:
+    """Search results shared by the CLIs and the server, keyed by the normalized request.
+
+    Entries live in ``<data dir>/query-cache.sqlite3`` so repeated searches from
+    separate CLI processes hit too. Each project has a generation counter that
+    writes and vector indexing bump; a result is stored with the generation read
+    before the search ran and only served while it still matches, so a search that
+    raced a write is never returned afterwards. Entries expire after ``ttl``
+    seconds and the least recently used go beyond ``capacity``. Cache errors only
+    ever cost a miss.
+
+    Lookups only read: hit/miss counters and ``used_at`` timestamps are kept in
+    memory and written in one transaction with the next ``put``, every
+    ``FLUSH_EVERY`` lookups, on ``stats`` and at exit.
+    """
+
+    def __init__(self, settings: Dict[str, str], namespace: str = ""):
+        self.enabled = get_bool(settings, "CODEX_MEM_QUERY_CACHE_ENABLED")
+        self.capacity = max(1, get_int(settings, "CODEX_MEM_QUERY_CACHE_SIZE", DEFAULT_CAPACITY))
+        self.ttl = max(0, get_int(settings, "CODEX_MEM_QUERY_CACHE_TTL", DEFAULT_TTL_SECONDS))
+        self.namespace = namespace
+        data_dir = Path(settings.get("CODEX_MEM_DATA_DIR", str(Path.home() / ".codex-mem")))
+        self.path = data_dir / CACHE_FILE
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._pending = {"hits": 0, "misses": 0}
+        self._exit_hook = False
+
+    @property
+    def active(self) -> bool:
+        return self.enabled and self.ttl > 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                for statement in _SCHEMA:
+                    conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def key(self, kind: str, request: object, scope: str = "") -> str:
+        """Hash of the request with whitespace collapsed and empty strings treated as unset.
+
+        ``scope`` carries settings that change results (dialect, provider, fusion) so
+        they never share entries.
+        """
+        fields = {name: _normalize(value) for name, value in asdict(request).items()}
+        if isinstance(fields.get("query"), str):
+            fields["query"] = fields["query"].lower()
+        fields["strategy"] = str(fields.get("strategy") or "auto").lower()
+        payload = json.dumps([self.namespace, kind, scope, fields], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _generation(self, conn: sqlite3.Connection, project: str) -> int:
+        row = conn.execute(
+            "SELECT COALESCE(SUM(generation), 0) FROM generations WHERE project IN (?, ?)",
+            (project, _ALL_PROJECTS),
+        ).fetchone()
+        return int(row[0])
+
+    def _record(self, name: str, key: Optional[str] = None, now: float = 0.0) -> None:
+        self._pending[name] += 1
+        if key is not None:
+            self._touched[key] = now
+        if not self._exit_hook:
+            atexit.register(self.flush)
+            self._exit_hook = True
+
+    def _write_pending(self, conn: sqlite3.Connection) -> None:
+        """Write buffered counters and timestamps; the caller holds a transaction."""
+        conn.executemany(
+            "INSERT INTO stats (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [(name, count) for name, count in self._pending.items() if count],
+        )
+        conn.executemany("UPDATE entries SET used_at = ? WHERE key = ?", [(t, k) for k, t in self._touched.items()])
+        self._pending = {"hits": 0, "misses": 0}
+        self._touched.clear()
+
+    def _has_pending(self) -> bool:
+        return bool(self._touched) or any(self._pending.values())
+
+    def flush(self) -> None:
+        """Write the buffered hit/miss counters and ``used_at`` timestamps."""
+        try:
+            with self._lock:
+                if not self._has_pending():
+                    return
+                conn = self._connection()
+                with conn:
+                    self._write_pending(conn)
+        except sqlite3.Error:
+            return
+
+    def get(self, key: str, project: str) -> Tuple[Optional[Dict[str, object]], int]:
+        """Return ``(result, generation)``; pass the generation to ``put`` after a miss."""
+        if not self.active:
+            return None, 0
+        try:
+            with self._lock:
+                conn = self._connection()
+                now = time.time()
+                generation = self._generation(conn, project)
+                row = conn.execute(
+                    "SELECT result_json, generation, created_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and int(row[1]) == generation and now - float(row[2]) <= self.ttl:
+                    self._record("hits", key, now)
+                    self.hits += 1
+                    result: Optional[Dict[str, object]] = json.loads(row[0])
+                else:
+                    self._record("misses")
+                    self.misses += 1
+                    result = None
+                if sum(self._pending.values()) >= FLUSH_EVERY:
+                    with conn:
+                        self._write_pending(conn)
+                return result, generation
+        except sqlite3.Error:
+            return None, 0
+
+    def put(self, key: str, project: str, generation: int, result: Dict[str, object]) -> None:
+        if not self.active:
+            return
+        try:
+            payload = json.dumps(result, ensure_ascii=False, default=str)
+            with self._lock:
+                conn = self._connection()
+                now = time.time()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO entries (key, project, generation, result_json, created_at, used_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, project, generation, payload, now, now),
+                    )
+                    self._touched.pop(key, None)
+                    self._write_pending(conn)
+                    conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl,))
+                    excess = int(conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]) - self.capacity
+                    if excess > 0:
+                        conn.execute(
+                            "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used_at LIMIT ?)",
+                            (excess,),
+                        )
+        except sqlite3.Error:
+            return
+
+    def invalidate(self, projects: Optional[Iterable[str]] = None) -> None:
+        """Bump the generation of ``projects``, or of every project when ``None``."""
+        if not self.enabled and not self.path.exists():
+            return
+        targets = [_ALL_PROJECTS] if projects is None else sorted({str(p) for p in projects})
+        if not targets:
+            return
+        try:
+            with self._lock:
+                conn = self._connection()
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO generations (project, generation) VALUES (?, 1) "
+                        "ON CONFLICT(project) DO UPDATE SET generation = generation + 1",
+                        [(project,) for project in targets],
+                    )
+                    if projects is None:
+                        conn.execute("DELETE FROM entries")
+                    else:
+                        conn.executemany("DELETE FROM entries WHERE project = ?", [(p,) for p in targets])
+        except sqlite3.Error:
+            return
+
+    def stats(self) -> Dict[str, object]:
+        """Hit and miss counts across all processes, plus this instance's own."""
+        out: Dict[str, object] = {"enabled": self.active, "path": str(self.path), "hits": 0, "misses": 0, "entries": 0}
+        out["session"] = {"hits": self.hits, "misses": self.misses}
+        if not self.path.exists():
+            return out
+        self.flush()
+        try:
+            with self._lock:
+                conn = self._connection()
+                for name, value in conn.execute("SELECT name, value FROM stats").fetchall():
+                    out[name] = int(value)
+                out["entries"] = int(conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0])
+        except sqlite3.Error:
+            pass
+        return out
@@ -0,0 +1,92 @@
+from typing import Callable, Dict, List, Tuple
+
+from .conversation_search import ConversationSearchOrchestrator, ConversationSearchRequest
+from .pagination import encode_cursor
+from .search import SearchOrchestrator, SearchRequest
+
+# LIKE matching keeps the newest-first ORDER BY; FTS hits are ordered by rank and
+# always sort, which is expected and not what the composite indexes are for.
+_SETTINGS = {"CODEX_MEM_FTS_ENABLED": "false"}
+
+
+def search_shapes(project: str, session_id: str, since_epoch: int) -> List[Tuple[str, object]]:
+    """One request per SQL access path the orchestrators generate for newest-first listings."""
+    # A position past every row, so keyset pages plan like the first page.
+    cursor = encode_cursor({"created_at_epoch": 2**62, "id": 2**62})
+    return [
+        ("memories.newest", SearchRequest(project=project, query=None, limit=10, strategy="sqlite")),
+        ("memories.type", SearchRequest(project=project, query=None, limit=10, strategy="sqlite", type_filter="bugfix")),
+        ("memories.since", SearchRequest(project=project, query=None, limit=10, strategy="sqlite", since=str(since_epoch))),
+        ("memories.like", SearchRequest(project=project, query="cache", limit=10, strategy="sqlite")),
+        (
+            "memories.type_tags",
+            SearchRequest(project=project, query=None, limit=10, strategy="sqlite", type_filter="bugfix", tags_filter="api"),
+        ),
+        ("memories.cursor", SearchRequest(project=project, query="cache", limit=10, strategy="sqlite", cursor=cursor)),
+        ("turns.newest", ConversationSearchRequest(project=project, query=None, limit=20, strategy="sqlite")),
+        (
+            "turns.session",
+            ConversationSearchRequest(project=project, query=None, limit=20, strategy="sqlite", session_id=session_id),
+        ),
+        ("turns.role", ConversationSearchRequest(project=project, query=None, limit=20, strategy="sqlite", role="user")),
+        (
+            "turns.session_role",
+            ConversationSearchRequest(
+                project=project, query=None, limit=20, strategy="sqlite", session_id=session_id, role="user"
+            ),
+        ),
+        (
+            "turns.session_cursor",
+            ConversationSearchRequest(
+                project=project, query=None, limit=20, strategy="sqlite", session_id=session_id, cursor=cursor
+            ),
+        ),
+    ]
+
+
+def search_runner(conn) -> Callable[[object], Dict[str, object]]:
+    memories = SearchOrchestrator(conn, "sqlite", _SETTINGS, vector_enabled=False)
+    turns = ConversationSearchOrchestrator(conn, "sqlite", _SETTINGS, vector_enabled=False)
+
+    def run(req):
+        orchestrator = memories if isinstance(req, SearchRequest) else turns
+        return orchestrator.search(req)
+
+    return run
+
+
+def captured_sql(conn, fn: Callable[[], object]) -> List[str]:
+    """Statements ``fn`` runs on ``conn``, with parameters expanded by SQLite."""
+    statements: List[str] = []
+    conn.set_trace_callback(statements.append)
+    try:
+        fn()
+    finally:
+        conn.set_trace_callback(None)
+    return statements
+
+
+def explain(conn, sql: str) -> List[str]:
+    return [str(row[3]) for row in conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()]
+
+
+def sorts(plan: List[str]) -> bool:
+    # A rare concept/tag drives the scan through an IN list of at most
+    # FACET_DRIVING_MATCHES rowids; sorting those is the intended plan.
+    driven = any(step.startswith("SEARCH m USING INTEGER PRIMARY KEY") for step in plan)
+    return not driven and any("TEMP B-TREE" in step for step in plan)
+
+
+def check_search_plans(conn, project: str, session_id: str = "", since_epoch: int = 0) -> List[Dict[str, object]]:
+    """Plan of the listing query behind each search shape; ``sorts`` flags a filter-then-sort plan."""
+    run = search_runner(conn)
+    results = []
+    for name, req in search_shapes(project, session_id or "session-0", since_epoch):
+        listing = [
+            sql
+            for sql in captured_sql(conn, lambda req=req: run(req))
+            if sql.lstrip().upper().startswith("SELECT") and "ORDER BY" in sql and "vector_outbox" not in sql
+        ]
+        plan = explain(conn, listing[-1]) if listing else []
+        results.append({"shape": name, "sorts": sorts(plan), "plan": plan})
+    return results
@@ -0,0 +1,115 @@
+import json
+from typing import Dict, List, Optional
+
+VALID_ROLES = {"system", "user", "assistant", "tool"}
+
+
+def csv_or_json_list(raw) -> List[str]:
+    if isinstance(raw, list):
+        return [str(v) for v in raw if str(v).strip()]
+    if not raw:
+        return []
+    s = str(raw).strip()
+    if not s:
+        return []
+    try:
+        parsed = json.loads(s)
+        if isinstance(parsed, list):
+            return [str(v) for v in parsed if str(v).strip()]
+    except Exception:
+        pass
+    return [p.strip() for p in s.split(",") if p.strip()]
+
+
+def parse_json_object(raw, field_name: str) -> Dict[str, object]:
+    """Parse a JSON object given as text (or already decoded); raise ValueError otherwise."""
+    if isinstance(raw, dict):
+        return raw
+    if not raw:
+        return {}
+    try:
+        parsed = json.loads(raw)
+    except Exception as exc:
+        raise ValueError(f"{field_name} must be valid JSON object") from exc
+    if not isinstance(parsed, dict):
+        raise ValueError(f"{field_name} must be JSON object")
+    return parsed
+
+
+def _memory_metadata(meta) -> Dict[str, object]:
+    if isinstance(meta, dict):
+        return dict(meta)
+    if not meta:
+        return {}
+    try:
+        parsed = json.loads(meta)
+        if not isinstance(parsed, dict):
+            return {"value": parsed}
+        return parsed
+    except Exception:
+        return {"raw": meta}
+
+
+def build_memory_record(
+    project: str,
+    summary: str,
+    created_at_epoch: int,
+    details: str = "",
+    tags: str = "",
+    memory_type: str = "discovery",
+    meta=None,
+    concepts=None,
+    files_read=None,
+    files_modified=None,
+) -> Dict[str, object]:
+    """Normalize memory fields into the column values ``store.insert_memory`` expects."""
+    concepts_list = csv_or_json_list(concepts)
+    files_read_list = csv_or_json_list(files_read)
+    files_modified_list = csv_or_json_list(files_modified)
+
+    metadata_obj = _memory_metadata(meta)
+    metadata_obj.setdefault("concepts", concepts_list)
+    metadata_obj.setdefault("files_read", files_read_list)
+    metadata_obj.setdefault("files_modified", files_modified_list)
+
+    return {
+        "project": project,
+        "tags": tags,
+        "summary": summary,
+        "details": details,
+        "metadata_json": json.dumps(metadata_obj),
+        "type": memory_type,
+        "created_at_epoch": created_at_epoch,
+        "concepts": json.dumps(concepts_list),
+        "files_read": json.dumps(files_read_list),
+        "files_modified": json.dumps(files_modified_list),
+    }
+
+
+def build_turn_record(
+    project: str,
+    session_id: str,
+    role: str,
+    content: str,
+    created_at_epoch: int,
+    context=None,
+    meta=None,
+) -> Dict[str, object]:
+    """Normalize turn fields into the column values ``store.insert_turn`` expects."""
+    if role not in VALID_ROLES:
+        raise ValueError(f"role must be one of {', '.join(sorted(VALID_ROLES))}")
+    return {
+        "project": project,
+        "session_id": session_id,
+        "role": role,
+        "content": content,
+        "context_json": json.dumps(parse_json_object(context, "context")),
+        "metadata_json": json.dumps(parse_json_object(meta, "meta")),
+        "created_at_epoch": created_at_epoch,
+    }
+
+
+def optional_epoch(value) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    return int(value)
@@ -0,0 +1,313 @@
+import json
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .config import get_int
+from .outbox import TURN_KIND, enqueue, indexing_mode
+from .store import TURN_COLUMNS, transaction
+
+DEFAULT_BATCH_SIZE = 500
+# Pages freed per incremental_vacuum step (4 MB at the default page size).
+VACUUM_STEP_PAGES = 1024
+# Rows ANALYZE samples per index, so statistics refresh in bounded time.
+ANALYSIS_LIMIT = 1000
+ARCHIVE_CODEC = "zlib-json"
+
+ARCHIVE_COLUMNS = ("id", "created_at", *TURN_COLUMNS)
+
+
+@dataclass
+class RetentionPolicy:
+    """Which turns of a project expire; zero disables a rule.
+
+    A turn expires when it is older than ``max_age_days`` or beyond the newest
+    ``max_turns_per_session`` of its session, unless it is one of the project's
+    newest ``keep_last`` turns.
+    """
+
+    max_age_days: int = 0
+    max_turns_per_session: int = 0
+    keep_last: int = 0
+
+    @property
+    def active(self) -> bool:
+        return self.max_age_days > 0 or self.max_turns_per_session > 0
+
+
+def default_policy(settings: Dict[str, str]) -> RetentionPolicy:
+    return RetentionPolicy(
+        max_age_days=max(0, get_int(settings, "CODEX_MEM_RETENTION_MAX_AGE_DAYS", 0)),
+        max_turns_per_session=max(0, get_int(settings, "CODEX_MEM_RETENTION_MAX_TURNS_PER_SESSION", 0)),
+        keep_last=max(0, get_int(settings, "CODEX_MEM_RETENTION_KEEP_LAST", 0)),
+    )
+
+
+def _ids_clause(dialect: str, column: str, ids: Sequence[int]) -> Tuple[str, List[object]]:
+    if dialect == "sqlite":
+        return f"{column} IN ({','.join(['?'] * len(ids))})", list(ids)
+    return f"{column} = ANY(%s)", [list(ids)]
+
+
+class Retention:
+    """Moves expired conversation turns into ``conversation_turns_archive``.
+
+    Each batch is read, archived as one compressed JSON blob and deleted in its own
+    short transaction, with the matching outbox and sync-state rows, so writers are
+    only held off for one batch at a time. Vectors are deleted after the batch
+    commits; a failure there leaves orphaned vectors, which searches already skip.
+    """
+
+    def __init__(self, conn, dialect: str, settings: Dict[str, str], vectors=None, cache=None):
+        self.conn = conn
+        self.dialect = dialect
+        self.settings = settings
+        self.vectors = vectors
+        self.cache = cache
+        self.mark = "?" if dialect == "sqlite" else "%s"
+
+    def _fetchall(self, sql: str, params: Sequence[object]) -> List[Dict[str, object]]:
+        if self.dialect == "sqlite":
+            return [dict(r) for r in self.conn.execute(sql, tuple(params)).fetchall()]
+        with self.conn.cursor() as cur:
+            cur.execute(sql, tuple(params))
+            columns = [c.name for c in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    def policy(self, project: str) -> RetentionPolicy:
+        rows = self._fetchall(
+            "SELECT max_age_days, max_turns_per_session, keep_last FROM retention_policies "
+            f"WHERE project = {self.mark}",
+            [project],
+        )
+        if not rows:
+            return default_policy(self.settings)
+        return RetentionPolicy(**{k: int(v) for k, v in rows[0].items()})
+
+    def policies(self) -> Dict[str, RetentionPolicy]:
+        rows = self._fetchall(
+            "SELECT project, max_age_days, max_turns_per_session, keep_last FROM retention_policies ORDER BY project",
+            [],
+        )
+        return {str(r.pop("project")): RetentionPolicy(**{k: int(v) for k, v in r.items()}) for r in rows}
+
+    def set_policy(self, project: str, policy: RetentionPolicy) -> None:
+        m = self.mark
+        with transaction(self.conn, self.dialect):
+            self.conn.execute(
+                "INSERT INTO retention_policies (project, max_age_days, max_turns_per_session, keep_last, "
+                f"updated_at_epoch) VALUES ({m}, {m}, {m}, {m}, {m}) "
+                "ON CONFLICT (project) DO UPDATE SET max_age_days = excluded.max_age_days, "
+                "max_turns_per_session = excluded.max_turns_per_session, keep_last = excluded.keep_last, "
+                "updated_at_epoch = excluded.updated_at_epoch",
+                (project, policy.max_age_days, policy.max_turns_per_session, policy.keep_last, int(time.time())),
+            )
+
+    def projects(self) -> List[str]:
+        rows = self._fetchall("SELECT DISTINCT project FROM conversation_turns ORDER BY project", [])
+        return [str(r["project"]) for r in rows]
+
+    def expired_ids(self, project: str, policy: RetentionPolicy, now: Optional[int] = None) -> List[int]:
+        """Ids of turns the policy expires, oldest first.
+
+        Computed once per run: later inserts only push turns further out of the
+        keep windows, so the list stays valid while batches are deleted.
+        """
+        if not policy.active:
+            return []
+        m = self.mark
+        rules: List[str] = []
+        params: List[object] = [project]
+        if policy.max_age_days:
+            rules.append(f"created_at_epoch < {m}")
+            params.append(int(now if now is not None else time.time()) - policy.max_age_days * 86400)
+        if policy.max_turns_per_session:
+            rules.append(f"session_rank > {m}")
+            params.append(policy.max_turns_per_session)
+        where = "(" + " OR ".join(rules) + ")"
+        if policy.keep_last:
+            where += f" AND project_rank > {m}"
+            params.append(policy.keep_last)
+        sql = (
+            "SELECT id FROM ("
+            "SELECT id, created_at_epoch, "
+            "ROW_NUMBER() OVER (ORDER BY created_at_epoch DESC, id DESC) AS project_rank, "
+            "ROW_NUMBER() OVER (PARTITION BY session_id ORDER BY created_at_epoch DESC, id DESC) AS session_rank "
+            f"FROM conversation_turns WHERE project = {m}"
+            f") ranked WHERE {where} ORDER BY id"
+        )
+        return [int(r["id"]) for r in self._fetchall(sql, params)]
+
+    def _archive_batch(self, project: str, ids: Sequence[int]) -> int:
+        m = self.mark
+        clause, params = _ids_clause(self.dialect, "id", ids)
+        sync_collection = self.vectors.sync_state_name(TURN_KIND) if self.vectors is not None else None
+        with transaction(self.conn, self.dialect):
+            rows = self._fetchall(
+                f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM conversation_turns WHERE {clause} ORDER BY id", params
+            )
+            if not rows:
+                return 0
+            payload = zlib.compress(json.dumps(rows, ensure_ascii=False, default=str).encode("utf-8"))
+            self.conn.execute(
+                "INSERT INTO conversation_turns_archive (project, first_turn_id, last_turn_id, first_epoch, "
+                f"last_epoch, turn_count, archived_at_epoch, codec, payload) VALUES ({m}, {m}, {m}, {m}, {m}, {m}, "
+                f"{m}, {m}, {m})",
+                (
+                    project,
+                    int(rows[0]["id"]),
+                    int(rows[-1]["id"]),
+                    min(int(r["created_at_epoch"]) for r in rows),
+                    max(int(r["created_at_epoch"]) for r in rows),
+                    len(rows),
+                    int(time.time()),
+                    ARCHIVE_CODEC,
+                    payload,
+                ),
+            )
+            self.conn.execute(f"DELETE FROM conversation_turns WHERE {clause}", params)
+            row_clause, row_params = _ids_clause(self.dialect, "row_id", ids)
+            self.conn.execute(f"DELETE FROM vector_outbox WHERE kind = {m} AND {row_clause}", [TURN_KIND, *row_params])
+            if sync_collection:
+                self.conn.execute(
+                    f"DELETE FROM vector_sync_rows WHERE collection = {m} AND {row_clause}",
+                    [sync_collection, *row_params],
+                )
+        return len(rows)
+
+    def _delete_vectors(self, ids: Sequence[int]) -> bool:
+        # pgvector embeddings live in the deleted rows themselves.
+        if self.vectors is None or self.vectors.in_database:
+            return True
+        try:
+            self.vectors.delete_turns(ids)
+        except Exception:
+            return False
+        return True
+
+    def apply(
+        self,
+        project: str,
+        policy: Optional[RetentionPolicy] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        pause: float = 0.0,
+        dry_run: bool = False,
+        on_batch: Optional[Callable[[int], None]] = None,
+    ) -> Dict[str, object]:
+        """Archive and delete the project's expired turns in batches of ``batch_size``.
+
+        ``pause`` seconds between batches give concurrent writers the lock.
+        """
+        policy = policy or self.policy(project)
+        ids = self.expired_ids(project, policy)
+        stats: Dict[str, object] = {"project": project, "policy": asdict(policy), "expired": len(ids)}
+        if dry_run:
+            return stats
+
+        archived = 0
+        batches = 0
+        vector_failures = 0
+        for start in range(0, len(ids), max(1, batch_size)):
+            chunk = ids[start : start + max(1, batch_size)]
+            count = self._archive_batch(project, chunk)
+            if count and not self._delete_vectors(chunk):
+                vector_failures += 1
+            archived += count
+            batches += 1
+            if on_batch:
+                on_batch(archived)
+            if pause and start + batch_size < len(ids):
+                time.sleep(pause)
+        if archived and self.cache is not None:
+            self.cache.invalidate([project])
+        stats.update({"archived": archived, "batches": batches, "vector_delete_failures": vector_failures})
+        return stats
+
+    def archived_turns(self, project: str) -> Iterator[Dict[str, object]]:
+        """Every archived turn of a project, oldest batch first."""
+        batches = self._fetchall(
+            "SELECT id, codec, payload FROM conversation_turns_archive "
+            f"WHERE project = {self.mark} ORDER BY first_turn_id",
+            [project],
+        )
+        for batch in batches:
+            yield from _decode(batch["codec"], batch["payload"])
+
+    def restore(self, project: str, reindex: bool = False) -> int:
+        """Put a project's archived turns back under their original ids and drop the archive.
+
+        With ``reindex`` the restored turns are re-embedded: inline with sync indexing,
+        as ``store.add_turns`` does, or queued in ``vector_outbox`` otherwise.
+        """
+        m = self.mark
+        inline = reindex and self.vectors is not None and indexing_mode(self.settings, self.dialect) == "sync"
+        batches = self._fetchall(
+            f"SELECT id, codec, payload FROM conversation_turns_archive WHERE project = {m} ORDER BY first_turn_id",
+            [project],
+        )
+        restored = 0
+        placeholders = ", ".join([m] * len(ARCHIVE_COLUMNS))
+        for batch in batches:
+            rows = _decode(batch["codec"], batch["payload"])
+            with transaction(self.conn, self.dialect):
+                values = [tuple(r[c] for c in ARCHIVE_COLUMNS) for r in rows]
+                if self.dialect == "sqlite":
+                    self.conn.executemany(
+                        f"INSERT OR IGNORE INTO conversation_turns ({', '.join(ARCHIVE_COLUMNS)}) VALUES ({placeholders})",
+                        values,
+                    )
+                else:
+                    with self.conn.cursor() as cur:
+                        cur.executemany(
+                            f"INSERT INTO conversation_turns ({', '.join(ARCHIVE_COLUMNS)}) VALUES ({placeholders}) "
+                            "ON CONFLICT (id) DO NOTHING",
+                            values,
+                        )
+                if reindex and not inline:
+                    enqueue(self.conn, self.dialect, TURN_KIND, [int(r["id"]) for r in rows], project)
+                self.conn.execute(f"DELETE FROM conversation_turns_archive WHERE id = {m}", (batch["id"],))
+            if inline:
+                self.vectors.sync_turns(rows)
+            restored += len(rows)
+        if restored and self.cache is not None:
+            self.cache.invalidate([project])
+        return restored
+
+    def maintain(self, max_pages: int = 0) -> Dict[str, object]:
+        """Return freed pages to the filesystem and refresh planner statistics.
+
+        SQLite frees pages in ``VACUUM_STEP_PAGES`` steps, each its own short write,
+        up to ``max_pages`` (0 for all); that needs ``auto_vacuum=INCREMENTAL``
+        (``memory_init.py --incremental-vacuum``). PostgreSQL runs a plain
+        ``VACUUM (ANALYZE)``, which takes no exclusive lock; it needs autocommit.
+        """
+        if self.dialect != "sqlite":
+            self.conn.execute("VACUUM (ANALYZE) conversation_turns")
+            self.conn.execute("VACUUM (ANALYZE) conversation_turns_archive")
+            return {"vacuumed": True}
+
+        mode = int(self.conn.execute("PRAGMA auto_vacuum").fetchone()[0])
+        freelist = int(self.conn.execute("PRAGMA freelist_count").fetchone()[0])
+        freed = 0
+        if mode == 2:
+            while freelist > 0 and (not max_pages or freed < max_pages):
+                step = min(VACUUM_STEP_PAGES, freelist, max_pages - freed if max_pages else VACUUM_STEP_PAGES)
+                self.conn.execute(f"PRAGMA incremental_vacuum({step})").fetchall()
+                self.conn.commit()
+                remaining = int(self.conn.execute("PRAGMA freelist_count").fetchone()[0])
+                if remaining >= freelist:
+                    break
+                freed += freelist - remaining
+                freelist = remaining
+        self.conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        with self.conn:
+            self.conn.execute("ANALYZE conversation_turns")
+        return {"auto_vacuum": {0: "none", 1: "full", 2: "incremental"}.get(mode, str(mode)), "freed_pages": freed,
+                "free_pages": freelist}
+
+
+def _decode(codec: str, payload) -> List[Dict[str, object]]:
+    if codec != ARCHIVE_CODEC:
+        raise ValueError(f"unknown archive codec: {codec}")
+    return json.loads(zlib.decompress(bytes(payload)).decode("utf-8"))
@@ -1,8 +1,32 @@
-from dataclasses import dataclass
+import json
+from dataclasses import dataclass, replace
 from datetime import datetime
-from typing import Dict, List, Optional, Sequence
-
-from .chroma_sync import ChromaSync
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .config import get_bool, get_int
+from .facets import split_tags
+from .fts import (
+    POSTGRES_TS_CONFIG,
+    build_match_expression,
+    postgres_column_exists,
+    postgres_table_exists,
+    sqlite_table_exists,
+)
+from .fusion import fuse, fusion_settings, rank_lexical, submit, vector_scored
+from .outbox import MEMORY_KIND, VectorOutbox, indexing_mode
+from .pagination import STREAM_PAGE_SIZE, decode_cursor, keyset_condition, next_cursor
+from .postgres import prepare_enabled
+from .query_cache import QueryCache
+from .vector import create_vector_index, vector_provider
+from .vector_index import Condition, concept_key
+
+# Up to this many matching memories, a concept/tag filter drives the SQLite query
+# instead of being probed row by row.
+FACET_DRIVING_MATCHES = 200
+
+# Vector hits hydrated per statement in a batch search. SQLite before 3.32 binds at
+# most 999 parameters, and the request's filters take a few more.
+HYDRATE_CHUNK = 500
 
 
 @dataclass
@@ -17,52 +41,331 @@ class SearchRequest:
     file_filter: Optional[str] = None
     since: Optional[str] = None
     until: Optional[str] = None
+    # Keyset paging: newest first, the query only filters (see ``core.pagination``).
+    cursor: Optional[str] = None
+    paginate: bool = False
 
 
 class SearchOrchestrator:
-    def __init__(self, conn, dialect: str, settings: Dict[str, str], vector_enabled: bool):
+    def __init__(
+        self,
+        conn,
+        dialect: str,
+        settings: Dict[str, str],
+        vector_enabled: bool,
+        vectors=None,
+        cache: Optional[QueryCache] = None,
+    ):
         self.conn = conn
         self.dialect = dialect
         self.vector_enabled = vector_enabled
-        self.chroma = ChromaSync(settings) if vector_enabled else None
+        if vector_enabled and vectors is None:
+            vectors = create_vector_index(settings, conn, dialect)
+        self.vectors = vectors if vector_enabled else None
+        self.max_fetch = max(1, get_int(settings, "CODEX_MEM_VECTOR_MAX_FETCH", 1000))
+        self.fusion = fusion_settings(settings)
+        self.cache = cache
+        # Providers settle availability when built (missing package, model or columns), so a
+        # fallback for that reason repeats on every call and is worth caching.
+        self.vectors_ready = bool(self.vectors is not None and self.vectors.available)
+        # Settings that change results, so differently configured callers never share entries.
+        self.cache_scope = json.dumps(
+            [dialect, self.vectors_ready, vector_provider(settings), self.fusion, self.max_fetch], sort_keys=True
+        )
+        self.fts_enabled = get_bool(settings, "CODEX_MEM_FTS_ENABLED")
+        self.async_indexing = vector_enabled and indexing_mode(settings, dialect) == "async"
+        # Each filter combination is one fixed SQL text, worth preparing once per connection.
+        self.prepare = dialect != "sqlite" and prepare_enabled(settings)
+        self._fts_available: Optional[bool] = None
+        self._facets_available: Optional[bool] = None
+
+    def _use_facets(self) -> bool:
+        """Whether the memory_concepts/memory_files/memory_tags side tables exist yet."""
+        if self._facets_available is None:
+            if self.dialect == "sqlite":
+                self._facets_available = sqlite_table_exists(self.conn, "memory_tags")
+            else:
+                self._facets_available = postgres_table_exists(self.conn, "memory_tags")
+        return self._facets_available
+
+    def _use_fts(self) -> bool:
+        if not self.fts_enabled:
+            return False
+        if self._fts_available is None:
+            if self.dialect == "sqlite":
+                self._fts_available = sqlite_table_exists(self.conn, "memories_fts")
+            else:
+                self._fts_available = postgres_column_exists(self.conn, "memories", "search_tsv")
+        return self._fts_available
 
     def search(self, req: SearchRequest) -> Dict[str, object]:
+        result = self._cached_search(req)
+        result["pending_index"] = self.pending_index(req.project)
+        return result
+
+    def search_many(self, req: SearchRequest, queries: Sequence[str]) -> List[Dict[str, object]]:
+        """``search`` for each of ``queries`` under the filters, limit and strategy of ``req``.
+
+        Results come back in query order. For vector and hybrid strategies, every
+        uncached query text is embedded in one model call and looked up in one vector
+        index query, and the hits of all queries are hydrated in one ``id IN (...)``
+        statement. Lexical matching still runs one SQL query per text.
+        """
+        reqs = [replace(req, query=query.strip() or None) for query in queries]
+        results = self._cached_many(reqs, self._search_many)
+        pending = self.pending_index(req.project)
+        for result in results:
+            result["pending_index"] = pending
+        return results
+
+    def _cached_search(self, req: SearchRequest) -> Dict[str, object]:
+        return self._cached_many([req], lambda reqs: [self._search(reqs[0])])[0]
+
+    def _cached_many(
+        self, reqs: List[SearchRequest], compute: Callable[[List[SearchRequest]], List[Dict[str, object]]]
+    ) -> List[Dict[str, object]]:
+        """Answer what the query cache holds and pass the rest to ``compute`` in one call."""
+        if self.cache is None or not self.cache.active:
+            return compute(reqs)
+        results: List[Optional[Dict[str, object]]] = [None] * len(reqs)
+        misses = []
+        for i, req in enumerate(reqs):
+            key = self.cache.key(MEMORY_KIND, req, self.cache_scope)
+            result, generation = self.cache.get(key, req.project)
+            if result is not None:
+                result["cache"] = "hit"
+                results[i] = result
+            else:
+                misses.append((i, key, generation))
+        computed = compute([reqs[i] for i, _, _ in misses]) if misses else []
+        for (i, key, generation), result in zip(misses, computed):
+            # A failing query against a ready provider is usually transient; keep that fallback out.
+            if not (result["fell_back"] and self.vectors_ready):
+                self.cache.put(key, reqs[i].project, generation, result)
+            result["cache"] = "miss"
+            results[i] = result
+        return results
+
+    def pending_index(self, project: Optional[str] = None) -> int:
+        """Rows written but still waiting in the outbox for vector indexing."""
+        if not self.async_indexing:
+            return 0
+        return VectorOutbox(self.conn, self.dialect).pending_count(project, kind=MEMORY_KIND)
+
+    def _strategy(self, req: SearchRequest) -> str:
         strategy = (req.strategy or "auto").lower()
-        if strategy not in {"auto", "sqlite", "chroma", "hybrid"}:
-            strategy = "auto"
-
-        if not req.query:
-            rows = self._sql_search(req, include_query=False)
-            return self._result(rows, strategy="sqlite", used_chroma=False, fell_back=False)
+        return strategy if strategy in {"auto", "sqlite", "chroma", "hybrid"} else "auto"
+
+    def _search_many(self, reqs: List[SearchRequest]) -> List[Dict[str, object]]:
+        """Uncached ``search_many`` requests; they differ only in their query text."""
+        batched = [
+            i
+            for i, req in enumerate(reqs)
+            if req.query and not (req.cursor or req.paginate) and self._strategy(req) in {"auto", "chroma", "hybrid"}
+        ]
+        if len(batched) < 2 or not (self.vectors and self.vectors.available):
+            return [self._search(req) for req in reqs]
+
+        results: List[Optional[Dict[str, object]]] = [None] * len(reqs)
+        group = [reqs[i] for i in batched]
+        strategy = self._strategy(group[0])
+        try:
+            if strategy == "chroma":
+                ranked = self._vector_search_many(group, group[0].limit)
+                done = [self._result(rows, strategy="chroma", used_chroma=True, fell_back=False) for rows in ranked]
+            else:
+                done = []
+                for req, rows in zip(group, self._hybrid_search_many(group)):
+                    if not rows and strategy == "hybrid":
+                        rows = self._sql_search(req, include_query=False)
+                    done.append(self._result(rows, strategy="hybrid", used_chroma=True, fell_back=False))
+        except Exception:
+            done = [
+                self._result(rank_lexical(self._sql_search(req, include_query=True)), "sqlite", False, True)
+                for req in group
+            ]
+        for i, result in zip(batched, done):
+            results[i] = result
+        return [result if result is not None else self._search(req) for req, result in zip(reqs, results)]
+
+    def _search(self, req: SearchRequest) -> Dict[str, object]:
+        strategy = self._strategy(req)
+
+        if req.cursor or req.paginate or not req.query:
+            after = decode_cursor(req.cursor) if req.cursor else None
+            rows = self._sql_search(req, include_query=bool(req.query), recent=True, after=after)
+            result = self._result(rows, strategy="sqlite", used_chroma=False, fell_back=False)
+            result["next_cursor"] = next_cursor(rows, req.limit)
+            return result
 
         if strategy == "sqlite":
-            rows = self._sql_search(req, include_query=True)
+            rows = rank_lexical(self._sql_search(req, include_query=True))
             return self._result(rows, strategy="sqlite", used_chroma=False, fell_back=False)
 
         attempted_chroma = strategy in {"auto", "chroma", "hybrid"} and bool(req.query) and self.vector_enabled
-        if self.chroma and self.chroma.available and strategy in {"auto", "chroma", "hybrid"}:
+        if self.vectors and self.vectors.available and strategy in {"auto", "chroma", "hybrid"}:
             try:
-                vector = self.chroma.query(req.query, req.limit * 4, req.project)
-                ids = vector.get("ids", [])
                 if strategy == "chroma":
-                    rows = self._hydrate_ids(ids, req)
+                    rows = self._vector_search(req, req.limit)
                     return self._result(rows, strategy="chroma", used_chroma=True, fell_back=False)
-
-                if strategy in {"hybrid", "auto"}:
-                    metadata_rows = self._sql_search(req, include_query=False, limit=req.limit * 6)
-                    allowed = {int(r["id"]) for r in metadata_rows}
-                    ranked = [mid for mid in ids if int(mid) in allowed]
-                    if not ranked and strategy == "hybrid":
-                        rows = metadata_rows[: req.limit]
-                        return self._result(rows, strategy="hybrid", used_chroma=True, fell_back=False)
-                    rows = self._hydrate_ids(ranked, req)
-                    return self._result(rows, strategy="hybrid", used_chroma=True, fell_back=False)
+                rows = self._hybrid_search(req)
+                if not rows and strategy == "hybrid":
+                    # Neither retriever matched under the filters: newest filtered rows.
+                    rows = self._sql_search(req, include_query=False)
+                return self._result(rows, strategy="hybrid", used_chroma=True, fell_back=False)
             except Exception:
                 pass
 
-        rows = self._sql_search(req, include_query=True)
+        rows = rank_lexical(self._sql_search(req, include_query=True))
         return self._result(rows, strategy="sqlite", used_chroma=False, fell_back=attempted_chroma)
 
+    def stream(self, req: SearchRequest, page_size: int = STREAM_PAGE_SIZE) -> Iterator[Dict[str, object]]:
+        """Every match newest first (after ``req.cursor``), read one keyset page at a time.
+
+        ``req.limit`` caps the total; 0 means no cap. Memory stays at one page whatever
+        the number of rows. Bypasses the query cache.
+        """
+        after = decode_cursor(req.cursor) if req.cursor else None
+        remaining = req.limit if req.limit > 0 else None
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            rows = self._sql_search(req, include_query=bool(req.query), limit=size, recent=True, after=after)
+            yield from rows
+            if len(rows) < size:
+                return
+            after = (int(rows[-1]["created_at_epoch"]), int(rows[-1]["id"]))
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def _hybrid_search(self, req: SearchRequest) -> List[Dict[str, object]]:
+        """Run lexical and vector retrieval side by side and merge them by rank fusion.
+
+        The vector lookup (query embedding plus index search) runs on the search
+        thread pool while this thread runs the lexical query. Every statement on the
+        connection stays on this thread, since callers serialize access to it: vector
+        hits are hydrated here, and with pgvector only the embedding leaves the thread.
+        """
+        depth = min(req.limit * 4, self.max_fetch)
+        if self.vectors.in_database:
+            pending = submit(self.vectors.embed_query, req.query)
+            lexical = rank_lexical(self._sql_search(req, include_query=True, limit=depth))
+            vector = self._vector_search(req, depth, embedding=pending.result())
+        else:
+            fetch = self._initial_fetch(depth)
+            pending = submit(self.vectors.query, req.query, fetch, req.project, self._vector_conditions(req))
+            lexical = rank_lexical(self._sql_search(req, include_query=True, limit=depth))
+            vector = self._vector_search(req, depth, first=pending.result())
+        return fuse(lexical, vector, req.limit, **self.fusion)
+
+    def _hybrid_search_many(self, reqs: List[SearchRequest]) -> List[List[Dict[str, object]]]:
+        """``_hybrid_search`` for requests that differ only in their query text."""
+        depth = min(reqs[0].limit * 4, self.max_fetch)
+        if self.vectors.in_database:
+            pending = submit(self.vectors.embed_queries, [req.query for req in reqs])
+            lexical = [rank_lexical(self._sql_search(req, include_query=True, limit=depth)) for req in reqs]
+            vector = self._vector_search_many(reqs, depth, embeddings=pending.result())
+        else:
+            fetch = self._initial_fetch(depth)
+            conditions = self._vector_conditions(reqs[0])
+            pending = submit(self.vectors.query_many, [req.query for req in reqs], fetch, reqs[0].project, conditions)
+            lexical = [rank_lexical(self._sql_search(req, include_query=True, limit=depth)) for req in reqs]
+            vector = self._vector_search_many(reqs, depth, first=pending.result())
+        return [fuse(lex, vec, reqs[0].limit, **self.fusion) for lex, vec in zip(lexical, vector)]
+
+    def _vector_search_many(
+        self,
+        reqs: List[SearchRequest],
+        limit: int,
+        first: Optional[List[Dict[str, object]]] = None,
+        embeddings: Optional[List[str]] = None,
+    ) -> List[List[Dict[str, object]]]:
+        """``_vector_search`` for requests that differ only in their query text.
+
+        One embedding call and one index lookup cover every query, and one statement
+        hydrates the union of their hits. A query whose hits the SQL-only filters thin
+        below ``limit`` grows its candidate pool on its own, as ``_vector_search`` does.
+        ``embeddings`` are already computed pgvector query literals.
+        """
+        if self.vectors.in_database:
+            if embeddings is None:
+                embeddings = self.vectors.embed_queries([req.query for req in reqs])
+            out = []
+            for req, literal in zip(reqs, embeddings):
+                rows = self._sql_search(req, include_query=False, limit=limit, embedding=literal)
+                out.append(vector_scored(rows, {int(row["id"]): row.pop("vector_distance", None) for row in rows}))
+            return out
+
+        fetch = self._initial_fetch(limit)
+        if first is None:
+            conditions = self._vector_conditions(reqs[0])
+            first = self.vectors.query_many([req.query for req in reqs], fetch, reqs[0].project, conditions)
+        hits = list(dict.fromkeys(row_id for result in first for row_id in result.get("ids", [])))
+        hydrated: Dict[int, Dict[str, object]] = {}
+        for start in range(0, len(hits), HYDRATE_CHUNK):
+            hydrated.update((int(row["id"]), row) for row in self._hydrate_ids(hits[start : start + HYDRATE_CHUNK], reqs[0]))
+        out = []
+        for req, result in zip(reqs, first):
+            ids = result.get("ids", [])
+            rows = [hydrated[row_id] for row_id in ids if row_id in hydrated]
+            if len(rows) < limit and len(ids) >= fetch and fetch < self.max_fetch:
+                out.append(self._vector_search(req, limit, first=result))
+            else:
+                out.append(vector_scored(rows[:limit], dict(zip(ids, result.get("distances", [])))))
+        return out
+
+    def _vector_conditions(self, req: SearchRequest) -> List[Condition]:
+        conditions: List[Condition] = []
+        if req.type_filter:
+            conditions.append(("type", "=", req.type_filter))
+        if req.concept_filter:
+            conditions.append((concept_key(req.concept_filter), "=", True))
+        since_epoch = self._parse_epoch(req.since)
+        if since_epoch is not None:
+            conditions.append(("created_at_epoch", ">=", since_epoch))
+        until_epoch = self._parse_epoch(req.until, end_of_day=True)
+        if until_epoch is not None:
+            conditions.append(("created_at_epoch", "<=", until_epoch))
+        return conditions
+
+    def _vector_search(
+        self,
+        req: SearchRequest,
+        limit: int,
+        first: Optional[Dict[str, object]] = None,
+        embedding: Optional[str] = None,
+    ) -> List[Dict[str, object]]:
+        """Rank by similarity with the request filters pushed into the vector query.
+
+        Tag and file filters have no equivalent in the vector metadata (files match by
+        substring), so they are applied while hydrating; when that leaves fewer than ``limit`` rows
+        the candidate pool grows until it is exhausted or hits ``max_fetch``.
+        ``first`` is an already fetched result for the initial candidate pool, and
+        ``embedding`` an already computed pgvector query literal.
+        Rows carry ``scores.vector_rank`` and ``scores.vector_distance``.
+        """
+        if self.vectors.in_database:
+            # pgvector: filters and nearest-neighbour ordering in one statement.
+            if embedding is None:
+                embedding = self.vectors.embed_query(req.query)
+            rows = self._sql_search(req, include_query=False, limit=limit, embedding=embedding)
+            return vector_scored(rows, {int(row["id"]): row.pop("vector_distance", None) for row in rows})
+
+        conditions = self._vector_conditions(req)
+        fetch = self._initial_fetch(limit)
+        while True:
+            if first is None:
+                result = self.vectors.query(req.query, fetch, req.project, conditions)
+            else:
+                result, first = first, None
+            ids = result.get("ids", [])
+            rows = self._hydrate_ids(ids, req)
+            if len(rows) >= limit or len(ids) < fetch or fetch >= self.max_fetch:
+                return vector_scored(rows[:limit], dict(zip(ids, result.get("distances", []))))
+            fetch = min(fetch * 4, self.max_fetch)
+
+    def _initial_fetch(self, limit: int) -> int:
+        return min(limit * 4, self.max_fetch)
+
     def _result(self, rows: Sequence[Dict[str, object]], strategy: str, used_chroma: bool, fell_back: bool):
         return {
             "rows": list(rows),
@@ -87,59 +390,110 @@ class SearchOrchestrator:
         except Exception:
             return None
 
-    def _sql_search(self, req: SearchRequest, include_query: bool, limit: Optional[int] = None) -> List[Dict[str, object]]:
+    def _sql_search(
+        self,
+        req: SearchRequest,
+        include_query: bool,
+        limit: Optional[int] = None,
+        embedding: Optional[str] = None,
+        ids: Optional[Sequence[int]] = None,
+        recent: bool = False,
+        after: Optional[Tuple[int, int]] = None,
+    ) -> List[Dict[str, object]]:
+        """Matching rows, ranked by relevance when the query is searched, else newest first.
+
+        ``recent`` keeps newest-first order with a query (it only filters); ``after``
+        starts past a keyset cursor position.
+        """
         if self.dialect == "sqlite":
-            return self._sqlite_search(req, include_query, limit)
-        return self._postgres_search(req, include_query, limit)
-
-    def _sqlite_search(self, req: SearchRequest, include_query: bool, limit: Optional[int] = None) -> List[Dict[str, object]]:
+            return self._sqlite_search(req, include_query, limit, ids, recent, after)
+        return self._postgres_search(req, include_query, limit, embedding, ids, recent, after)
+
+    def _sqlite_search(
+        self,
+        req: SearchRequest,
+        include_query: bool,
+        limit: Optional[int] = None,
+        ids: Optional[Sequence[int]] = None,
+        recent: bool = False,
+        after: Optional[Tuple[int, int]] = None,
+    ) -> List[Dict[str, object]]:
         limit_value = limit if limit is not None else req.limit
 
-        params: List[object] = [req.project]
-        where: List[str] = ["project = ?"]
-
-        if include_query and req.query:
-            where.append("(summary LIKE ? OR details LIKE ?)")
+        params: List[object] = []
+        joins = ""
+        score_select = ""
+        order_by = "m.created_at_epoch DESC, m.id DESC"
+        where: List[str] = []
+
+        match = build_match_expression(req.query) if include_query and self._use_fts() else None
+        if match:
+            joins = "JOIN memories_fts ON memories_fts.rowid = m.id "
+            where.append("memories_fts MATCH ?")
+            params.append(match)
+            # bm25() is lower-is-better; negate it so every lexical score ranks descending.
+            score_select = ", -bm25(memories_fts) AS lexical_score"
+            if not recent:
+                order_by = "lexical_score DESC, " + order_by
+
+        where.append("m.project = ?")
+        params.append(req.project)
+
+        if ids is not None:
+            where.append(f"m.id IN ({','.join(['?'] * len(ids))})")
+            params.extend(ids)
+
+        if include_query and req.query and not match:
+            where.append("(m.summary LIKE ? OR m.details LIKE ?)")
             like = f"%{req.query}%"
             params.extend([like, like])
 
         if req.type_filter:
-            where.append("type = ?")
+            where.append("m.type = ?")
             params.append(req.type_filter)
 
-        if req.tags_filter:
-            where.append("tags LIKE ?")
-            params.append(f"%{req.tags_filter}%")
-
-        if req.concept_filter:
-            where.append("EXISTS (SELECT 1 FROM json_each(concepts) WHERE value = ?)")
-            params.append(req.concept_filter)
-
-        if req.file_filter:
-            where.append(
-                "(" \
-                "EXISTS (SELECT 1 FROM json_each(files_read) WHERE value LIKE ?) " \
-                "OR EXISTS (SELECT 1 FROM json_each(files_modified) WHERE value LIKE ?)" \
-                ")"
-            )
-            like = f"%{req.file_filter}%"
-            params.extend([like, like])
+        if self._use_facets():
+            self._facet_filters(req, where, params, "m.id", "?", "LIKE", probe=ids is not None)
+        else:
+            if req.tags_filter:
+                where.append("m.tags LIKE ?")
+                params.append(f"%{req.tags_filter}%")
+
+            if req.concept_filter:
+                where.append("EXISTS (SELECT 1 FROM json_each(m.concepts) WHERE value = ?)")
+                params.append(req.concept_filter)
+
+            if req.file_filter:
+                where.append(
+                    "(" \
+                    "EXISTS (SELECT 1 FROM json_each(m.files_read) WHERE value LIKE ?) " \
+                    "OR EXISTS (SELECT 1 FROM json_each(m.files_modified) WHERE value LIKE ?)" \
+                    ")"
+                )
+                like = f"%{req.file_filter}%"
+                params.extend([like, like])
 
         since_epoch = self._parse_epoch(req.since)
         if since_epoch is not None:
-            where.append("created_at_epoch >= ?")
+            where.append("m.created_at_epoch >= ?")
             params.append(since_epoch)
 
         until_epoch = self._parse_epoch(req.until, end_of_day=True)
         if until_epoch is not None:
-            where.append("created_at_epoch <= ?")
+            where.append("m.created_at_epoch <= ?")
             params.append(until_epoch)
 
+        if after is not None:
+            where.append(keyset_condition("m.", "?"))
+            params.extend(after)
+
         sql = (
-            "SELECT id, created_at, created_at_epoch, project, type, tags, summary, details, concepts, files_read, files_modified, metadata_json "
-            "FROM memories "
+            "SELECT m.id, m.created_at, m.created_at_epoch, m.project, m.type, m.tags, m.summary, m.details, "
+            f"m.concepts, m.files_read, m.files_modified, m.metadata_json{score_select} "
+            "FROM memories m "
+            f"{joins}"
             f"WHERE {' AND '.join(where)} "
-            "ORDER BY created_at_epoch DESC "
+            f"ORDER BY {order_by} "
             "LIMIT ?"
         )
         params.append(limit_value)
@@ -147,33 +501,116 @@ class SearchOrchestrator:
         rows = self.conn.execute(sql, tuple(params)).fetchall()
         return [dict(r) for r in rows]
 
-    def _postgres_search(self, req: SearchRequest, include_query: bool, limit: Optional[int] = None) -> List[Dict[str, object]]:
+    def _facet_filters(
+        self,
+        req: SearchRequest,
+        where: List[str],
+        params: List[object],
+        id_column: str,
+        mark: str,
+        like: str,
+        probe: bool,
+    ) -> None:
+        """Concept, tag and file filters as lookups in the side tables.
+
+        Concepts and tags match whole values (tags case-insensitively; each of several
+        comma-separated tags must be present); files keep substring matching on the path.
+        A value with few matches in the project drives the query through an ``IN`` list
+        read from the side-table index. Common values, and everything when ``probe`` is
+        set, are checked per candidate row on the side table's primary key, so the
+        newest-first walk still stops at LIMIT.
+        """
+        lookups = []
+        if req.concept_filter:
+            lookups.append(("memory_concepts", "concept", req.concept_filter))
+        for tag in split_tags(req.tags_filter):
+            lookups.append(("memory_tags", "tag", tag))
+
+        for table, column, value in lookups:
+            if probe or not self._few_facet_matches(table, column, req.project, value):
+                where.append(f"EXISTS (SELECT 1 FROM {table} f WHERE f.memory_id = {id_column} AND f.{column} = {mark})")
+                params.append(value)
+            else:
+                where.append(
+                    f"{id_column} IN (SELECT memory_id FROM {table} WHERE project = {mark} AND {column} = {mark})"
+                )
+                params.extend([req.project, value])
+
+        if req.file_filter:
+            where.append(f"EXISTS (SELECT 1 FROM memory_files f WHERE f.memory_id = {id_column} AND f.path {like} {mark})")
+            params.append(f"%{req.file_filter}%")
+
+    def _few_facet_matches(self, table: str, column: str, project: str, value: str) -> bool:
+        # A bounded count on the (project, value) index; cheap even for common values.
+        row = self.conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {table} WHERE project = ? AND {column} = ? LIMIT ?)",
+            (project, value, FACET_DRIVING_MATCHES + 1),
+        ).fetchone()
+        return int(row[0]) <= FACET_DRIVING_MATCHES
+
+    def _postgres_search(
+        self,
+        req: SearchRequest,
+        include_query: bool,
+        limit: Optional[int] = None,
+        embedding: Optional[str] = None,
+        ids: Optional[Sequence[int]] = None,
+        recent: bool = False,
+        after: Optional[Tuple[int, int]] = None,
+    ) -> List[Dict[str, object]]:
         limit_value = limit if limit is not None else req.limit
 
         params: List[object] = [req.project]
         where: List[str] = ["project = %s"]
-
-        if include_query and req.query:
+        score_select = ""
+        select_params: List[object] = []
+        order_by = "created_at_epoch DESC, id DESC"
+
+        if ids is not None:
+            # One array parameter keeps the statement text the same for any number of ids.
+            where.append("id = ANY(%s)")
+            params.append(list(ids))
+
+        use_fts = include_query and build_match_expression(req.query) is not None and self._use_fts()
+        if use_fts:
+            where.append(f"search_tsv @@ plainto_tsquery('{POSTGRES_TS_CONFIG}', %s)")
+            params.append(req.query)
+            score_select = f", ts_rank_cd(search_tsv, plainto_tsquery('{POSTGRES_TS_CONFIG}', %s)) AS lexical_score"
+            select_params = [req.query]
+            if not recent:
+                order_by = "lexical_score DESC, " + order_by
+        elif include_query and req.query:
             where.append("(summary ILIKE %s OR details ILIKE %s)")
             like = f"%{req.query}%"
             params.extend([like, like])
 
+        if embedding is not None:
+            # Cosine distance matches the HNSW/IVFFlat opclass, so the index drives the ORDER BY.
+            where.append("embedding IS NOT NULL")
+            score_select = ", embedding <=> %s::vector AS vector_distance"
+            select_params = [embedding]
+            order_by = "vector_distance"
+
         if req.type_filter:
             where.append("type = %s")
             params.append(req.type_filter)
 
-        if req.tags_filter:
-            where.append("tags ILIKE %s")
-            params.append(f"%{req.tags_filter}%")
+        if self._use_facets():
+            # The planner turns either form into a semi-join and picks its side from statistics.
+            self._facet_filters(req, where, params, "memories.id", "%s", "ILIKE", probe=True)
+        else:
+            if req.tags_filter:
+                where.append("tags ILIKE %s")
+                params.append(f"%{req.tags_filter}%")
 
-        if req.concept_filter:
-            where.append("concepts ILIKE %s")
-            params.append(f"%{req.concept_filter}%")
+            if req.concept_filter:
+                where.append("concepts ILIKE %s")
+                params.append(f"%{req.concept_filter}%")
 
-        if req.file_filter:
-            where.append("(files_read ILIKE %s OR files_modified ILIKE %s)")
-            like = f"%{req.file_filter}%"
-            params.extend([like, like])
+            if req.file_filter:
+                where.append("(files_read ILIKE %s OR files_modified ILIKE %s)")
+                like = f"%{req.file_filter}%"
+                params.extend([like, like])
 
         since_epoch = self._parse_epoch(req.since)
         if since_epoch is not None:
@@ -185,67 +622,38 @@ class SearchOrchestrator:
             where.append("created_at_epoch <= %s")
             params.append(until_epoch)
 
+        if after is not None:
+            where.append(keyset_condition("", "%s"))
+            params.extend(after)
+
         sql = (
-            "SELECT id, created_at, created_at_epoch, project, type, tags, summary, details, concepts, files_read, files_modified, metadata_json "
+            "SELECT id, created_at, created_at_epoch, project, type, tags, summary, details, concepts, files_read, files_modified, metadata_json"
+            f"{score_select} "
             "FROM memories "
             f"WHERE {' AND '.join(where)} "
-            "ORDER BY created_at_epoch DESC "
+            f"ORDER BY {order_by} "
             "LIMIT %s"
         )
         params.append(limit_value)
 
         with self.conn.cursor() as cur:
-            cur.execute(sql, tuple(params))
+            cur.execute(sql, tuple(select_params + params), prepare=self.prepare)
             columns = [c.name for c in cur.description]
             fetched = cur.fetchall()
 
         return [dict(zip(columns, row)) for row in fetched]
 
     def _hydrate_ids(self, ids: Sequence[int], req: SearchRequest) -> List[Dict[str, object]]:
+        """Load vector hits in rank order, applying every request filter in SQL."""
         normalized = []
         for value in ids:
             try:
                 normalized.append(int(value))
             except Exception:
                 continue
-
         if not normalized:
-            if req.strategy == "chroma":
-                return []
-            return self._sql_search(req, include_query=True)
-
-        if self.dialect == "sqlite":
-            placeholders = ",".join(["?"] * len(normalized))
-            params: List[object] = [req.project, *normalized]
-            sql = (
-                "SELECT id, created_at, created_at_epoch, project, type, tags, summary, details, concepts, files_read, files_modified, metadata_json "
-                "FROM memories "
-                f"WHERE project = ? AND id IN ({placeholders})"
-            )
-            rows = self.conn.execute(sql, tuple(params)).fetchall()
-            indexed = {int(row["id"]): dict(row) for row in rows}
-        else:
-            placeholders = ",".join(["%s"] * len(normalized))
-            params = [req.project, *normalized]
-            sql = (
-                "SELECT id, created_at, created_at_epoch, project, type, tags, summary, details, concepts, files_read, files_modified, metadata_json "
-                "FROM memories "
-                f"WHERE project = %s AND id IN ({placeholders})"
-            )
-            with self.conn.cursor() as cur:
-                cur.execute(sql, tuple(params))
-                columns = [c.name for c in cur.description]
-                fetched = cur.fetchall()
-            indexed = {int(row[0]): dict(zip(columns, row)) for row in fetched}
-
-        ordered = [indexed[mid] for mid in normalized if mid in indexed]
-
-        filtered: List[Dict[str, object]] = []
-        for row in ordered:
-            if req.type_filter and row.get("type") != req.type_filter:
-                continue
-            if req.tags_filter and req.tags_filter not in str(row.get("tags", "")):
-                continue
-            filtered.append(row)
+            return []
 
-        return filtered[: req.limit]
+        rows = self._sql_search(req, include_query=False, limit=len(normalized), ids=normalized)
+        indexed = {int(row["id"]): row for row in rows}
+        return [indexed[mid] for mid in normalized if mid in indexed]
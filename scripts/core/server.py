@@ -0,0 +1,191 @@
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .context_pack import ContextPacker, ContextPackRequest
+from .conversation_search import ConversationSearchOrchestrator, ConversationSearchRequest
+from .dedup import Deduplicator, dedup_enabled
+from .facets import project_facets
+from .outbox import VectorOutbox, indexing_mode
+from .query_cache import QueryCache
+from .search import SearchOrchestrator, SearchRequest
+from .store import add_memory, add_turn
+from .vector import create_vector_index, vector_provider
+
+# Longest wait between indexer retries while draining keeps failing.
+MAX_INDEXER_BACKOFF = 60.0
+
+
+class MemoryService:
+    """Warm state shared by every request a memory server handles.
+
+    One connection, one vector index (with its loaded embedding model) and both
+    orchestrators stay alive for the life of the process. Requests run one at a
+    time under ``lock`` because the connection is shared.
+    """
+
+    def __init__(self, conn, dialect: str, settings: Dict[str, str], db_url: str):
+        self.conn = conn
+        self.dialect = dialect
+        self.settings = settings
+        self.db_url = db_url
+        self.lock = threading.Lock()
+
+        self.indexing = indexing_mode(settings, dialect)
+        vector_enabled = self.indexing != "off"
+        self.vectors = create_vector_index(settings, conn, dialect) if vector_enabled else None
+        self.cache = QueryCache(settings, db_url)
+        self.dedup = Deduplicator(settings) if dedup_enabled(settings) else None
+        self.memories = SearchOrchestrator(
+            conn, dialect, settings, vector_enabled, vectors=self.vectors, cache=self.cache
+        )
+        self.conversations = ConversationSearchOrchestrator(
+            conn, dialect, settings, vector_enabled, vectors=self.vectors, cache=self.cache
+        )
+        self.packer = ContextPacker(self.memories, self.conversations)
+        self.indexer_failures = 0
+        self.indexer_error: Optional[str] = None
+        self.handlers: Dict[str, Callable[[Dict[str, object]], object]] = {
+            "ping": self._ping,
+            "memory_add": self._memory_add,
+            "memory_search": self._memory_search,
+            "memory_search_many": self._memory_search_many,
+            "memory_facets": self._memory_facets,
+            "conversation_add": self._conversation_add,
+            "conversation_search": self._conversation_search,
+            "context_pack": self._context_pack,
+        }
+
+    def start_indexer(self, interval: float) -> Optional[threading.Thread]:
+        """Drain the vector outbox in the background when indexing is async."""
+        if self.indexing != "async" or self.vectors is None or not self.vectors.available:
+            return None
+        outbox = VectorOutbox(self.conn, self.dialect)
+
+        def run() -> None:
+            while True:
+                try:
+                    # One batch per lock hold so requests interleave with indexing.
+                    with self.lock:
+                        stats = outbox.drain(self.vectors, self.vectors.batch_size, max_batches=1, cache=self.cache)
+                except Exception as exc:
+                    # Rows stay in the outbox; back off so a persistent failure does not spin.
+                    self.indexer_failures += 1
+                    self.indexer_error = f"{type(exc).__name__}: {exc}"
+                    delay = min(interval * 2 ** min(self.indexer_failures, 10), MAX_INDEXER_BACKOFF)
+                    print(
+                        f"vector indexing failed, retrying in {delay:.0f}s: {self.indexer_error}",
+                        file=sys.stderr,
+                        flush=True,
+                    )
+                    time.sleep(delay)
+                    continue
+                self.indexer_failures = 0
+                if not stats["batches"]:
+                    time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="codex-mem-indexer", daemon=True)
+        thread.start()
+        return thread
+
+    def handle(self, message: Dict[str, object]) -> Dict[str, object]:
+        db_url = message.get("db_url")
+        if db_url and db_url != self.db_url:
+            return {"ok": False, "fallback": True, "error": "server is bound to a different database"}
+
+        op = str(message.get("op", ""))
+        handler = self.handlers.get(op)
+        if handler is None:
+            return {"ok": False, "error": f"unknown op: {op}"}
+
+        payload = message.get("payload") or {}
+        try:
+            with self.lock:
+                result = handler(payload)
+        except Exception as exc:
+            return {"ok": False, "error": str(exc)}
+        return {"ok": True, "result": result}
+
+    def _ping(self, payload: Dict[str, object]) -> Dict[str, object]:
+        return {
+            "pid": os.getpid(),
+            "dialect": self.dialect,
+            "vector_provider": vector_provider(self.settings),
+            "vectors": bool(self.vectors and self.vectors.available),
+            "indexing": self.indexing,
+            "indexer": {"failures": self.indexer_failures, "last_error": self.indexer_error},
+            "query_cache": self.cache.stats(),
+        }
+
+    def _memory_add(self, payload: Dict[str, object]) -> Dict[str, object]:
+        record = dict(payload["record"])
+        memory_id = add_memory(
+            self.conn, self.dialect, record, self.vectors, self.indexing == "async", cache=self.cache, dedup=self.dedup
+        )
+        return {"id": memory_id}
+
+    def _conversation_add(self, payload: Dict[str, object]) -> Dict[str, object]:
+        record = dict(payload["record"])
+        turn_id = add_turn(self.conn, self.dialect, record, self.vectors, self.indexing == "async", cache=self.cache)
+        return {"id": turn_id}
+
+    def _memory_search(self, payload: Dict[str, object]) -> Dict[str, object]:
+        return self.memories.search(SearchRequest(**payload["request"]))
+
+    def _memory_search_many(self, payload: Dict[str, object]) -> List[Dict[str, object]]:
+        return self.memories.search_many(SearchRequest(**payload["request"]), [str(q) for q in payload["queries"]])
+
+    def _memory_facets(self, payload: Dict[str, object]) -> Dict[str, object]:
+        return project_facets(
+            self.conn,
+            self.dialect,
+            str(payload["project"]),
+            list(payload.get("kinds") or []),
+            int(payload.get("limit", 20)),
+            payload.get("prefix") or None,
+        )
+
+    def _conversation_search(self, payload: Dict[str, object]) -> Dict[str, object]:
+        return self.conversations.search(ConversationSearchRequest(**payload["request"]))
+
+    def _context_pack(self, payload: Dict[str, object]) -> Dict[str, object]:
+        return self.packer.pack(ContextPackRequest(**payload["request"]))
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        service: MemoryService = self.server.service  # type: ignore[attr-defined]
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+                response = service.handle(message if isinstance(message, dict) else {})
+            except ValueError as exc:
+                response = {"ok": False, "error": f"invalid request: {exc}"}
+            self.wfile.write((json.dumps(response, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class MemoryServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, service: MemoryService):
+        self.path = path
+        self.service = service
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            # A leftover socket from a crashed server would make bind() fail.
+            path.unlink()
+        super().__init__(str(path), _RequestHandler)
+        os.chmod(str(path), 0o600)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,254 @@
+from typing import Dict, List, Sequence, Set, Tuple
+
+from .dedup import insert_signatures
+from .facets import insert_facets
+from .outbox import MEMORY_KIND, TURN_KIND, enqueue
+from .postgres import pipeline
+
+MEMORY_COLUMNS = (
+    "project",
+    "tags",
+    "summary",
+    "details",
+    "metadata_json",
+    "type",
+    "created_at_epoch",
+    "concepts",
+    "files_read",
+    "files_modified",
+)
+
+TURN_COLUMNS = (
+    "project",
+    "session_id",
+    "role",
+    "content",
+    "context_json",
+    "metadata_json",
+    "created_at_epoch",
+)
+
+# Side tables written with each memory; ``memory_tags`` stands for the three facet
+# tables, created together. A database created before them lacks them
+# until memory_init runs again; writes skip what is missing rather than fail.
+SIDE_TABLES = ("memory_signatures", "memory_tags")
+
+
+def _insert(conn, dialect: str, table: str, columns, record: Dict[str, object]) -> int:
+    values = tuple(record[c] for c in columns)
+    if dialect == "sqlite":
+        placeholders = ", ".join(["?"] * len(columns))
+        cur = conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", values)
+        return int(cur.lastrowid)
+
+    placeholders = ", ".join(["%s"] * len(columns))
+    cur = conn.execute(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) RETURNING id",
+        values,
+    )
+    row = cur.fetchone()
+    return int(row[0])
+
+
+def _insert_many(conn, dialect: str, table: str, columns, records: Sequence[Dict[str, object]]) -> List[int]:
+    values = [tuple(r[c] for c in columns) for r in records]
+    if not values:
+        return []
+    if dialect == "sqlite":
+        placeholders = ", ".join(["?"] * len(columns))
+        conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", values)
+        # AUTOINCREMENT hands out consecutive ids while this transaction holds the write lock.
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        last_id = int(row[0])
+        return list(range(last_id - len(values) + 1, last_id + 1))
+
+    placeholders = ", ".join(["%s"] * len(columns))
+    ids: List[int] = []
+    with conn.cursor() as cur:
+        cur.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) RETURNING id",
+            values,
+            returning=True,
+        )
+        while True:
+            ids.append(int(cur.fetchone()[0]))
+            if not cur.nextset():
+                break
+    return ids
+
+
+def transaction(conn, dialect: str):
+    # psycopg's connection context manager closes the connection on exit, which
+    # would break long-lived callers; use an explicit transaction block instead.
+    # Writers enter it inside ``pipeline()``, so on Postgres BEGIN, the side-table
+    # and outbox inserts and COMMIT go out without a round trip each.
+    if dialect == "sqlite":
+        return conn
+    return conn.transaction()
+
+
+def side_tables(conn, dialect: str) -> Set[str]:
+    """Which of ``SIDE_TABLES`` this database has, in one query."""
+    if dialect == "sqlite":
+        marks = ", ".join("?" * len(SIDE_TABLES))
+        rows = conn.execute(
+            f"SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ({marks})", SIDE_TABLES
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT name FROM unnest(%s::text[]) AS name WHERE to_regclass(name) IS NOT NULL", (list(SIDE_TABLES),)
+        ).fetchall()
+    return {row[0] for row in rows}
+
+
+def _enqueue(conn, dialect: str, kind: str, records: Sequence[Dict[str, object]], ids: Sequence[int]) -> None:
+    by_project: Dict[str, List[int]] = {}
+    for record, row_id in zip(records, ids):
+        by_project.setdefault(str(record["project"]), []).append(row_id)
+    for project, row_ids in by_project.items():
+        enqueue(conn, dialect, kind, row_ids, project)
+
+
+def insert_memory(conn, dialect: str, record: Dict[str, object], defer_index: bool = False) -> int:
+    """Insert one memory row (JSON list columns already encoded) and return its id.
+
+    Its concepts, files and tags go to the facet side tables and its signature to
+    ``memory_signatures`` in the same transaction. With ``defer_index`` the row is
+    also queued in ``vector_outbox``.
+    """
+    tables = side_tables(conn, dialect)
+    with pipeline(conn, dialect), transaction(conn, dialect):
+        memory_id = _insert(conn, dialect, "memories", MEMORY_COLUMNS, record)
+        if "memory_tags" in tables:
+            insert_facets(conn, dialect, [record], [memory_id])
+        if "memory_signatures" in tables:
+            insert_signatures(conn, dialect, [record], [memory_id])
+        if defer_index:
+            _enqueue(conn, dialect, MEMORY_KIND, [record], [memory_id])
+        return memory_id
+
+
+def insert_turn(conn, dialect: str, record: Dict[str, object], defer_index: bool = False) -> int:
+    """Insert one conversation turn (JSON columns already encoded) and return its id."""
+    with pipeline(conn, dialect), transaction(conn, dialect):
+        turn_id = _insert(conn, dialect, "conversation_turns", TURN_COLUMNS, record)
+        if defer_index:
+            _enqueue(conn, dialect, TURN_KIND, [record], [turn_id])
+        return turn_id
+
+
+def insert_memories(
+    conn, dialect: str, records: Sequence[Dict[str, object]], defer_index: bool = False
+) -> List[int]:
+    """Insert a batch of memory rows in one transaction and return their ids in order."""
+    tables = side_tables(conn, dialect)
+    with pipeline(conn, dialect), transaction(conn, dialect):
+        ids = _insert_many(conn, dialect, "memories", MEMORY_COLUMNS, records)
+        if "memory_tags" in tables:
+            insert_facets(conn, dialect, records, ids)
+        if "memory_signatures" in tables:
+            insert_signatures(conn, dialect, records, ids)
+        if defer_index:
+            _enqueue(conn, dialect, MEMORY_KIND, records, ids)
+        return ids
+
+
+def _insert_deduplicated(
+    conn, dialect: str, records: Sequence[Dict[str, object]], dedup, defer_index: bool
+) -> Tuple[List[int], List[Dict[str, object]]]:
+    """Insert a batch, folding duplicates into stored memories (see ``Deduplicator``).
+
+    Returns the id each record ended up under and the rows whose vectors need
+    writing: the inserted ones and the stored ones a merge rewrote. Without
+    ``memory_signatures`` only duplicates within the batch are folded.
+    """
+    tables = side_tables(conn, dialect)
+    signed = "memory_signatures" in tables
+    with pipeline(conn, dialect), transaction(conn, dialect):
+        plan = dedup.resolve(conn, dialect, records, stored=signed)
+        ids = _insert_many(conn, dialect, "memories", MEMORY_COLUMNS, plan.fresh)
+        if "memory_tags" in tables:
+            insert_facets(conn, dialect, plan.fresh, ids)
+        if signed:
+            insert_signatures(conn, dialect, plan.fresh, ids, plan.signatures)
+        changed = [{**record, "id": row_id} for record, row_id in zip(plan.fresh, ids)] + plan.merged
+        if defer_index:
+            _enqueue(conn, dialect, MEMORY_KIND, changed, [r["id"] for r in changed])
+        return plan.ids(ids), changed
+
+
+def insert_turns(
+    conn, dialect: str, records: Sequence[Dict[str, object]], defer_index: bool = False
+) -> List[int]:
+    """Insert a batch of conversation turns in one transaction and return their ids in order."""
+    with pipeline(conn, dialect), transaction(conn, dialect):
+        ids = _insert_many(conn, dialect, "conversation_turns", TURN_COLUMNS, records)
+        if defer_index:
+            _enqueue(conn, dialect, TURN_KIND, records, ids)
+        return ids
+
+
+def add_memory(
+    conn, dialect: str, record: Dict[str, object], vectors=None, defer_index: bool = False, cache=None, dedup=None
+) -> int:
+    if dedup is not None:
+        return add_memories(conn, dialect, [record], vectors, defer_index, cache, dedup)[0]
+    memory_id = insert_memory(conn, dialect, record, defer_index=defer_index)
+    if vectors is not None and not defer_index:
+        vectors.sync_memory({**record, "id": memory_id})
+    if cache is not None:
+        cache.invalidate([record["project"]])
+    return memory_id
+
+
+def add_turn(
+    conn, dialect: str, record: Dict[str, object], vectors=None, defer_index: bool = False, cache=None
+) -> int:
+    turn_id = insert_turn(conn, dialect, record, defer_index=defer_index)
+    if vectors is not None and not defer_index:
+        vectors.sync_turn({**record, "id": turn_id})
+    if cache is not None:
+        cache.invalidate([record["project"]])
+    return turn_id
+
+
+def add_memories(
+    conn,
+    dialect: str,
+    records: Sequence[Dict[str, object]],
+    vectors=None,
+    defer_index: bool = False,
+    cache=None,
+    dedup=None,
+) -> List[int]:
+    """Insert memories, index them and invalidate cached searches; return their ids.
+
+    With ``dedup`` (a ``Deduplicator``), a duplicate of a stored or earlier memory
+    is merged into it instead, and its id is the one returned.
+    """
+    if dedup is not None:
+        ids, changed = _insert_deduplicated(conn, dialect, records, dedup, defer_index)
+    else:
+        ids = insert_memories(conn, dialect, records, defer_index=defer_index)
+        changed = [{**record, "id": row_id} for record, row_id in zip(records, ids)]
+    if vectors is not None and not defer_index:
+        vectors.sync_memories(changed)
+    if cache is not None:
+        cache.invalidate(record["project"] for record in records)
+    return ids
+
+
+def add_turns(
+    conn,
+    dialect: str,
+    records: Sequence[Dict[str, object]],
+    vectors=None,
+    defer_index: bool = False,
+    cache=None,
+) -> List[int]:
+    ids = insert_turns(conn, dialect, records, defer_index=defer_index)
+    if vectors is not None and not defer_index:
+        vectors.sync_turns([{**record, "id": row_id} for record, row_id in zip(records, ids)])
+    if cache is not None:
+        cache.invalidate(record["project"] for record in records)
+    return ids
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import time
+from typing import Dict, List, Sequence, Tuple
+
+Record = Tuple[str, str, Dict[str, object]]
+
+
+def record_hash(document: str, metadata: Dict[str, object]) -> str:
+    payload = document + "\x00" + json.dumps(metadata, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SyncState:
+    """Per-collection watermark and row hashes so backfills only embed new or changed rows.
+
+    Hashes are recorded after each batch is upserted, so an interrupted backfill
+    resumes where it stopped. The watermark (highest synced id) is only advanced
+    by unfiltered scans in id order; filtered scans would leave gaps below it.
+    """
+
+    def __init__(self, conn, collection: str, track_watermark: bool = True):
+        self.conn = conn
+        self.collection = collection
+        self.track_watermark = track_watermark
+        self.skipped = 0
+
+    def watermark(self) -> Tuple[int, int]:
+        row = self.conn.execute(
+            "SELECT last_id, last_epoch FROM vector_sync_state WHERE collection = ?", (self.collection,)
+        ).fetchone()
+        if row is None:
+            return 0, 0
+        return int(row[0]), int(row[1])
+
+    def reset(self) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM vector_sync_rows WHERE collection = ?", (self.collection,))
+            self.conn.execute("DELETE FROM vector_sync_state WHERE collection = ?", (self.collection,))
+
+    def pending(self, records: Sequence[Record]) -> List[Record]:
+        """Drop records whose hash matches the last synced version."""
+        if not records:
+            return []
+        ids = [int(r[2]["sqlite_id"]) for r in records]
+        placeholders = ",".join(["?"] * len(ids))
+        rows = self.conn.execute(
+            "SELECT row_id, content_hash FROM vector_sync_rows "
+            f"WHERE collection = ? AND row_id IN ({placeholders})",
+            (self.collection, *ids),
+        ).fetchall()
+        known = {int(r[0]): r[1] for r in rows}
+
+        out: List[Record] = []
+        for record in records:
+            if known.get(int(record[2]["sqlite_id"])) == record[2].get("content_hash"):
+                self.skipped += 1
+                continue
+            out.append(record)
+        return out
+
+    def commit(self, scanned: Sequence[Record], synced: Sequence[Record]) -> None:
+        now = int(time.time())
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO vector_sync_rows (collection, row_id, content_hash, synced_at_epoch) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(collection, row_id) DO UPDATE SET "
+                "content_hash = excluded.content_hash, synced_at_epoch = excluded.synced_at_epoch",
+                [(self.collection, int(r[2]["sqlite_id"]), r[2]["content_hash"], now) for r in synced],
+            )
+            if not self.track_watermark or not scanned:
+                return
+            last_id = max(int(r[2]["sqlite_id"]) for r in scanned)
+            last_epoch = max(int(r[2].get("created_at_epoch", 0)) for r in scanned)
+            self.conn.execute(
+                "INSERT INTO vector_sync_state (collection, last_id, last_epoch, updated_at_epoch) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(collection) DO UPDATE SET "
+                "last_id = MAX(last_id, excluded.last_id), "
+                "last_epoch = MAX(last_epoch, excluded.last_epoch), "
+                "updated_at_epoch = excluded.updated_at_epoch",
+                (self.collection, last_id, last_epoch, now),
+            )
@@ -0,0 +1,35 @@
+from typing import Dict
+
+from .chroma_sync import ChromaSync
+from .config import get_bool
+from .numpy_index import NumpyIndex
+from .pgvector_sync import PgVectorSync
+from .vector_index import VectorIndex
+
+# Database dialects each vector provider can index. Chroma and numpy key vectors by
+# SQL row id, so they work beside either database; pgvector lives inside Postgres.
+PROVIDER_DIALECTS = {
+    "chroma": {"sqlite"},
+    "numpy": {"sqlite", "postgres"},
+    "pgvector": {"postgres"},
+}
+
+
+def vector_provider(settings: Dict[str, str]) -> str:
+    return str(settings.get("CODEX_MEM_VECTOR_PROVIDER", "chroma")).strip().lower() or "chroma"
+
+
+def vector_supported(settings: Dict[str, str], dialect: str) -> bool:
+    if not get_bool(settings, "CODEX_MEM_VECTOR_ENABLED"):
+        return False
+    return dialect in PROVIDER_DIALECTS.get(vector_provider(settings), set())
+
+
+def create_vector_index(settings: Dict[str, str], conn, dialect: str) -> VectorIndex:
+    """Build the configured vector provider for this connection."""
+    provider = vector_provider(settings)
+    if provider == "pgvector" and dialect == "postgres":
+        return PgVectorSync(settings, conn)
+    if provider == "numpy":
+        return NumpyIndex(settings)
+    return ChromaSync(settings)
@@ -0,0 +1,228 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .config import get_int
+from .records import csv_or_json_list
+from .sync_state import Record, SyncState, record_hash
+
+DEFAULT_BATCH_SIZE = 256
+
+MEMORY_KIND = "memory"
+TURN_KIND = "turn"
+
+# A metadata predicate pushed into the vector query: (key, "=" | ">=" | "<=", value).
+Condition = Tuple[str, str, object]
+
+
+def chunked(items: Iterable[Dict[str, object]], size: int) -> Iterator[List[Dict[str, object]]]:
+    chunk: List[Dict[str, object]] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def memory_document(memory: Dict[str, object]) -> str:
+    summary = str(memory.get("summary", ""))
+    details = str(memory.get("details", ""))
+    return (summary + "\n\n" + details).strip() or summary
+
+
+def turn_document(turn: Dict[str, object]) -> str:
+    role = str(turn.get("role", ""))
+    content = str(turn.get("content", ""))
+    context = str(turn.get("context_json", ""))
+    return (role + "\n\n" + content + "\n\n" + context).strip() or content
+
+
+def concept_key(concept: str) -> str:
+    # Vector stores only hold scalar metadata, so each concept becomes its own flag.
+    return "concept:" + concept
+
+
+def memory_record(memory: Dict[str, object]) -> Record:
+    memory_id = int(memory["id"])
+    document = memory_document(memory)
+    metadata = {
+        "sqlite_id": memory_id,
+        "project": str(memory.get("project", "")),
+        "type": str(memory.get("type", "")),
+        "tags": str(memory.get("tags", "")),
+        "created_at_epoch": int(memory.get("created_at_epoch", 0)),
+    }
+    for concept in csv_or_json_list(memory.get("concepts")):
+        metadata[concept_key(concept)] = True
+    metadata["content_hash"] = record_hash(document, metadata)
+    return f"mem_{memory_id}", document, metadata
+
+
+def turn_record(turn: Dict[str, object]) -> Record:
+    turn_id = int(turn["id"])
+    document = turn_document(turn)
+    metadata = {
+        "sqlite_id": turn_id,
+        "project": str(turn.get("project", "")),
+        "session_id": str(turn.get("session_id", "")),
+        "role": str(turn.get("role", "")),
+        "created_at_epoch": int(turn.get("created_at_epoch", 0)),
+    }
+    metadata["content_hash"] = record_hash(document, metadata)
+    return f"turn_{turn_id}", document, metadata
+
+
+def empty_result() -> Dict[str, object]:
+    return {"ids": [], "distances": [], "metadatas": []}
+
+
+class VectorIndex(ABC):
+    """Operations every vector provider supports, keyed by row kind (memory or turn).
+
+    Providers implement ``available``, ``_upsert``, ``_nearest`` and ``_delete``
+    (abstract, so a provider missing one fails when constructed); record building,
+    batching and incremental backfill live here. ``_nearest`` returns
+    ``{"ids", "distances", "metadatas"}`` with ids as SQL row ids, nearest first.
+    It should apply the ``where`` conditions it can; callers re-check every filter
+    in SQL, so a provider that ignores one only costs over-fetch, not correctness.
+    Providers that keep vectors inside the SQL database set ``in_database`` so the
+    search orchestrators can rank in their own filtered query instead.
+    """
+
+    in_database = False
+
+    def __init__(self, settings: Dict[str, str]):
+        self.settings = settings
+        self.collection_name = settings.get("CODEX_MEM_VECTOR_COLLECTION", "codex-mem")
+        self.turns_collection_name = settings.get("CODEX_MEM_VECTOR_COLLECTION_TURNS", "codex-mem-turns")
+        self.batch_size = max(1, get_int(settings, "CODEX_MEM_VECTOR_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+        self._error: Optional[str] = None
+
+    @property
+    @abstractmethod
+    def available(self) -> bool:
+        ...
+
+    @property
+    def error(self) -> Optional[str]:
+        return self._error
+
+    def collection_for(self, kind: str) -> str:
+        return self.collection_name if kind == MEMORY_KIND else self.turns_collection_name
+
+    def sync_state_name(self, kind: str) -> str:
+        """Collection key for ``SyncState``; must differ between providers sharing a database."""
+        return self.collection_for(kind)
+
+    @abstractmethod
+    def _upsert(self, kind: str, records: List[Record]) -> None:
+        ...
+
+    @abstractmethod
+    def _nearest(self, kind: str, query: str, limit: int, where: List[Condition]) -> Dict[str, object]:
+        ...
+
+    def _nearest_many(self, kind: str, queries: List[str], limit: int, where: List[Condition]) -> List[Dict[str, object]]:
+        # Providers that embed and search several queries in one call override this.
+        return [self._nearest(kind, query, limit, where) for query in queries]
+
+    @abstractmethod
+    def _delete(self, kind: str, row_ids: List[int]) -> None:
+        ...
+
+    def sync_memory(self, memory: Dict[str, object]) -> None:
+        self.sync_memories([memory])
+
+    def sync_memories(self, memories: List[Dict[str, object]]) -> None:
+        if not self.available or not memories:
+            return
+        self._upsert(MEMORY_KIND, [memory_record(m) for m in memories])
+
+    def sync_turn(self, turn: Dict[str, object]) -> None:
+        self.sync_turns([turn])
+
+    def sync_turns(self, turns: List[Dict[str, object]]) -> None:
+        if not self.available or not turns:
+            return
+        self._upsert(TURN_KIND, [turn_record(t) for t in turns])
+
+    def query(
+        self, query: str, limit: int, project: Optional[str] = None, conditions: Sequence[Condition] = ()
+    ) -> Dict[str, object]:
+        if not self.available:
+            return empty_result()
+        where = [("project", "=", project)] if project else []
+        return self._nearest(MEMORY_KIND, query, max(limit, 1), where + list(conditions))
+
+    def query_many(
+        self, queries: Sequence[str], limit: int, project: Optional[str] = None, conditions: Sequence[Condition] = ()
+    ) -> List[Dict[str, object]]:
+        """``query`` for several texts under the same filters; one result per text, in order."""
+        if not self.available or not queries:
+            return [empty_result() for _ in queries]
+        where = [("project", "=", project)] if project else []
+        return self._nearest_many(MEMORY_KIND, list(queries), max(limit, 1), where + list(conditions))
+
+    def query_turns(
+        self,
+        query: str,
+        limit: int,
+        project: Optional[str] = None,
+        session_id: Optional[str] = None,
+        conditions: Sequence[Condition] = (),
+    ) -> Dict[str, object]:
+        if not self.available:
+            return empty_result()
+        where = [(key, "=", value) for key, value in (("project", project), ("session_id", session_id)) if value]
+        return self._nearest(TURN_KIND, query, max(limit, 1), where + list(conditions))
+
+    def delete_memories(self, memory_ids: Sequence[int]) -> None:
+        if self.available and memory_ids:
+            self._delete(MEMORY_KIND, [int(i) for i in memory_ids])
+
+    def delete_turns(self, turn_ids: Sequence[int]) -> None:
+        if self.available and turn_ids:
+            self._delete(TURN_KIND, [int(i) for i in turn_ids])
+
+    def _backfill(
+        self,
+        kind: str,
+        rows: Iterable[Dict[str, object]],
+        to_record: Callable[[Dict[str, object]], Record],
+        batch_size: Optional[int],
+        on_progress: Optional[Callable[[int], None]],
+        state: Optional[SyncState],
+    ) -> int:
+        if not self.available:
+            return 0
+        synced = 0
+        for chunk in chunked(rows, batch_size or self.batch_size):
+            scanned = [to_record(row) for row in chunk]
+            records = state.pending(scanned) if state else scanned
+            if records:
+                self._upsert(kind, records)
+            if state:
+                state.commit(scanned, records)
+            synced += len(records)
+            if on_progress:
+                on_progress(synced)
+        return synced
+
+    def backfill(
+        self,
+        memories: Iterable[Dict[str, object]],
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[int], None]] = None,
+        state: Optional[SyncState] = None,
+    ) -> int:
+        return self._backfill(MEMORY_KIND, memories, memory_record, batch_size, on_progress, state)
+
+    def backfill_turns(
+        self,
+        turns: Iterable[Dict[str, object]],
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[int], None]] = None,
+        state: Optional[SyncState] = None,
+    ) -> int:
+        return self._backfill(TURN_KIND, turns, turn_record, batch_size, on_progress, state)
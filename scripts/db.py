@@ -2,7 +2,8 @@ import os
 import sqlite3
 from pathlib import Path
 
-from core.config import get_data_dir, load_settings
+from core.config import get_data_dir, load_settings, sqlite_profile
+from core.postgres import PooledConnection, connect_kwargs, open_pool, set_read_only
 
 DEFAULT_DB_URL = "sqlite://" + str(get_data_dir() / "codex-mem.db")
 
@@ -18,9 +19,40 @@ def parse_db_url(db_url: str):
     return ("postgres", db_url)
 
 
-def connect():
+def open_sqlite(path, profile, shared: bool = False, read_only: bool = False) -> sqlite3.Connection:
+    """Open a SQLite database with the PRAGMAs of ``profile`` (see ``sqlite_profile``).
+
+    ``read_only`` sets ``query_only``, so a search process can never take the write
+    lock and, under WAL, never waits for writers.
+    """
+    conn = sqlite3.connect(str(path), timeout=profile["busy_timeout"] / 1000, check_same_thread=not shared)
+    conn.row_factory = sqlite3.Row
+    # busy_timeout first, so switching the journal mode waits out other connections.
+    conn.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}")
+    if not read_only and conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+        # A new file: auto_vacuum can only be chosen before WAL or any table is set up.
+        # Incremental lets retention hand pages back without a full VACUUM.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+    conn.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+def connect(shared: bool = False, read_only: bool = False):
+    """Open the configured database.
+
+    ``shared`` is for long-lived processes: the SQLite handle may be used from
+    several threads (callers serialize access) and Postgres runs in autocommit
+    so reads never leave a transaction idle between requests. ``read_only`` is
+    for search commands; writes through the connection fail.
+    """
     # Ensure settings file exists on first run.
-    load_settings()
+    settings = load_settings()
 
     db_url = get_db_url()
     dialect, target = parse_db_url(db_url)
@@ -28,9 +60,7 @@ def connect():
     if dialect == "sqlite":
         db_path = Path(target).expanduser()
         db_path.parent.mkdir(parents=True, exist_ok=True)
-        conn = sqlite3.connect(str(db_path))
-        conn.row_factory = sqlite3.Row
-        return conn, "sqlite"
+        return open_sqlite(db_path, sqlite_profile(settings), shared=shared, read_only=read_only), "sqlite"
 
     try:
         import psycopg  # type: ignore
@@ -39,5 +69,23 @@ def connect():
             "psycopg is required for PostgreSQL. Install with: pip install psycopg"
         ) from exc
 
-    conn = psycopg.connect(target)
+    conn = psycopg.connect(target, **connect_kwargs(settings, autocommit=shared))
+    if read_only:
+        set_read_only(conn)
     return conn, "postgres"
+
+
+def connect_pooled(read_only: bool = False):
+    """Open the configured database for a long-lived process.
+
+    On PostgreSQL this is a ``PooledConnection``: statements borrow from a
+    ``psycopg_pool`` pool sized by the ``CODEX_MEM_PG_POOL_*`` settings, so
+    connection setup is paid once per pooled connection instead of once per use,
+    and broken connections are replaced. SQLite connections are cheap to open and
+    come back as ``connect(shared=True)``.
+    """
+    settings = load_settings()
+    dialect, target = parse_db_url(get_db_url())
+    if dialect == "sqlite":
+        return connect(shared=True, read_only=read_only)
+    return PooledConnection(open_pool(target, settings, read_only=read_only)), "postgres"
@@ -1,18 +1,42 @@
 import argparse
 import json
+import sys
 
-from db import connect
-from core.chroma_sync import ChromaSync
+from db import connect, get_db_url
 from core.config import get_bool, load_settings
+from core.query_cache import QueryCache
+from core.sync_state import SyncState
+from core.vector import create_vector_index, vector_provider, vector_supported
+from core.vector_index import MEMORY_KIND
 
 
 def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument("--project", default="")
     p.add_argument("--limit", type=int, default=0)
+    p.add_argument("--batch-size", type=int, default=0, help="rows per vector index write (default: settings)")
+    p.add_argument("--full", action="store_true", help="forget sync state and re-embed every matching row")
+    p.add_argument("--new-only", action="store_true", help="only scan rows above the sync watermark")
     return p.parse_args()
 
 
+def _stream_rows(cursor, counter):
+    # Iterate the cursor so only one batch of rows is held in memory at a time.
+    for row in cursor:
+        counter["rows"] += 1
+        yield dict(row)
+
+
+def _report_progress(synced: int) -> None:
+    print(f"synced {synced}", file=sys.stderr, flush=True)
+
+
+def _invalidate_cache(settings, project: str, synced: int) -> None:
+    # Re-embedded rows change vector rankings, so cached searches must not outlive them.
+    if synced:
+        QueryCache(settings, get_db_url()).invalidate([project] if project else None)
+
+
 def main() -> int:
     args = parse_args()
     settings = load_settings()
@@ -21,37 +45,81 @@ def main() -> int:
         print("vector search is disabled (CODEX_MEM_VECTOR_ENABLED=false)")
         return 0
 
+    provider = vector_provider(settings)
     conn, dialect = connect()
+    if not vector_supported(settings, dialect):
+        print(f"vector provider {provider} does not support {dialect}")
+        return 0
+
+    vectors = create_vector_index(settings, conn, dialect)
+    if not vectors.available:
+        message = vectors.error or f"{provider} unavailable"
+        raise SystemExit(f"failed to initialize {provider}: {message}")
+
+    if vectors.in_database:
+        # pgvector rows carry their embedding, so "embedding IS NULL" replaces the sync state.
+        rows = vectors.missing_rows(
+            "memories",
+            ("id", "project", "type", "tags", "summary", "details", "concepts", "created_at_epoch"),
+            {"project": args.project},
+            include_embedded=args.full,
+            limit=args.limit,
+        )
+        counter = {"rows": 0}
+        synced = vectors.backfill(
+            _stream_rows(rows, counter), batch_size=args.batch_size or None, on_progress=_report_progress
+        )
+        _invalidate_cache(settings, args.project, synced)
+        print(json.dumps({"synced": synced, "skipped": 0, "rows": counter["rows"]}, ensure_ascii=False))
+        return 0
+
     if dialect != "sqlite":
-        print("backfill currently supports sqlite only")
+        print(f"backfill with {provider} currently supports sqlite only")
         return 0
 
-    chroma = ChromaSync(settings)
-    if not chroma.available:
-        message = chroma.error or "chroma unavailable"
-        raise SystemExit(f"failed to initialize chroma: {message}")
+    # Only unfiltered scans in id order may advance the watermark.
+    filtered = bool(args.project or args.limit)
+    state = SyncState(conn, vectors.sync_state_name(MEMORY_KIND), track_watermark=not filtered)
+    if args.full:
+        state.reset()
 
     params = []
     where = []
+    if args.new_only:
+        last_id, _ = state.watermark()
+        where.append("id > ?")
+        params.append(last_id)
     if args.project:
         where.append("project = ?")
         params.append(args.project)
 
     sql = (
-        "SELECT id, project, type, tags, summary, details, created_at_epoch "
+        "SELECT id, project, type, tags, summary, details, concepts, created_at_epoch "
         "FROM memories "
         + ("WHERE " + " AND ".join(where) + " " if where else "")
-        + "ORDER BY created_at_epoch DESC"
+        + ("ORDER BY created_at_epoch DESC" if args.limit and args.limit > 0 else "ORDER BY id")
     )
     if args.limit and args.limit > 0:
         sql += " LIMIT ?"
         params.append(args.limit)
 
-    rows = conn.execute(sql, tuple(params)).fetchall()
-    payload = [dict(r) for r in rows]
-    synced = chroma.backfill(payload)
+    cursor = conn.execute(sql, tuple(params))
+    counter = {"rows": 0}
+    synced = vectors.backfill(
+        _stream_rows(cursor, counter),
+        batch_size=args.batch_size or None,
+        on_progress=_report_progress,
+        state=state,
+    )
 
-    print(json.dumps({"synced": synced, "rows": len(payload)}, ensure_ascii=False))
+    _invalidate_cache(settings, args.project, synced)
+    last_id, _ = state.watermark()
+    print(
+        json.dumps(
+            {"synced": synced, "skipped": state.skipped, "rows": counter["rows"], "last_id": last_id},
+            ensure_ascii=False,
+        )
+    )
     return 0
 
 
@@ -0,0 +1,676 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from core.bench import (
+    ROLES,
+    TYPES,
+    WORDS,
+    compare_reports,
+    peak_rss_mb,
+    percentile,
+    report_meta,
+    rss_mb,
+    sample_queries,
+    seed_sqlite_memories,
+    seed_sqlite_turns,
+    synthetic_memory_records,
+    synthetic_turn_records,
+    time_calls,
+)
+from core.config import load_settings, sqlite_profile
+from core.dedup import Deduplicator, dedup_enabled
+from core.postgres import connect_kwargs
+from core.facets import project_facets
+from core.records import build_memory_record
+from core.query_plans import check_search_plans, search_runner, search_shapes
+from core.conversation_search import ConversationSearchOrchestrator, ConversationSearchRequest
+from core.search import SearchOrchestrator, SearchRequest
+from core.store import add_memories, add_memory, add_turn, add_turns, insert_memory, transaction
+from core.vector import create_vector_index, vector_provider, vector_supported
+from db import open_sqlite
+from memory_init import (
+    SEARCH_INDEXES,
+    SUPERSEDED_INDEXES,
+    ensure_postgres_migrations,
+    ensure_search_indexes,
+    ensure_sqlite_migrations,
+)
+
+BENCH_PROJECT = "bench"
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--suite", default="memory-fts", choices=sorted(SUITES))
+    p.add_argument("--sizes", default="10000,100000,1000000")
+    p.add_argument("--queries", type=int, default=50)
+    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--writers", type=int, default=4, help="writer processes (concurrency suite)")
+    p.add_argument("--readers", type=int, default=4, help="reader processes (concurrency suite)")
+    p.add_argument("--seconds", type=float, default=5.0, help="run time per profile (concurrency suite)")
+    p.add_argument("--projects", type=int, default=4, help="projects the corpus is spread over (end-to-end suite)")
+    p.add_argument("--adds", type=int, default=200, help="single-row writes timed per kind (end-to-end suite)")
+    p.add_argument(
+        "--postgres-url",
+        default="",
+        help="also run on this Postgres database, in a scratch schema dropped afterwards (end-to-end suite)",
+    )
+    p.add_argument("--out", default="", help="also write the report to this file")
+    p.add_argument("--compare", default="", help="compare with an earlier report; exit 1 on a regression")
+    p.add_argument("--threshold", type=float, default=20.0, help="percent change --compare reports")
+    return p.parse_args()
+
+
+def _open_sqlite(path: Path):
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def bench_memory_fts(workdir: Path, size: int, args) -> dict:
+    conn = _open_sqlite(workdir / "bench.db")
+    with conn:
+        ensure_sqlite_migrations(conn)
+
+    started = time.perf_counter()
+    seed_sqlite_memories(conn, size, BENCH_PROJECT)
+    seed_seconds = time.perf_counter() - started
+
+    queries = sample_queries(args.queries)
+    result = {"rows": size, "seed_seconds": round(seed_seconds, 3)}
+    for label, fts in (("like", "false"), ("fts", "true")):
+        orchestrator = SearchOrchestrator(conn, "sqlite", {"CODEX_MEM_FTS_ENABLED": fts}, vector_enabled=False)
+
+        def run(query, orchestrator=orchestrator):
+            orchestrator.search(SearchRequest(project=BENCH_PROJECT, query=query, limit=args.limit, strategy="sqlite"))
+
+        result[label] = time_calls(run, queries)
+    conn.close()
+    return result
+
+
+def bench_conversation_fts(workdir: Path, size: int, args) -> dict:
+    conn = _open_sqlite(workdir / "bench.db")
+    with conn:
+        ensure_sqlite_migrations(conn)
+
+    started = time.perf_counter()
+    seed_sqlite_turns(conn, size, BENCH_PROJECT)
+    seed_seconds = time.perf_counter() - started
+
+    queries = sample_queries(args.queries)
+    result = {"rows": size, "seed_seconds": round(seed_seconds, 3)}
+    for label, fts in (("like", "false"), ("fts", "true")):
+        orchestrator = ConversationSearchOrchestrator(
+            conn, "sqlite", {"CODEX_MEM_FTS_ENABLED": fts}, vector_enabled=False
+        )
+
+        def run(query, orchestrator=orchestrator):
+            orchestrator.search(
+                ConversationSearchRequest(project=BENCH_PROJECT, query=query, limit=args.limit, strategy="sqlite")
+            )
+
+        result[label] = time_calls(run, queries)
+    conn.close()
+    return result
+
+
+def _filtered_requests(count: int, limit: int, size: int, seed: int = 17) -> list:
+    """Queries with a mix of selective filters, as a hybrid search would see them."""
+    rng = random.Random(seed)
+    oldest = 1700000000
+    newest = oldest + size * 60
+    requests = []
+    for query in sample_queries(count, seed=seed):
+        filters = {}
+        if rng.random() < 0.6:
+            filters["type_filter"] = rng.choice(TYPES)
+        if rng.random() < 0.4:
+            filters["concept_filter"] = rng.choice(WORDS)
+        if rng.random() < 0.3:
+            filters["tags_filter"] = rng.choice(WORDS)
+        if rng.random() < 0.5:
+            # An older window, where the newest-rows intersection has nothing to offer.
+            start = rng.randint(oldest, oldest + (newest - oldest) // 2)
+            filters["since"] = str(start)
+            filters["until"] = str(start + (newest - oldest) // 4)
+        requests.append(
+            SearchRequest(project=BENCH_PROJECT, query=query, limit=limit, strategy="hybrid", **filters)
+        )
+    return requests
+
+
+def _recall(found, truth) -> float:
+    if not truth:
+        return 1.0
+    return len({r["id"] for r in found} & {r["id"] for r in truth}) / len(truth)
+
+
+def bench_vector_filter(workdir: Path, size: int, args) -> dict:
+    conn = _open_sqlite(workdir / "bench.db")
+    with conn:
+        ensure_sqlite_migrations(conn)
+    seed_sqlite_memories(conn, size, BENCH_PROJECT)
+
+    settings = {**load_settings(), "CODEX_MEM_DATA_DIR": str(workdir), "CODEX_MEM_FTS_ENABLED": "true"}
+    vectors = create_vector_index(settings, conn, "sqlite")
+    if not vectors.available:
+        raise SystemExit(f"vector-filter needs a working {vector_provider(settings)} provider: {vectors.error}")
+
+    started = time.perf_counter()
+    cursor = conn.execute(
+        "SELECT id, project, type, tags, summary, details, concepts, created_at_epoch FROM memories ORDER BY id"
+    )
+    vectors.backfill(dict(row) for row in cursor)
+    index_seconds = time.perf_counter() - started
+
+    orchestrator = SearchOrchestrator(conn, "sqlite", settings, vector_enabled=True, vectors=vectors)
+    requests = _filtered_requests(args.queries, args.limit, size)
+
+    def exact(req):
+        # Brute force: rank every row, then filter. The ground truth for recall.
+        ranked = vectors.query(req.query, size, req.project).get("ids", [])
+        return orchestrator._hydrate_ids(ranked, req)[: req.limit]
+
+    def intersect(req):
+        # The previous hybrid plan: limit*4 nearest ids intersected with the newest limit*6 filtered rows.
+        ids = vectors.query(req.query, req.limit * 4, req.project).get("ids", [])
+        allowed = {int(r["id"]) for r in orchestrator._sql_search(req, include_query=False, limit=req.limit * 6)}
+        return orchestrator._hydrate_ids([i for i in ids if int(i) in allowed], req)
+
+    def pushdown(req):
+        return orchestrator._vector_search(req, req.limit)
+
+    truth = [exact(req) for req in requests]
+    result = {
+        "rows": size,
+        "provider": vector_provider(settings),
+        "index_seconds": round(index_seconds, 3),
+        "exact": time_calls(exact, requests),
+    }
+    for label, plan in (("intersect", intersect), ("pushdown", pushdown)):
+        found = [plan(req) for req in requests]
+        result[label] = {
+            **time_calls(plan, requests),
+            "recall": round(sum(_recall(f, t) for f, t in zip(found, truth)) / len(requests), 4),
+        }
+    conn.close()
+    return result
+
+
+def bench_indexes(workdir: Path, size: int, args) -> dict:
+    conn = _open_sqlite(workdir / "bench.db")
+    with conn:
+        ensure_sqlite_migrations(conn)
+    # Several projects, so a project filter is selective the way it is in real databases.
+    projects = [f"{BENCH_PROJECT}-{i}" for i in range(4)]
+    per_project = max(1, size // len(projects))
+    for project in projects:
+        seed_sqlite_memories(conn, per_project, project)
+        seed_sqlite_turns(conn, per_project, project)
+    since_epoch = 1700000000 + per_project * 60 // 2
+    shapes = search_shapes(projects[1], "session-3", since_epoch)
+
+    result = {"rows": per_project * len(projects), "projects": len(projects)}
+    for label in ("single_column", "composite"):
+        with conn:
+            if label == "single_column":
+                # The index set before composite indexes existed.
+                for name, _, _ in SEARCH_INDEXES:
+                    conn.execute(f"DROP INDEX IF EXISTS {name}")
+                for name, table, columns in SUPERSEDED_INDEXES:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})")
+            else:
+                ensure_search_indexes(conn)
+            conn.execute("ANALYZE")
+
+        plans = {r["shape"]: r for r in check_search_plans(conn, projects[1], "session-3", since_epoch)}
+        run = search_runner(conn)
+        result[label] = {
+            name: {
+                "sorts": plans[name]["sorts"],
+                "plan": plans[name]["plan"],
+                **time_calls(lambda _, req=req: run(req), range(args.queries)),
+            }
+            for name, req in shapes
+        }
+    conn.close()
+    return result
+
+
+def bench_facets(workdir: Path, size: int, args) -> dict:
+    conn = _open_sqlite(workdir / "bench.db")
+    with conn:
+        ensure_sqlite_migrations(conn)
+    projects = [f"{BENCH_PROJECT}-{i}" for i in range(4)]
+    per_project = max(1, size // len(projects))
+    for i, project in enumerate(projects):
+        seed_sqlite_memories(conn, per_project, project, seed=7 + i)
+    with conn:
+        conn.execute("ANALYZE")
+
+    rng = random.Random(23)
+    project = projects[1]
+    filters = {
+        "concept": [{"concept_filter": rng.choice(WORDS)} for _ in range(args.queries)],
+        "tag": [{"tags_filter": rng.choice(WORDS)} for _ in range(args.queries)],
+        "file": [{"file_filter": f"/{rng.choice(WORDS)}.py"} for _ in range(args.queries)],
+        "type_concept": [
+            {"type_filter": rng.choice(TYPES), "concept_filter": rng.choice(WORDS)} for _ in range(args.queries)
+        ],
+        # Values with few or no matches, where a per-row check walks the whole project.
+        "concept_missing": [{"concept_filter": rng.choice(WORDS) + "x"} for _ in range(args.queries)],
+        "file_path": [
+            {"file_filter": f"src/{rng.choice(WORDS)}/{rng.choice(WORDS)}.py"} for _ in range(args.queries)
+        ],
+    }
+
+    started = time.perf_counter()
+    facets = project_facets(conn, "sqlite", project, limit=20)
+    result = {
+        "rows": per_project * len(projects),
+        "projects": len(projects),
+        "facet_counts_ms": round((time.perf_counter() - started) * 1000, 3),
+        "top_concepts": facets["concept"][:5],
+    }
+    for label, side_tables in (("json_each", False), ("side_tables", True)):
+        orchestrator = SearchOrchestrator(conn, "sqlite", {"CODEX_MEM_FTS_ENABLED": "false"}, vector_enabled=False)
+        # The pre-migration filter SQL is still what runs when the side tables are missing.
+        orchestrator._facets_available = side_tables
+        result[label] = {
+            name: time_calls(
+                lambda f, orchestrator=orchestrator: orchestrator.search(
+                    SearchRequest(project=project, query=None, limit=args.limit, strategy="sqlite", **f)
+                ),
+                inputs,
+            )
+            for name, inputs in filters.items()
+        }
+    conn.close()
+    return result
+
+
+# What a bare sqlite3.connect() gets: rollback journal, FULL sync, 2 MB cache, no mmap.
+SQLITE_STOCK_PROFILE = {
+    "journal_mode": "delete",
+    "synchronous": "full",
+    "mmap_size": 0,
+    "cache_size": -2000,
+    "temp_store": "default",
+    "busy_timeout": 5000,
+}
+
+
+def _concurrency_worker(role: str, index: int, path: str, profile: dict, args, start, results) -> None:
+    conn = open_sqlite(path, profile, read_only=role == "reader")
+    rng = random.Random(index)
+    queries = sample_queries(200, seed=index)
+    orchestrator = SearchOrchestrator(conn, "sqlite", {"CODEX_MEM_FTS_ENABLED": "true"}, vector_enabled=False)
+    samples = []
+    errors = 0
+    start.wait()
+    deadline = time.perf_counter() + args.seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == "writer":
+                record = build_memory_record(
+                    BENCH_PROJECT,
+                    " ".join(rng.sample(WORDS, 6)),
+                    int(time.time()),
+                    details=" ".join(rng.sample(WORDS, 20)),
+                    tags=",".join(rng.sample(WORDS, 2)),
+                    memory_type=rng.choice(TYPES),
+                    concepts=rng.sample(WORDS, 2),
+                )
+                insert_memory(conn, "sqlite", record)
+            else:
+                query = rng.choice(queries)
+                orchestrator.search(SearchRequest(project=BENCH_PROJECT, query=query, limit=args.limit, strategy="sqlite"))
+        except sqlite3.OperationalError:
+            # "database is locked": the busy timeout ran out or a lock upgrade deadlocked.
+            errors += 1
+            continue
+        samples.append((time.perf_counter() - started) * 1000.0)
+    conn.close()
+    results.put((role, samples, errors))
+
+
+def _run_concurrency(path: Path, profile: dict, args) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Event()
+    results = ctx.Queue()
+    roles = ["writer"] * args.writers + ["reader"] * args.readers
+    procs = [
+        ctx.Process(target=_concurrency_worker, args=(role, i, str(path), profile, args, start, results))
+        for i, role in enumerate(roles)
+    ]
+    for proc in procs:
+        proc.start()
+    # Let every worker connect before the clock starts.
+    time.sleep(1.0)
+    start.set()
+    collected = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    out = {}
+    for role in ("writer", "reader"):
+        samples = [ms for r, values, _ in collected if r == role for ms in values]
+        out[role + "s"] = {
+            "processes": roles.count(role),
+            "ops": len(samples),
+            "ops_per_sec": round(len(samples) / args.seconds, 1),
+            "errors": sum(errors for r, _, errors in collected if r == role),
+            "p50_ms": round(percentile(samples, 50), 3),
+            "p95_ms": round(percentile(samples, 95), 3),
+            "p99_ms": round(percentile(samples, 99), 3),
+        }
+    return out
+
+
+def bench_concurrency(workdir: Path, size: int, args) -> dict:
+    seed_path = workdir / "seed.db"
+    conn = _open_sqlite(seed_path)
+    with conn:
+        ensure_sqlite_migrations(conn)
+    seed_sqlite_memories(conn, size, BENCH_PROJECT)
+    conn.close()
+
+    result = {"rows": size, "writers": args.writers, "readers": args.readers, "seconds": args.seconds}
+    for label, profile in (("stock", SQLITE_STOCK_PROFILE), ("configured", sqlite_profile(load_settings()))):
+        path = workdir / f"{label}.db"
+        shutil.copyfile(seed_path, path)
+        result[label] = {"profile": profile, **_run_concurrency(path, profile, args)}
+    return result
+
+
+# Filter combinations timed per search strategy in the end-to-end suite.
+MEMORY_FILTER_SETS = {
+    "none": (),
+    "type": ("type",),
+    "concept": ("concept",),
+    "tags": ("tags",),
+    "file": ("file",),
+    "window": ("window",),
+    "type_concept": ("type", "concept"),
+    "type_window": ("type", "window"),
+    "tags_file": ("tags", "file"),
+    "all": ("type", "concept", "tags", "file", "window"),
+}
+TURN_FILTER_SETS = {
+    "none": (),
+    "session": ("session",),
+    "role": ("role",),
+    "session_role": ("session", "role"),
+    "window": ("window",),
+}
+E2E_CHUNK = 1000
+E2E_START_EPOCH = 1700000000
+
+
+def _rows(cur) -> list:
+    names = [d[0] for d in cur.description]
+    return [dict(zip(names, row)) for row in cur.fetchall()]
+
+
+def _window(rng: random.Random, oldest: int, newest: int) -> dict:
+    start = rng.randint(oldest, max(oldest, newest - (newest - oldest) // 4))
+    return {"since": str(start), "until": str(start + (newest - oldest) // 4)}
+
+
+def _memory_filters(rng: random.Random, names, newest: int) -> dict:
+    filters = {}
+    for name in names:
+        if name == "type":
+            filters["type_filter"] = rng.choice(TYPES)
+        elif name == "concept":
+            filters["concept_filter"] = rng.choice(WORDS)
+        elif name == "tags":
+            filters["tags_filter"] = rng.choice(WORDS)
+        elif name == "file":
+            filters["file_filter"] = f"src/{rng.choice(WORDS)}"
+        elif name == "window":
+            filters.update(_window(rng, E2E_START_EPOCH, newest))
+    return filters
+
+
+def _turn_filters(rng: random.Random, names, sessions: int, newest: int) -> dict:
+    filters = {}
+    for name in names:
+        if name == "session":
+            filters["session_id"] = f"session-{rng.randrange(max(1, sessions))}"
+        elif name == "role":
+            filters["role"] = rng.choice(ROLES)
+        elif name == "window":
+            filters.update(_window(rng, E2E_START_EPOCH, newest))
+    return filters
+
+
+def _throughput(rows: int, seconds: float) -> dict:
+    return {"rows": rows, "seconds": round(seconds, 3), "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else 0.0}
+
+
+def _timed_writes(fn, records) -> dict:
+    started = time.perf_counter()
+    timings = time_calls(fn, records)
+    elapsed = time.perf_counter() - started
+    return {**timings, "ops_per_sec": round(len(records) / elapsed, 1) if elapsed > 0 else 0.0}
+
+
+def _e2e_backend(conn, dialect: str, settings: dict, size: int, args) -> dict:
+    """Init, single writes, bulk writes, vector backfill and every search shape on one database."""
+    result = {"dialect": dialect}
+    started = time.perf_counter()
+    # Migrations report skipped optional indexes on stdout, which carries the JSON report.
+    with contextlib.redirect_stdout(sys.stderr), transaction(conn, dialect):
+        if dialect == "sqlite":
+            ensure_sqlite_migrations(conn)
+        else:
+            ensure_postgres_migrations(conn, settings)
+    result["init"] = {"duration_ms": round((time.perf_counter() - started) * 1000, 3), "rss_mb": rss_mb()}
+
+    vectors = create_vector_index(settings, conn, dialect) if vector_supported(settings, dialect) else None
+    vector_ready = vectors is not None and vectors.available
+    result["vectors"] = vector_provider(settings) if vector_ready else None
+    if not vector_ready:
+        result["vectors_skipped"] = vectors.error if vectors is not None else f"not enabled for {dialect}"
+    dedup = Deduplicator(settings) if dedup_enabled(settings) else None
+
+    projects = [f"{BENCH_PROJECT}-{i}" for i in range(max(1, args.projects))]
+    per_project = max(1, size // len(projects))
+    target = projects[0]
+
+    # Single writes go through the CLI path, vector sync included; they land before the
+    # bulk rows of the same project, so their timestamps come first.
+    adds = max(1, args.adds)
+    memories = list(synthetic_memory_records(adds, target, seed=101, start_epoch=E2E_START_EPOCH - adds * 60))
+    turns = list(synthetic_turn_records(adds, target, seed=103, start_epoch=E2E_START_EPOCH - adds * 15))
+    index = vectors if vector_ready else None
+    result["add"] = {
+        "memories": _timed_writes(lambda r: add_memory(conn, dialect, r, index, dedup=dedup), memories),
+        "turns": _timed_writes(lambda r: add_turn(conn, dialect, r, index), turns),
+        "rss_mb": rss_mb(),
+    }
+
+    # Bulk writes without vectors: the SQL side of an ingest; the backfill below times the embedding side.
+    bulk = {}
+    for kind, generate, write in (
+        ("memories", synthetic_memory_records, lambda chunk: add_memories(conn, dialect, chunk, dedup=dedup)),
+        ("turns", synthetic_turn_records, lambda chunk: add_turns(conn, dialect, chunk)),
+    ):
+        rows = 0
+        started = time.perf_counter()
+        for n, project in enumerate(projects):
+            records = generate(per_project, project, seed=n + 1, start_epoch=E2E_START_EPOCH)
+            while True:
+                chunk = [r for _, r in zip(range(E2E_CHUNK), records)]
+                if not chunk:
+                    break
+                write(chunk)
+                rows += len(chunk)
+        bulk[kind] = _throughput(rows, time.perf_counter() - started)
+    if dedup is not None:
+        bulk["merged"] = dedup.merged
+    bulk["rss_mb"] = rss_mb()
+    result["bulk"] = bulk
+
+    if vector_ready:
+        backfill = {}
+        started = time.perf_counter()
+        rows = _rows(
+            conn.execute(
+                "SELECT id, project, type, tags, summary, details, concepts, created_at_epoch FROM memories ORDER BY id"
+            )
+        )
+        vectors.backfill(rows)
+        backfill["memories"] = _throughput(len(rows), time.perf_counter() - started)
+        started = time.perf_counter()
+        rows = _rows(
+            conn.execute(
+                "SELECT id, project, session_id, role, content, context_json, created_at_epoch "
+                "FROM conversation_turns ORDER BY id"
+            )
+        )
+        vectors.backfill_turns(rows)
+        backfill["turns"] = _throughput(len(rows), time.perf_counter() - started)
+        backfill["rss_mb"] = rss_mb()
+        result["backfill"] = backfill
+    else:
+        result["backfill"] = {"skipped": result["vectors_skipped"]}
+
+    with transaction(conn, dialect):
+        conn.execute("ANALYZE")
+
+    strategies = ["sqlite", "auto"] + (["chroma", "hybrid"] if vector_ready else [])
+    queries = sample_queries(args.queries)
+    memory_orchestrator = SearchOrchestrator(conn, dialect, settings, vector_enabled=vector_ready, vectors=index)
+    turn_orchestrator = ConversationSearchOrchestrator(
+        conn, dialect, settings, vector_enabled=vector_ready, vectors=index
+    )
+    memory_newest = E2E_START_EPOCH + per_project * 60
+    turn_newest = E2E_START_EPOCH + per_project * 15
+    sessions = per_project // 40 + 1
+    search = {"memories": {}, "turns": {}}
+    # "listing" is the query-less path: newest first under the filters.
+    for strategy in ["listing"] + strategies:
+        timings = {}
+        for label, names in MEMORY_FILTER_SETS.items():
+            rng = random.Random(f"memories:{strategy}:{label}")
+            requests = [
+                SearchRequest(
+                    project=target,
+                    query=None if strategy == "listing" else query,
+                    limit=args.limit,
+                    strategy="sqlite" if strategy == "listing" else strategy,
+                    **_memory_filters(rng, names, memory_newest),
+                )
+                for query in queries
+            ]
+            timings[label] = time_calls(memory_orchestrator.search, requests)
+        search["memories"][strategy] = timings
+        timings = {}
+        for label, names in TURN_FILTER_SETS.items():
+            rng = random.Random(f"turns:{strategy}:{label}")
+            requests = [
+                ConversationSearchRequest(
+                    project=target,
+                    query=None if strategy == "listing" else query,
+                    limit=args.limit,
+                    strategy="sqlite" if strategy == "listing" else strategy,
+                    **_turn_filters(rng, names, sessions, turn_newest),
+                )
+                for query in queries
+            ]
+            timings[label] = time_calls(turn_orchestrator.search, requests)
+        search["turns"][strategy] = timings
+    base = SearchRequest(project=target, query=None, limit=args.limit, strategy="auto")
+    batches = [queries[i : i + 10] for i in range(0, len(queries), 10)]
+    search["memories"]["batch_of_10"] = time_calls(lambda batch: memory_orchestrator.search_many(base, batch), batches)
+    search["rss_mb"] = rss_mb()
+    result["search"] = search
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def _postgres_scratch(url: str, settings: dict):
+    try:
+        import psycopg  # type: ignore
+    except Exception as exc:
+        raise SystemExit("psycopg is required for --postgres-url. Install with: pip install psycopg") from exc
+    conn = psycopg.connect(url, **connect_kwargs(settings, autocommit=True))
+    # A schema of its own keeps the run away from real tables; extensions resolve through public.
+    schema = f"codex_mem_bench_{os.getpid()}"
+    conn.execute(f"CREATE SCHEMA {schema}")
+    conn.execute(f"SET search_path TO {schema}, public")
+    return conn, schema
+
+
+def bench_end_to_end(workdir: Path, size: int, args) -> dict:
+    base = {**load_settings(), "CODEX_MEM_DATA_DIR": str(workdir / "sqlite"), "CODEX_MEM_FTS_ENABLED": "true"}
+    conn = open_sqlite(workdir / "e2e.db", sqlite_profile(base))
+    result = {"rows": size, "projects": max(1, args.projects), "sqlite": _e2e_backend(conn, "sqlite", base, size, args)}
+    conn.close()
+
+    if args.postgres_url:
+        settings = {**base, "CODEX_MEM_DATA_DIR": str(workdir / "postgres")}
+        conn, schema = _postgres_scratch(args.postgres_url, settings)
+        try:
+            result["postgres"] = _e2e_backend(conn, "postgres", settings, size, args)
+        finally:
+            conn.execute(f"DROP SCHEMA {schema} CASCADE")
+            conn.close()
+    return result
+
+
+SUITES = {
+    "memory-fts": bench_memory_fts,
+    "conversation-fts": bench_conversation_fts,
+    "vector-filter": bench_vector_filter,
+    "indexes": bench_indexes,
+    "facets": bench_facets,
+    "concurrency": bench_concurrency,
+    "end-to-end": bench_end_to_end,
+}
+
+
+def main() -> int:
+    args = parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    suite = SUITES[args.suite]
+
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix="codex-mem-bench-") as tmp:
+            results.append(suite(Path(tmp), size, args))
+
+    options = {k: v for k, v in vars(args).items() if k not in ("postgres_url", "out", "compare")}
+    options["postgres"] = bool(args.postgres_url)
+    report = {"suite": args.suite, "meta": report_meta(options), "results": results}
+    status = 0
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if baseline.get("suite") != args.suite:
+            raise SystemExit(f"{args.compare} is from the {baseline.get('suite')} suite, not {args.suite}")
+        report["compare"] = compare_reports(report, baseline, args.threshold)
+        status = 1 if report["compare"]["regressions"] else 0
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+import argparse
+import json
+import sys
+
+from db import connect, get_db_url
+from core.config import get_int, load_settings
+from core.dedup import DEFAULT_MAX_DISTANCE, backfill_signatures, collapse_clusters, find_duplicate_clusters
+from core.outbox import enqueue, indexing_mode
+from core.query_cache import QueryCache
+from core.store import transaction
+from core.vector import create_vector_index
+from core.vector_index import MEMORY_KIND
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Merge duplicate memories that are already stored.")
+    p.add_argument("--project", default="", help="only this project (default: all)")
+    p.add_argument("--max-distance", type=int, default=None, help="SimHash bits two duplicates may differ in")
+    p.add_argument("--exact", action="store_true", help="only merge memories with the same content hash")
+    p.add_argument("--batch-size", type=int, default=200, help="clusters merged per transaction")
+    p.add_argument("--dry-run", action="store_true", help="report duplicate clusters without merging")
+    p.add_argument("--show", type=int, default=10, help="clusters to list with --dry-run")
+    return p.parse_args()
+
+
+def _summaries(conn, dialect: str, ids):
+    mark = "?" if dialect == "sqlite" else "%s"
+    return [
+        conn.execute(f"SELECT summary FROM memories WHERE id = {mark}", (memory_id,)).fetchone()[0]
+        for memory_id in ids
+    ]
+
+
+def main() -> int:
+    args = parse_args()
+    settings = load_settings()
+    conn, dialect = connect()
+
+    with transaction(conn, dialect):
+        # Memories written before memory_signatures existed, or by an older client.
+        signed = backfill_signatures(conn, dialect)
+
+    if args.exact:
+        max_distance = 0
+    elif args.max_distance is not None:
+        max_distance = max(0, args.max_distance)
+    else:
+        max_distance = max(0, get_int(settings, "CODEX_MEM_DEDUP_MAX_DISTANCE", DEFAULT_MAX_DISTANCE))
+    clusters = find_duplicate_clusters(conn, dialect, max_distance, project=args.project or None)
+    summary = {
+        "signed": signed,
+        "clusters": len(clusters),
+        "duplicates": sum(len(c) - 1 for c in clusters),
+    }
+
+    if args.dry_run:
+        summary["examples"] = [
+            {"ids": cluster, "summaries": _summaries(conn, dialect, cluster)} for cluster in clusters[: args.show]
+        ]
+        print(json.dumps(summary, ensure_ascii=False))
+        return 0
+
+    mode = indexing_mode(settings, dialect)
+    vectors = create_vector_index(settings, conn, dialect) if mode != "off" else None
+    sync_collection = vectors.sync_state_name(MEMORY_KIND) if vectors is not None else None
+    cache = QueryCache(settings, get_db_url())
+
+    removed_total = 0
+    projects = set()
+    batch_size = max(1, args.batch_size)
+    for start in range(0, len(clusters), batch_size):
+        with transaction(conn, dialect):
+            survivors, removed = collapse_clusters(conn, dialect, clusters[start : start + batch_size], sync_collection)
+            if mode == "async":
+                for survivor in survivors:
+                    enqueue(conn, dialect, MEMORY_KIND, [survivor["id"]], str(survivor["project"]))
+        if vectors is not None and vectors.available:
+            # pgvector embeddings went with the deleted rows.
+            if not vectors.in_database:
+                vectors.delete_memories(removed)
+            if mode == "sync":
+                vectors.sync_memories(survivors)
+        removed_total += len(removed)
+        projects.update(str(s["project"]) for s in survivors)
+        print(f"merged {removed_total}", file=sys.stderr, flush=True)
+
+    if projects:
+        cache.invalidate(sorted(projects))
+    summary["removed"] = removed_total
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
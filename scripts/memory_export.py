@@ -0,0 +1,73 @@
+import argparse
+import json
+import sys
+import time
+
+from db import connect
+from core.bundle import BundleWriter, bundle_format, export_rows, new_manifest
+from core.config import load_settings
+from core.embeddings import Embedder
+from core.vector_index import MEMORY_KIND, TURN_KIND, memory_document, turn_document
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Export a project's memories and conversation turns as a bundle.")
+    p.add_argument("--project", required=True)
+    p.add_argument("--out", required=True, help="bundle path: .jsonl.zst, .jsonl.gz, .jsonl or .parquet (a directory)")
+    p.add_argument("--kind", default="all", choices=["all", "memories", "turns"])
+    p.add_argument("--embeddings", action="store_true", help="include embeddings so import skips the model")
+    p.add_argument("--batch-size", type=int, default=1000, help="rows per read and embedding batch")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        bundle_format(args.out)
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
+    settings = load_settings()
+    conn, dialect = connect(read_only=True)
+
+    embedder = None
+    if args.embeddings:
+        embedder = Embedder(settings)
+        if not embedder.available:
+            raise SystemExit(embedder.error)
+
+    kinds = {"all": [MEMORY_KIND, TURN_KIND], "memories": [MEMORY_KIND], "turns": [TURN_KIND]}[args.kind]
+    documents = {MEMORY_KIND: memory_document, TURN_KIND: turn_document}
+    started = time.perf_counter()
+    writer = BundleWriter(args.out, new_manifest(args.project, embedder.model_name if embedder else None))
+    try:
+        for kind in kinds:
+            for rows in export_rows(conn, dialect, kind, args.project, max(1, args.batch_size)):
+                # Cached vectors come back without running the model.
+                vectors = embedder.embed([documents[kind](row) for row in rows]) if embedder else None
+                writer.write(kind, rows, vectors)
+                exported = sum(writer.counts.values())
+                print(f"exported {exported} rows", file=sys.stderr, flush=True)
+    except BaseException:
+        writer.close(complete=False)
+        raise
+    writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        json.dumps(
+            {
+                "project": args.project,
+                "out": args.out,
+                "memories": writer.counts[MEMORY_KIND],
+                "turns": writer.counts[TURN_KIND],
+                "embeddings": embedder is not None,
+                "seconds": round(elapsed, 3),
+            },
+            ensure_ascii=False,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
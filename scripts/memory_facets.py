@@ -0,0 +1,50 @@
+import argparse
+import json
+
+from db import connect, get_db_url
+from core.client import request_server
+from core.config import load_settings
+from core.facets import FACET_KINDS, project_facets
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Most frequent concepts, files and tags in a project.")
+    p.add_argument("--project", required=True)
+    p.add_argument(
+        "--facet",
+        dest="kinds",
+        action="append",
+        choices=sorted(FACET_KINDS),
+        help="facet to count (repeatable; default: all)",
+    )
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--prefix", default="", help="only values starting with this, e.g. a directory")
+    p.add_argument("--json", action="store_true")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    settings = load_settings()
+    payload = {"project": args.project, "kinds": args.kinds or [], "limit": args.limit, "prefix": args.prefix or None}
+
+    facets = request_server(settings, "memory_facets", payload, get_db_url())
+    if facets is None:
+        conn, dialect = connect(read_only=True)
+        facets = project_facets(conn, dialect, args.project, args.kinds or [], args.limit, args.prefix or None)
+
+    if args.json:
+        print(json.dumps(facets, ensure_ascii=False))
+        return 0
+
+    for kind, rows in facets.items():
+        print(f"{kind}:")
+        if not rows:
+            print("  (none)")
+        for row in rows:
+            print(f"  {row['memories']:>6}  {row['value']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
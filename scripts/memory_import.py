@@ -0,0 +1,168 @@
+import argparse
+import json
+import sys
+import time
+
+from db import connect, get_db_url
+from core.bundle import read_bundle, read_manifest
+from core.config import load_settings
+from core.dedup import Deduplicator, dedup_enabled
+from core.embedding_cache import EmbeddingCache
+from core.embeddings import DEFAULT_EMBEDDING_MODEL
+from core.outbox import indexing_mode
+from core.query_cache import QueryCache
+from core.records import build_memory_record, build_turn_record
+from core.store import add_memories, add_turns
+from core.vector import create_vector_index
+from core.vector_index import MEMORY_KIND, TURN_KIND, memory_document, turn_document
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Import a bundle written by memory_export.py.")
+    p.add_argument("bundle", help="bundle path: .jsonl.zst, .jsonl.gz, .jsonl or .parquet (a directory)")
+    p.add_argument("--project", default="", help="import into this project (default: the exported one)")
+    p.add_argument("--batch-size", type=int, default=1000, help="rows per transaction and vector index write")
+    p.add_argument("--no-dedup", action="store_true", help="insert duplicate memories instead of merging them")
+    p.add_argument("--no-embeddings", action="store_true", help="ignore bundled embeddings and compute new ones")
+    return p.parse_args()
+
+
+def _memory_record(row, project: str):
+    return build_memory_record(
+        project=project,
+        summary=str(row["summary"]),
+        created_at_epoch=int(row["created_at_epoch"]),
+        details=str(row.get("details") or ""),
+        tags=str(row.get("tags") or ""),
+        memory_type=str(row.get("type") or "discovery"),
+        meta=row.get("metadata_json") or "",
+        concepts=row.get("concepts") or "",
+        files_read=row.get("files_read") or "",
+        files_modified=row.get("files_modified") or "",
+    )
+
+
+def _turn_record(row, project: str):
+    return build_turn_record(
+        project=project,
+        session_id=str(row["session_id"]),
+        role=str(row["role"]),
+        content=str(row["content"]),
+        created_at_epoch=int(row["created_at_epoch"]),
+        context=row.get("context_json") or "",
+        meta=row.get("metadata_json") or "",
+    )
+
+
+def _turn_key(row) -> tuple:
+    return (str(row["session_id"]), str(row["role"]), int(row["created_at_epoch"]), str(row["content"]))
+
+
+def _unseen_turns(conn, dialect: str, project: str, records, last_id: int):
+    """Drop records already stored as one of the project's turns up to ``last_id``.
+
+    Only rows older than the import count, so a bundle's own repeated turns all load
+    the first time and none load when the same bundle is imported again.
+    """
+    if not records or not last_id:
+        return records
+    m = "?" if dialect == "sqlite" else "%s"
+    epochs = [int(r["created_at_epoch"]) for r in records]
+    stored = conn.execute(
+        "SELECT session_id, role, created_at_epoch, content FROM conversation_turns "
+        f"WHERE project = {m} AND created_at_epoch BETWEEN {m} AND {m} AND id <= {m}",
+        (project, min(epochs), max(epochs), last_id),
+    ).fetchall()
+    seen = {(str(r[0]), str(r[1]), int(r[2]), str(r[3])) for r in stored}
+    return [r for r in records if _turn_key(r) not in seen]
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        manifest = read_manifest(args.bundle)
+    except (OSError, ValueError) as exc:
+        raise SystemExit(f"{args.bundle}: {exc}") from exc
+    project = args.project or str(manifest["project"])
+    settings = load_settings()
+    conn, dialect = connect()
+
+    mode = indexing_mode(settings, dialect)
+    model = manifest.get("embedding_model")
+    reuse = bool(model) and not args.no_embeddings and mode != "off"
+    if reuse and model != DEFAULT_EMBEDDING_MODEL:
+        print(f"bundle embeddings are from {model}; computing new ones", file=sys.stderr)
+        reuse = False
+    vectors = None
+    if reuse:
+        # Bundled vectors reach the index through the embedding cache, so it has to be on,
+        # and rows are indexed inline while their vectors are still cached.
+        settings = {**settings, "CODEX_MEM_EMBEDDING_CACHE_ENABLED": "true"}
+        vectors = create_vector_index(settings, conn, dialect)
+        if vectors.available:
+            mode = "sync"
+        else:
+            reuse = False
+    if mode == "sync" and vectors is None:
+        vectors = create_vector_index(settings, conn, dialect)
+    embeddings = EmbeddingCache(settings) if reuse else None
+
+    cache = QueryCache(settings, get_db_url())
+    dedup = Deduplicator(settings) if dedup_enabled(settings) and not args.no_dedup else None
+    to_record = {MEMORY_KIND: _memory_record, TURN_KIND: _turn_record}
+    documents = {MEMORY_KIND: memory_document, TURN_KIND: turn_document}
+
+    # Turns have no dedup; the ones stored before this run are skipped so re-imports add nothing.
+    last_turn_id = int(conn.execute("SELECT COALESCE(MAX(id), 0) FROM conversation_turns").fetchone()[0])
+    started = time.perf_counter()
+    counts = {MEMORY_KIND: 0, TURN_KIND: 0}
+    skipped = 0
+    reused = 0
+    try:
+        for kind, rows in read_bundle(args.bundle, max(1, args.batch_size)):
+            records = [to_record[kind](row, project) for row in rows]
+            if embeddings is not None:
+                bundled = [(documents[kind](r), row["embedding"]) for r, row in zip(records, rows) if row.get("embedding")]
+                embeddings.store(model, [doc for doc, _ in bundled], [vector for _, vector in bundled])
+                reused += len(bundled)
+            if kind == MEMORY_KIND:
+                extra = {"dedup": dedup} if dedup is not None else {}
+                add_memories(conn, dialect, records, vectors, defer_index=mode == "async", cache=cache, **extra)
+            else:
+                new = _unseen_turns(conn, dialect, project, records, last_turn_id)
+                skipped += len(records) - len(new)
+                records = new
+                if records:
+                    add_turns(conn, dialect, records, vectors, defer_index=mode == "async", cache=cache)
+            counts[kind] += len(records)
+            imported = sum(counts.values())
+            elapsed = time.perf_counter() - started
+            print(f"imported {imported} rows ({imported / elapsed:.0f} rows/s)", file=sys.stderr, flush=True)
+    except (EOFError, KeyError, OSError, ValueError) as exc:
+        # Chunks already imported stay; re-running skips their turns and merges their memories.
+        raise SystemExit(f"{args.bundle}: {exc} (imported {sum(counts.values())} rows before the error)") from exc
+
+    elapsed = time.perf_counter() - started
+    imported = sum(counts.values())
+    print(
+        json.dumps(
+            {
+                "project": project,
+                "memories": counts[MEMORY_KIND],
+                "turns": counts[TURN_KIND],
+                "merged": dedup.merged if dedup is not None else 0,
+                "turns_skipped": skipped,
+                "embeddings_reused": reused,
+                "seconds": round(elapsed, 3),
+                "rows_per_sec": round(imported / elapsed, 1) if elapsed > 0 else 0.0,
+                "vector_synced": bool(vectors and vectors.available),
+                "vector_queued": mode == "async",
+            },
+            ensure_ascii=False,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,149 @@
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+from db import connect, get_db_url
+from core.config import load_settings
+from core.dedup import Deduplicator, dedup_enabled
+from core.outbox import indexing_mode
+from core.query_cache import QueryCache
+from core.records import build_memory_record, build_turn_record, optional_epoch
+from core.store import add_memories, add_turns
+from core.vector import create_vector_index
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Bulk ingest memories or conversation turns from JSONL.")
+    p.add_argument("--kind", required=True, choices=["memories", "turns"])
+    p.add_argument("--project", default="", help="default project for lines without one")
+    p.add_argument("--session-id", default="", help="default session for turn lines without one")
+    p.add_argument("--batch-size", type=int, default=1000, help="rows per transaction and vector index write")
+    p.add_argument("--skip-invalid", action="store_true", help="skip bad lines instead of aborting")
+    p.add_argument("--no-dedup", action="store_true", help="insert duplicate memories instead of merging them")
+    p.add_argument("files", nargs="*", help="JSONL files (default: stdin)")
+    return p.parse_args()
+
+
+def _lines(paths):
+    if not paths or paths == ["-"]:
+        for lineno, line in enumerate(sys.stdin, start=1):
+            yield "<stdin>", lineno, line
+        return
+    for path in paths:
+        with open(path, encoding="utf-8") as handle:
+            for lineno, line in enumerate(handle, start=1):
+                yield path, lineno, line
+
+
+def _memory_record(obj, args, now: int):
+    summary = str(obj.get("summary", "")).strip()
+    if not summary:
+        raise ValueError("summary required")
+    project = obj.get("project") or args.project
+    if not project:
+        raise ValueError("project required (field or --project)")
+    return build_memory_record(
+        project=project,
+        summary=summary,
+        created_at_epoch=optional_epoch(obj.get("created_at_epoch")) or now,
+        details=str(obj.get("details", "")),
+        tags=str(obj.get("tags", "")),
+        memory_type=str(obj.get("type") or "discovery"),
+        meta=obj.get("meta", ""),
+        concepts=obj.get("concepts", ""),
+        files_read=obj.get("files_read", ""),
+        files_modified=obj.get("files_modified", ""),
+    )
+
+
+def _turn_record(obj, args, now: int):
+    content = str(obj.get("content", "")).strip()
+    if not content:
+        raise ValueError("content required")
+    project = obj.get("project") or args.project
+    session_id = obj.get("session_id") or args.session_id
+    if not project or not session_id:
+        raise ValueError("project and session_id required (fields or --project/--session-id)")
+    return build_turn_record(
+        project=project,
+        session_id=session_id,
+        role=str(obj.get("role", "")),
+        content=content,
+        created_at_epoch=optional_epoch(obj.get("created_at_epoch")) or now,
+        context=obj.get("context", ""),
+        meta=obj.get("meta", ""),
+    )
+
+
+def main() -> int:
+    args = parse_args()
+    settings = load_settings()
+    conn, dialect = connect()
+
+    mode = indexing_mode(settings, dialect)
+    vectors = create_vector_index(settings, conn, dialect) if mode == "sync" else None
+    cache = QueryCache(settings, get_db_url())
+    to_record = _memory_record if args.kind == "memories" else _turn_record
+    flush = add_memories if args.kind == "memories" else add_turns
+    dedup = None
+    if args.kind == "memories" and dedup_enabled(settings) and not args.no_dedup:
+        dedup = Deduplicator(settings)
+    extra = {"dedup": dedup} if dedup is not None else {}
+
+    batch_size = max(1, args.batch_size)
+    now = int(datetime.utcnow().timestamp())
+    started = time.perf_counter()
+    ingested = 0
+    skipped = 0
+    chunk = []
+
+    def write(rows) -> None:
+        nonlocal ingested
+        flush(conn, dialect, rows, vectors, defer_index=mode == "async", cache=cache, **extra)
+        ingested += len(rows)
+        elapsed = time.perf_counter() - started
+        print(f"ingested {ingested} rows ({ingested / elapsed:.0f} rows/s)", file=sys.stderr, flush=True)
+
+    for source, lineno, line in _lines(args.files):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+            if not isinstance(obj, dict):
+                raise ValueError("line must be a JSON object")
+            chunk.append(to_record(obj, args, now))
+        except (TypeError, ValueError) as exc:
+            # TypeError: a field of the wrong JSON type, e.g. a list where a number goes.
+            if not args.skip_invalid:
+                raise SystemExit(f"{source}:{lineno}: {exc}") from exc
+            skipped += 1
+            continue
+        if len(chunk) >= batch_size:
+            write(chunk)
+            chunk = []
+    if chunk:
+        write(chunk)
+
+    elapsed = time.perf_counter() - started
+    print(
+        json.dumps(
+            {
+                "kind": args.kind,
+                "rows": ingested,
+                "skipped": skipped,
+                "merged": dedup.merged if dedup is not None else 0,
+                "seconds": round(elapsed, 3),
+                "rows_per_sec": round(ingested / elapsed, 1) if elapsed > 0 else 0.0,
+                "vector_synced": bool(vectors and vectors.available),
+                "vector_queued": mode == "async",
+            },
+            ensure_ascii=False,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,17 @@
+import argparse
+import json
+import sqlite3
 from pathlib import Path
+from typing import List
 
 from db import connect
-from core.config import load_settings
+from core.config import get_int, load_settings
+from core.dedup import backfill_signatures
+from core.facets import backfill_facets
+from core.fts import sqlite_table_exists
+from core.pgvector_sync import DEFAULT_VECTOR_DIM
+from core.query_plans import check_search_plans
+from core.vector import vector_provider
 
 SQLITE_CREATE_MEMORIES_TABLE = """
 CREATE TABLE IF NOT EXISTS memories (
@@ -34,6 +44,306 @@ CREATE TABLE IF NOT EXISTS conversation_turns (
 )
 """
 
+SQLITE_CREATE_VECTOR_SYNC_STATE_TABLE = """
+CREATE TABLE IF NOT EXISTS vector_sync_state (
+  collection TEXT PRIMARY KEY,
+  last_id INTEGER NOT NULL DEFAULT 0,
+  last_epoch INTEGER NOT NULL DEFAULT 0,
+  updated_at_epoch INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+SQLITE_CREATE_VECTOR_SYNC_ROWS_TABLE = """
+CREATE TABLE IF NOT EXISTS vector_sync_rows (
+  collection TEXT NOT NULL,
+  row_id INTEGER NOT NULL,
+  content_hash TEXT NOT NULL,
+  synced_at_epoch INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (collection, row_id)
+)
+"""
+
+SQLITE_CREATE_VECTOR_OUTBOX_TABLE = """
+CREATE TABLE IF NOT EXISTS vector_outbox (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind TEXT NOT NULL,
+  row_id INTEGER NOT NULL,
+  project TEXT NOT NULL DEFAULT '',
+  enqueued_at_epoch INTEGER NOT NULL DEFAULT 0,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  last_error TEXT NOT NULL DEFAULT '',
+  UNIQUE (kind, row_id)
+)
+"""
+
+SQLITE_CREATE_RETENTION_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS retention_policies (
+      project TEXT PRIMARY KEY,
+      max_age_days INTEGER NOT NULL DEFAULT 0,
+      max_turns_per_session INTEGER NOT NULL DEFAULT 0,
+      keep_last INTEGER NOT NULL DEFAULT 0,
+      updated_at_epoch INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS conversation_turns_archive (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      project TEXT NOT NULL,
+      first_turn_id INTEGER NOT NULL,
+      last_turn_id INTEGER NOT NULL,
+      first_epoch INTEGER NOT NULL,
+      last_epoch INTEGER NOT NULL,
+      turn_count INTEGER NOT NULL,
+      archived_at_epoch INTEGER NOT NULL DEFAULT 0,
+      codec TEXT NOT NULL DEFAULT 'zlib-json',
+      payload BLOB NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS conversation_turns_archive_project_idx "
+    "ON conversation_turns_archive(project, first_turn_id)",
+)
+
+# One row per (memory, concept/file/tag), so list filters and facet counts are index
+# lookups instead of json_each()/LIKE over every candidate row.
+SQLITE_CREATE_MEMORY_FACET_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS memory_concepts (
+      memory_id INTEGER NOT NULL,
+      project TEXT NOT NULL,
+      concept TEXT NOT NULL,
+      PRIMARY KEY (memory_id, concept)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS memory_files (
+      memory_id INTEGER NOT NULL,
+      project TEXT NOT NULL,
+      path TEXT NOT NULL,
+      access TEXT NOT NULL,
+      PRIMARY KEY (memory_id, path, access)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS memory_tags (
+      memory_id INTEGER NOT NULL,
+      project TEXT NOT NULL,
+      tag TEXT NOT NULL,
+      PRIMARY KEY (memory_id, tag)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS memory_concepts_project_concept_idx ON memory_concepts(project, concept)",
+    "CREATE INDEX IF NOT EXISTS memory_files_project_path_idx ON memory_files(project, path)",
+    "CREATE INDEX IF NOT EXISTS memory_tags_project_tag_idx ON memory_tags(project, tag)",
+    # Foreign keys are off by default in SQLite, so deletes cascade through a trigger.
+    """
+    CREATE TRIGGER IF NOT EXISTS memory_facets_ad AFTER DELETE ON memories BEGIN
+      DELETE FROM memory_concepts WHERE memory_id = old.id;
+      DELETE FROM memory_files WHERE memory_id = old.id;
+      DELETE FROM memory_tags WHERE memory_id = old.id;
+    END
+    """,
+)
+
+# Duplicate detection: content hash, SimHash and its four 16-bit bands per memory.
+SQLITE_CREATE_MEMORY_SIGNATURES_TABLE = (
+    """
+    CREATE TABLE IF NOT EXISTS memory_signatures (
+      memory_id INTEGER PRIMARY KEY,
+      project TEXT NOT NULL,
+      type TEXT NOT NULL,
+      content_hash TEXT NOT NULL,
+      simhash INTEGER NOT NULL,
+      band0 INTEGER,
+      band1 INTEGER,
+      band2 INTEGER,
+      band3 INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS memory_signatures_hash_idx ON memory_signatures(project, type, content_hash)",
+    *(
+        f"CREATE INDEX IF NOT EXISTS memory_signatures_band{i}_idx ON memory_signatures(project, type, band{i})"
+        for i in range(4)
+    ),
+    """
+    CREATE TRIGGER IF NOT EXISTS memory_signatures_ad AFTER DELETE ON memories BEGIN
+      DELETE FROM memory_signatures WHERE memory_id = old.id;
+    END
+    """,
+)
+
+SQLITE_CREATE_MEMORIES_FTS_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+  summary,
+  details,
+  tags,
+  concepts,
+  content='memories',
+  content_rowid='id'
+)
+"""
+
+SQLITE_CREATE_MEMORIES_FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS memories_fts_ai AFTER INSERT ON memories BEGIN
+      INSERT INTO memories_fts(rowid, summary, details, tags, concepts)
+      VALUES (new.id, new.summary, new.details, new.tags, new.concepts);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS memories_fts_ad AFTER DELETE ON memories BEGIN
+      INSERT INTO memories_fts(memories_fts, rowid, summary, details, tags, concepts)
+      VALUES ('delete', old.id, old.summary, old.details, old.tags, old.concepts);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS memories_fts_au AFTER UPDATE ON memories BEGIN
+      INSERT INTO memories_fts(memories_fts, rowid, summary, details, tags, concepts)
+      VALUES ('delete', old.id, old.summary, old.details, old.tags, old.concepts);
+      INSERT INTO memories_fts(rowid, summary, details, tags, concepts)
+      VALUES (new.id, new.summary, new.details, new.tags, new.concepts);
+    END
+    """,
+)
+
+SQLITE_CREATE_CONVERSATION_TURNS_FTS_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS conversation_turns_fts USING fts5(
+  content,
+  content='conversation_turns',
+  content_rowid='id'
+)
+"""
+
+SQLITE_CREATE_CONVERSATION_TURNS_FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS conversation_turns_fts_ai AFTER INSERT ON conversation_turns BEGIN
+      INSERT INTO conversation_turns_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS conversation_turns_fts_ad AFTER DELETE ON conversation_turns BEGIN
+      INSERT INTO conversation_turns_fts(conversation_turns_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS conversation_turns_fts_au AFTER UPDATE ON conversation_turns BEGIN
+      INSERT INTO conversation_turns_fts(conversation_turns_fts, rowid, content) VALUES ('delete', old.id, old.content);
+      INSERT INTO conversation_turns_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+)
+
+SQLITE_FTS_TABLES = (
+    ("memories_fts", SQLITE_CREATE_MEMORIES_FTS_TABLE, SQLITE_CREATE_MEMORIES_FTS_TRIGGERS),
+    (
+        "conversation_turns_fts",
+        SQLITE_CREATE_CONVERSATION_TURNS_FTS_TABLE,
+        SQLITE_CREATE_CONVERSATION_TURNS_FTS_TRIGGERS,
+    ),
+)
+
+POSTGRES_FTS_MIGRATIONS = (
+    """
+    ALTER TABLE memories ADD COLUMN IF NOT EXISTS search_tsv TSVECTOR GENERATED ALWAYS AS (
+      setweight(to_tsvector('simple', summary), 'A')
+      || setweight(to_tsvector('simple', details), 'B')
+      || setweight(to_tsvector('simple', tags || ' ' || concepts), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS memories_search_tsv_idx ON memories USING GIN (search_tsv)",
+    """
+    ALTER TABLE conversation_turns ADD COLUMN IF NOT EXISTS content_tsv TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS conversation_turns_content_tsv_idx ON conversation_turns USING GIN (content_tsv)",
+)
+
+POSTGRES_TRGM_MIGRATIONS = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS memory_files_path_trgm_idx ON memory_files USING GIN (path gin_trgm_ops)",
+)
+
+# Trigram indexes for the ILIKE filters over the list columns, which now go through
+# the side tables; they only slowed down inserts.
+POSTGRES_SUPERSEDED_TRGM_INDEXES = (
+    "memories_tags_trgm_idx",
+    "memories_concepts_trgm_idx",
+    "memories_files_read_trgm_idx",
+    "memories_files_modified_trgm_idx",
+)
+
+
+# Composite indexes matching the search access paths: equality on project (plus type,
+# session or role) and rows already in ORDER BY order, so LIMIT stops early without a sort.
+SEARCH_INDEXES = (
+    ("memories_project_epoch_id_idx", "memories", "project, created_at_epoch DESC, id DESC"),
+    ("memories_project_type_epoch_id_idx", "memories", "project, type, created_at_epoch DESC, id DESC"),
+    ("conversation_turns_project_epoch_idx", "conversation_turns", "project, created_at_epoch DESC, id DESC"),
+    (
+        "conversation_turns_project_session_epoch_idx",
+        "conversation_turns",
+        "project, session_id, created_at_epoch DESC, id DESC",
+    ),
+    ("conversation_turns_project_role_epoch_idx", "conversation_turns", "project, role, created_at_epoch DESC, id DESC"),
+)
+
+# Single-column project indexes are prefixes of the composites above; keeping them only
+# costs writes and can tempt the planner into filter-then-sort plans. The memory
+# composites without the id tiebreaker left keyset pages to a sort.
+SUPERSEDED_INDEXES = (
+    ("memories_project_idx", "memories", "project"),
+    ("conversation_turns_project_idx", "conversation_turns", "project"),
+    ("memories_project_epoch_idx", "memories", "project, created_at_epoch DESC"),
+    ("memories_project_type_epoch_idx", "memories", "project, type, created_at_epoch DESC"),
+)
+
+
+def ensure_search_indexes(conn) -> None:
+    for name, table, columns in SEARCH_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})")
+    for name, _, _ in SUPERSEDED_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+PGVECTOR_TABLES = ("memories", "conversation_turns")
+
+
+def pgvector_migrations(settings) -> List[str]:
+    dim = get_int(settings, "CODEX_MEM_VECTOR_DIM", DEFAULT_VECTOR_DIM)
+    kind = str(settings.get("CODEX_MEM_PGVECTOR_INDEX", "hnsw")).strip().lower()
+    if kind == "ivfflat":
+        lists = get_int(settings, "CODEX_MEM_PGVECTOR_LISTS", 100)
+        method = f"ivfflat (embedding vector_cosine_ops) WITH (lists = {lists})"
+    else:
+        method = "hnsw (embedding vector_cosine_ops)"
+
+    statements = ["CREATE EXTENSION IF NOT EXISTS vector"]
+    for table in PGVECTOR_TABLES:
+        statements.append(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS embedding vector({dim})")
+        statements.append(f"CREATE INDEX IF NOT EXISTS {table}_embedding_idx ON {table} USING {method}")
+    return statements
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rebuild-fts", action="store_true")
+    p.add_argument(
+        "--rebuild-facets",
+        action="store_true",
+        help="repopulate memory_concepts/memory_files/memory_tags and memory_signatures from the memories table",
+    )
+    p.add_argument(
+        "--incremental-vacuum",
+        action="store_true",
+        help="switch an existing sqlite database to auto_vacuum=INCREMENTAL (runs one full VACUUM)",
+    )
+    p.add_argument(
+        "--check-plans",
+        action="store_true",
+        help="EXPLAIN each search shape and exit 1 if any needs a sort (sqlite)",
+    )
+    return p.parse_args()
+
 
 def load_schema(dialect: str) -> str:
     base = Path(__file__).resolve().parent.parent / "db"
@@ -42,9 +352,45 @@ def load_schema(dialect: str) -> str:
     return (base / "schema_postgres.sql").read_text()
 
 
-def ensure_sqlite_migrations(conn) -> None:
+def ensure_sqlite_fts(conn, rebuild: bool = False) -> bool:
+    for name, create_table, triggers in SQLITE_FTS_TABLES:
+        existed = sqlite_table_exists(conn, name)
+        try:
+            conn.execute(create_table)
+        except sqlite3.OperationalError:
+            # SQLite was built without FTS5; search falls back to LIKE scans.
+            return False
+
+        for trigger in triggers:
+            conn.execute(trigger)
+
+        if rebuild or not existed:
+            # Index rows that were written before the FTS table existed.
+            conn.execute(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+    return True
+
+
+def ensure_sqlite_facets(conn, rebuild: bool = False) -> None:
+    for statement in SQLITE_CREATE_MEMORY_FACET_TABLES:
+        conn.execute(statement)
+    backfill_facets(conn, "sqlite", rebuild=rebuild)
+
+
+def ensure_sqlite_signatures(conn, rebuild: bool = False) -> None:
+    for statement in SQLITE_CREATE_MEMORY_SIGNATURES_TABLE:
+        conn.execute(statement)
+    backfill_signatures(conn, "sqlite", rebuild=rebuild)
+
+
+def ensure_sqlite_migrations(conn, rebuild_fts: bool = False, rebuild_facets: bool = False) -> None:
     conn.execute(SQLITE_CREATE_MEMORIES_TABLE)
     conn.execute(SQLITE_CREATE_CONVERSATION_TURNS_TABLE)
+    conn.execute(SQLITE_CREATE_VECTOR_SYNC_STATE_TABLE)
+    conn.execute(SQLITE_CREATE_VECTOR_SYNC_ROWS_TABLE)
+    conn.execute(SQLITE_CREATE_VECTOR_OUTBOX_TABLE)
+    conn.execute("CREATE INDEX IF NOT EXISTS vector_outbox_project_idx ON vector_outbox(project)")
+    for statement in SQLITE_CREATE_RETENTION_TABLES:
+        conn.execute(statement)
 
     cols = {r["name"] for r in conn.execute("PRAGMA table_info(memories)").fetchall()}
 
@@ -68,27 +414,89 @@ def ensure_sqlite_migrations(conn) -> None:
     conn.execute("CREATE INDEX IF NOT EXISTS memories_created_at_epoch_idx ON memories(created_at_epoch)")
     conn.execute("CREATE INDEX IF NOT EXISTS memories_type_idx ON memories(type)")
 
-    conn.execute("CREATE INDEX IF NOT EXISTS conversation_turns_project_idx ON conversation_turns(project)")
     conn.execute("CREATE INDEX IF NOT EXISTS conversation_turns_session_idx ON conversation_turns(session_id)")
     conn.execute(
         "CREATE INDEX IF NOT EXISTS conversation_turns_created_at_epoch_idx ON conversation_turns(created_at_epoch)"
     )
     conn.execute("CREATE INDEX IF NOT EXISTS conversation_turns_role_idx ON conversation_turns(role)")
+    ensure_search_indexes(conn)
+    ensure_sqlite_facets(conn, rebuild=rebuild_facets)
+    ensure_sqlite_signatures(conn, rebuild=rebuild_facets)
+
+    ensure_sqlite_fts(conn, rebuild=rebuild_fts)
+
+
+def ensure_postgres_migrations(conn, settings=None, rebuild_facets: bool = False) -> None:
+    conn.execute(load_schema("postgres"))
+    ensure_search_indexes(conn)
+    # Tables come from the schema file; index memories written before they existed.
+    backfill_facets(conn, "postgres", rebuild=rebuild_facets)
+    backfill_signatures(conn, "postgres", rebuild=rebuild_facets)
+
+    # Databases created before full-text search lack the generated columns.
+    for statement in POSTGRES_FTS_MIGRATIONS:
+        conn.execute(statement)
+
+    try:
+        with conn.transaction():
+            for statement in POSTGRES_TRGM_MIGRATIONS:
+                conn.execute(statement)
+    except Exception as exc:
+        # pg_trgm may be unavailable or need superuser; filters still work without it.
+        print(f"skipped pg_trgm indexes: {exc}")
+    for name in POSTGRES_SUPERSEDED_TRGM_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    if settings is not None and vector_provider(settings) == "pgvector":
+        # Required by the configured provider, so failures are not swallowed like pg_trgm's.
+        for statement in pgvector_migrations(settings):
+            conn.execute(statement)
 
 
 def main() -> int:
-    load_settings()
+    args = parse_args()
+    settings = load_settings()
     conn, dialect = connect()
     with conn:
         if dialect == "sqlite":
-            ensure_sqlite_migrations(conn)
+            ensure_sqlite_migrations(conn, rebuild_fts=args.rebuild_fts, rebuild_facets=args.rebuild_facets)
         else:
-            schema = load_schema(dialect)
-            conn.execute(schema)
+            ensure_postgres_migrations(conn, settings, rebuild_facets=args.rebuild_facets)
 
     print(f"Initialized {dialect} schema")
+    if args.incremental_vacuum:
+        enable_incremental_vacuum(conn, dialect)
+    if args.check_plans:
+        return check_plans(conn, dialect)
     return 0
 
 
+def enable_incremental_vacuum(conn, dialect: str) -> None:
+    if dialect != "sqlite":
+        print("incremental vacuum applies to sqlite only; postgres reclaims space with VACUUM")
+        return
+    if int(conn.execute("PRAGMA auto_vacuum").fetchone()[0]) == 2:
+        print("auto_vacuum is already incremental")
+        return
+    # Changing auto_vacuum on a populated database only sticks after a full VACUUM,
+    # which rewrites the file under an exclusive lock; run it while nothing else writes.
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    print("switched auto_vacuum to incremental")
+
+
+def check_plans(conn, dialect: str) -> int:
+    if dialect != "sqlite":
+        print("plan check supports sqlite only")
+        return 0
+    # Plan against the busiest project so the planner sees representative statistics.
+    row = conn.execute("SELECT project FROM memories GROUP BY project ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+    turn = conn.execute("SELECT project, session_id FROM conversation_turns ORDER BY id DESC LIMIT 1").fetchone()
+    project = row["project"] if row else (turn["project"] if turn else "default")
+    results = check_search_plans(conn, project, turn["session_id"] if turn else "")
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 1 if any(r["sorts"] for r in results) else 0
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -1,17 +1,27 @@
 import argparse
 import json
+import sys
+from dataclasses import asdict
 
-from db import connect
-from core.config import get_bool, load_settings
+from db import connect, get_db_url
+from core.client import request_server
+from core.config import load_settings
+from core.pagination import decode_cursor
+from core.query_cache import QueryCache
 from core.search import SearchOrchestrator, SearchRequest
+from core.vector import vector_supported
 
 
 def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument("--project", required=True)
     p.add_argument("--q", required=False, default="")
-    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--limit", type=int, default=None, help="rows to return (default 10; all with --stream)")
     p.add_argument("--json", action="store_true")
+    p.add_argument("--cursor", default="", help="continue after the next_cursor of an earlier page")
+    p.add_argument("--paginate", action="store_true", help="newest-first pages with a next_cursor; --q only filters")
+    p.add_argument("--stream", action="store_true", help="write every match as NDJSON, newest first, in constant memory")
+    p.add_argument("--queries", default="", help="file with one query per line (- for stdin), searched as one batch")
     p.add_argument("--strategy", default="auto", choices=["auto", "sqlite", "chroma", "hybrid"])
     p.add_argument("--type", dest="type_filter", default="")
     p.add_argument("--tags", dest="tags_filter", default="")
@@ -19,58 +29,118 @@ def parse_args():
     p.add_argument("--file", dest="file_filter", default="")
     p.add_argument("--since", default="")
     p.add_argument("--until", default="")
+    p.add_argument("--cache-stats", action="store_true", help="report query cache hit/miss counts")
     return p.parse_args()
 
 
+def stream_rows(settings, request) -> int:
+    # Read locally: the server answers with whole pages, and a stream must not be held in memory.
+    conn, dialect = connect(read_only=True)
+    orchestrator = SearchOrchestrator(conn, dialect, settings, vector_enabled=False)
+    out = sys.stdout
+    for row in orchestrator.stream(request):
+        out.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+    out.flush()
+    return 0
+
+
 def main() -> int:
     args = parse_args()
+    if args.cursor:
+        try:
+            decode_cursor(args.cursor)
+        except ValueError:
+            raise SystemExit("invalid --cursor")
 
     settings = load_settings()
-    vector_enabled = get_bool(settings, "CODEX_MEM_VECTOR_ENABLED")
-
-    conn, dialect = connect()
-
-    if dialect != "sqlite":
-        # Advanced search paths are optimized for sqlite in this release.
-        vector_enabled = False
-
-    orchestrator = SearchOrchestrator(conn, dialect, settings, vector_enabled=vector_enabled)
-    result = orchestrator.search(
-        SearchRequest(
-            project=args.project,
-            query=args.q.strip() or None,
-            limit=args.limit,
-            strategy=args.strategy,
-            type_filter=args.type_filter or None,
-            tags_filter=args.tags_filter or None,
-            concept_filter=args.concept_filter or None,
-            file_filter=args.file_filter or None,
-            since=args.since or None,
-            until=args.until or None,
-        )
+    request = SearchRequest(
+        project=args.project,
+        query=args.q.strip() or None,
+        limit=args.limit if args.limit is not None else (0 if args.stream else 10),
+        strategy=args.strategy,
+        type_filter=args.type_filter or None,
+        tags_filter=args.tags_filter or None,
+        concept_filter=args.concept_filter or None,
+        file_filter=args.file_filter or None,
+        since=args.since or None,
+        until=args.until or None,
+        cursor=args.cursor or None,
+        paginate=args.paginate,
     )
+    if args.stream:
+        return stream_rows(settings, request)
+
+    if args.queries:
+        return search_batch(args, settings, request)
+
+    result = request_server(settings, "memory_search", {"request": asdict(request)}, get_db_url())
+    if result is None:
+        result = local_orchestrator(settings).search(request)
+
+    cache_stats = QueryCache(settings, get_db_url()).stats() if args.cache_stats else None
+    if args.json:
+        output = json_result(result)
+        if cache_stats is not None:
+            output["query_cache"] = cache_stats
+        print(json.dumps(output, ensure_ascii=False, default=str))
+        return 0
+
+    if cache_stats is not None:
+        print(f"query cache hits={cache_stats['hits']} misses={cache_stats['misses']} entries={cache_stats['entries']}")
+    print_result(result)
+    return 0
+
+
+def local_orchestrator(settings) -> SearchOrchestrator:
+    conn, dialect = connect(read_only=True)
+    vector_enabled = vector_supported(settings, dialect)
+    cache = QueryCache(settings, get_db_url())
+    return SearchOrchestrator(conn, dialect, settings, vector_enabled=vector_enabled, cache=cache)
+
+
+def search_batch(args, settings, request) -> int:
+    handle = sys.stdin if args.queries == "-" else open(args.queries, encoding="utf-8")
+    with handle:
+        queries = [line.strip() for line in handle if line.strip()]
+    payload = {"request": asdict(request), "queries": queries}
+    results = request_server(settings, "memory_search_many", payload, get_db_url())
+    if results is None:
+        results = local_orchestrator(settings).search_many(request, queries)
 
-    rows = result["rows"]
     if args.json:
-        print(
-            json.dumps(
-                {
-                    "strategy": result["strategy"],
-                    "used_chroma": result["used_chroma"],
-                    "fell_back": result["fell_back"],
-                    "count": len(rows),
-                    "rows": rows,
-                },
-                ensure_ascii=False,
-            )
-        )
+        output = [{"query": query, **json_result(result)} for query, result in zip(queries, results)]
+        print(json.dumps({"count": len(output), "results": output}, ensure_ascii=False, default=str))
         return 0
+    for query, result in zip(queries, results):
+        print(f"== {query}")
+        print_result(result)
+    return 0
+
 
+def json_result(result):
+    return {
+        "strategy": result["strategy"],
+        "used_chroma": result["used_chroma"],
+        "fell_back": result["fell_back"],
+        "pending_index": result.get("pending_index", 0),
+        "cache": result.get("cache", "off"),
+        "count": len(result["rows"]),
+        "rows": result["rows"],
+        "next_cursor": result.get("next_cursor"),
+    }
+
+
+def print_result(result) -> None:
+    rows = result["rows"]
     if not rows:
         print("no results")
-        return 0
+        return
 
     marker = f"strategy={result['strategy']} used_chroma={result['used_chroma']} fell_back={result['fell_back']}"
+    if result.get("pending_index"):
+        marker += f" pending_index={result['pending_index']}"
+    if result.get("cache"):
+        marker += f" cache={result['cache']}"
     print(marker)
     for r in rows:
         print(f"#{r['id']} {r['created_at']} [{r['project']}] ({r['tags']}) type={r.get('type', '')}")
@@ -79,7 +149,8 @@ def main() -> int:
             print(r["details"])
         print("-")
 
-    return 0
+    if result.get("next_cursor"):
+        print(f"next_cursor={result['next_cursor']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+import argparse
+import json
+import signal
+
+from db import connect_pooled, get_db_url
+from core.client import request_server, socket_path
+from core.config import get_int, load_settings
+from core.server import MemoryServer, MemoryService
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--socket", default="", help="socket path (default: CODEX_MEM_SERVER_SOCKET or data dir)")
+    p.add_argument("--status", action="store_true", help="ping a running server and exit")
+    return p.parse_args()
+
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main() -> int:
+    args = parse_args()
+    settings = load_settings()
+    if args.socket:
+        settings["CODEX_MEM_SERVER_SOCKET"] = args.socket
+    path = socket_path(settings)
+
+    # Ping without a db_url so a server bound to another database still counts as running.
+    running = request_server(settings, "ping", {}, "")
+    if args.status:
+        if running is None:
+            print("not running")
+            return 1
+        print(json.dumps(running, ensure_ascii=False))
+        return 0
+    if running is not None:
+        raise SystemExit(f"memory server already running (pid {running['pid']}) on {path}")
+
+    conn, dialect = connect_pooled()
+    service = MemoryService(conn, dialect, settings, get_db_url())
+    server = MemoryServer(path, service)
+    service.start_indexer(get_int(settings, "CODEX_MEM_VECTOR_DRAIN_INTERVAL", 2))
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"codex-mem server listening on {path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
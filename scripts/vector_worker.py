@@ -0,0 +1,60 @@
+import argparse
+import json
+import sys
+import time
+
+from db import connect, get_db_url
+from core.config import get_int, load_settings
+from core.outbox import VectorOutbox, indexing_mode
+from core.query_cache import QueryCache
+from core.vector import create_vector_index, vector_provider
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Embed rows queued in vector_outbox into the vector index.")
+    p.add_argument("--drain", action="store_true", help="index everything pending, then exit")
+    p.add_argument("--batch-size", type=int, default=0, help="rows per vector index write (default: settings)")
+    p.add_argument("--interval", type=float, default=0, help="seconds between polls (default: settings)")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    settings = load_settings()
+    conn, dialect = connect()
+
+    if indexing_mode(settings, dialect) == "off":
+        print("vector indexing is disabled for this database")
+        return 0
+
+    provider = vector_provider(settings)
+    vectors = create_vector_index(settings, conn, dialect)
+    if not vectors.available:
+        message = vectors.error or f"{provider} unavailable"
+        raise SystemExit(f"failed to initialize {provider}: {message}")
+
+    outbox = VectorOutbox(conn, dialect)
+    batch_size = args.batch_size or vectors.batch_size
+    cache = QueryCache(settings, get_db_url())
+
+    if args.drain:
+        stats = outbox.drain(vectors, batch_size, cache=cache)
+        stats["pending"] = outbox.pending_count()
+        print(json.dumps(stats, ensure_ascii=False))
+        return 0
+
+    interval = args.interval or get_int(settings, "CODEX_MEM_VECTOR_DRAIN_INTERVAL", 2)
+    try:
+        while True:
+            stats = outbox.drain(vectors, batch_size, max_batches=1, cache=cache)
+            if stats["batches"]:
+                print(f"indexed {stats['indexed']} rows", file=sys.stderr, flush=True)
+            else:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,21 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "scripts"
+if str(SCRIPTS) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS))
+
+from memory_init import ensure_sqlite_migrations  # noqa: E402
+
+# Settings for orchestrators under test: FTS on, no vectors, no query cache.
+SETTINGS = {"CODEX_MEM_FTS_ENABLED": "true", "CODEX_MEM_VECTOR_ENABLED": "false"}
+
+
+def memory_db(path: str = ":memory:") -> sqlite3.Connection:
+    """A connection to a freshly initialized SQLite database."""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    with conn:
+        ensure_sqlite_migrations(conn)
+    return conn
@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from support import SCRIPTS, memory_db
+
+from core.records import build_memory_record, build_turn_record
+from core.store import add_memories, add_turns
+
+MEMORY_COLUMNS = "project, type, tags, summary, details, concepts, files_read, files_modified, created_at_epoch"
+TURN_COLUMNS = "project, session_id, role, content, context_json, metadata_json, created_at_epoch"
+
+
+class ExportImportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.source = root / "source.db"
+        self.target = root / "target.db"
+        conn = memory_db(str(self.source))
+        add_memories(
+            conn,
+            "sqlite",
+            [
+                build_memory_record(
+                    project="demo",
+                    summary=f"note {i} ✓",
+                    details="d" * i,
+                    tags="perf,cache",
+                    concepts="sqlite",
+                    files_read="src/a.py",
+                    created_at_epoch=1700000000 + i,
+                )
+                for i in range(25)
+            ],
+        )
+        add_turns(
+            conn,
+            "sqlite",
+            [
+                build_turn_record(
+                    project="demo",
+                    session_id=f"s{i % 2}",
+                    role="user",
+                    # Two identical turns in one second are both real and both kept.
+                    content="ok" if i in (3, 4) else f"turn {i}",
+                    created_at_epoch=1700000000 + i // 2,
+                    context={"step": i},
+                )
+                for i in range(30)
+            ],
+        )
+        conn.close()
+        memory_db(str(self.target)).close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _run(self, db: Path, script: str, *args: str) -> str:
+        env = {
+            **os.environ,
+            "CODEX_MEM_DATA_DIR": self.tmp.name,
+            "CODEX_MEM_DATABASE_URL": f"sqlite:///{db}",
+            "CODEX_MEM_SERVER_ENABLED": "false",
+            "CODEX_MEM_VECTOR_ENABLED": "false",
+        }
+        return subprocess.run(
+            [sys.executable, str(SCRIPTS / script), *args], env=env, capture_output=True, text=True, check=True
+        ).stdout
+
+    def _rows(self, db: Path):
+        conn = memory_db(str(db))
+        try:
+            memories = sorted(tuple(r) for r in conn.execute(f"SELECT {MEMORY_COLUMNS} FROM memories"))
+            turns = sorted(tuple(r) for r in conn.execute(f"SELECT {TURN_COLUMNS} FROM conversation_turns"))
+        finally:
+            conn.close()
+        return memories, turns
+
+    def test_import_is_idempotent(self):
+        for suffix in (".jsonl", ".jsonl.gz"):
+            with self.subTest(suffix=suffix):
+                bundle = str(Path(self.tmp.name) / f"demo{suffix}")
+                self._run(self.source, "memory_export.py", "--project", "demo", "--out", bundle, "--batch-size", "7")
+                self._run(self.target, "memory_import.py", bundle, "--batch-size", "6")
+                self.assertEqual(self._rows(self.target), self._rows(self.source))
+
+                again = json.loads(self._run(self.target, "memory_import.py", bundle, "--batch-size", "6"))
+                self.assertEqual((again["merged"], again["turns"], again["turns_skipped"]), (25, 0, 30))
+                self.assertEqual(self._rows(self.target), self._rows(self.source))
+
+
+if __name__ == "__main__":
+    unittest.main()
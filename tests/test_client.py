@@ -0,0 +1,57 @@
+import socket
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import support  # noqa: F401  (puts scripts/ on sys.path)
+
+from core.client import request_server
+
+
+class RequestServerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "codex-mem.sock"
+        self.settings = {
+            "CODEX_MEM_SERVER_ENABLED": "true",
+            "CODEX_MEM_SERVER_SOCKET": str(self.path),
+            "CODEX_MEM_SERVER_TIMEOUT": "5",
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _serve_once(self, reply: bytes) -> None:
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self.path))
+        server.listen(1)
+
+        def run():
+            conn, _ = server.accept()
+            with conn:
+                conn.makefile("rb").readline()
+                conn.sendall(reply)
+            server.close()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def test_falls_back_when_nothing_listens(self):
+        self.path.touch()
+        self.assertIsNone(request_server(self.settings, "memory_add", {}, "db"))
+
+    def test_reply_is_returned(self):
+        self._serve_once(b'{"ok": true, "result": {"id": 7}}\n')
+        self.assertEqual(request_server(self.settings, "memory_add", {}, "db"), {"id": 7})
+
+    def test_failures_after_sending_raise(self):
+        for reply in (b"", b"not json\n", b"[1]\n"):
+            with self.subTest(reply=reply):
+                self._serve_once(reply)
+                with self.assertRaises(SystemExit):
+                    request_server(self.settings, "memory_add", {}, "db")
+                self.path.unlink()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from support import SETTINGS, memory_db
+
+from core.context_pack import ContextPacker, ContextPackRequest, render_text
+from core.conversation_search import ConversationSearchOrchestrator
+from core.records import build_memory_record, build_turn_record
+from core.search import SearchOrchestrator
+from core.store import add_memories, add_turns
+
+
+class ContextPackTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = memory_db()
+        add_turns(
+            self.conn,
+            "sqlite",
+            [
+                build_turn_record(
+                    project="demo",
+                    session_id="s1" if i % 2 == 0 else "s2",
+                    role=("user", "assistant")[i % 2],
+                    content=f"turn {i} " + "x" * 90,
+                    created_at_epoch=1700000000 + i,
+                )
+                for i in range(10)
+            ],
+        )
+        add_memories(
+            self.conn,
+            "sqlite",
+            [
+                build_memory_record(project="demo", summary="cache keys include the scope", created_at_epoch=1700000000),
+                build_memory_record(
+                    project="demo", summary="cache entries expire", details="y" * 300, created_at_epoch=1700000001
+                ),
+                build_memory_record(project="demo", summary="unrelated release note", created_at_epoch=1700000002),
+            ],
+        )
+        self.packer = ContextPacker(
+            SearchOrchestrator(self.conn, "sqlite", SETTINGS, vector_enabled=False),
+            ConversationSearchOrchestrator(self.conn, "sqlite", SETTINGS, vector_enabled=False),
+        )
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_session_turns_oldest_first_and_matching_memories(self):
+        pack = self.packer.pack(
+            ContextPackRequest(project="demo", session_id="s1", query="cache", turns=3, max_chars=100000)
+        )
+        self.assertEqual([t["content"].split()[1] for t in pack["turns"]], ["4", "6", "8"])
+        self.assertEqual({t["session_id"] for t in pack["turns"]}, {"s1"})
+        self.assertEqual(
+            {m["summary"] for m in pack["memories"]}, {"cache keys include the scope", "cache entries expire"}
+        )
+        self.assertEqual(pack["dropped"], {"turns": 0, "memories": 0})
+        self.assertIn("## Recent turns", render_text(pack))
+
+    def test_budget_is_respected(self):
+        pack = self.packer.pack(ContextPackRequest(project="demo", session_id="s1", query="cache", max_chars=400))
+        self.assertLessEqual(pack["budget"]["used_chars"], 400)
+        text = sum(len(t["content"]) for t in pack["turns"]) + sum(
+            len((m["summary"] + "\n" + m.get("details", "")).strip()) for m in pack["memories"]
+        )
+        self.assertLessEqual(text, 400)
+        kept = len(pack["turns"]) + len(pack["memories"])
+        self.assertEqual(kept + pack["dropped"]["turns"] + pack["dropped"]["memories"], 7)
+        self.assertTrue(pack["dropped"]["turns"] + pack["dropped"]["memories"] > 0)
+
+    def test_unused_share_goes_to_the_other_side(self):
+        pack = self.packer.pack(
+            ContextPackRequest(project="demo", session_id="s1", turns=0, query="cache", max_chars=400, turn_share=0.9)
+        )
+        self.assertEqual(pack["turns"], [])
+        # 349 chars of memories fit only because the 360-char turn share went unused.
+        self.assertEqual(len(pack["memories"]), 2)
+        self.assertFalse(any(m.get("truncated") for m in pack["memories"]))
+        self.assertEqual(pack["budget"]["used_chars"], 349)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from support import SETTINGS, memory_db
+
+from core.dedup import Deduplicator, hamming, signature
+from core.records import build_memory_record
+from core.store import add_memory
+
+# Pairs that share almost every word but say opposite things.
+CONTRADICTIONS = [
+    ("Enable WAL mode for the cache database", "Do not enable WAL mode for the cache database"),
+    ("No retries on the upload path", "Retries on the upload path"),
+    ("Migrate the sqlite store to postgres before the release", "Migrate the postgres store to sqlite before the release"),
+    ("Copy production data into staging every night", "Copy staging data into production every night"),
+]
+
+
+def _memory(summary: str, tags: str = "") -> dict:
+    return build_memory_record(project="demo", summary=summary, created_at_epoch=1700000000, tags=tags)
+
+
+class DedupTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = memory_db()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _add_pair(self, first: str, second: str, settings: dict) -> tuple:
+        dedup = Deduplicator({**SETTINGS, **settings})
+        a = add_memory(self.conn, "sqlite", _memory(first, "a"), dedup=dedup)
+        b = add_memory(self.conn, "sqlite", _memory(second, "b"), dedup=dedup)
+        return a, b
+
+    def test_contradictions_are_far_apart(self):
+        for first, second in CONTRADICTIONS:
+            with self.subTest(first=first):
+                self.assertGreater(hamming(signature({"summary": first})[1], signature({"summary": second})[1]), 3)
+
+    def test_contradictions_never_merge(self):
+        for distance in ("0", "3"):
+            for first, second in CONTRADICTIONS:
+                with self.subTest(distance=distance, first=first):
+                    a, b = self._add_pair(first, second, {"CODEX_MEM_DEDUP_MAX_DISTANCE": distance})
+                    self.assertNotEqual(a, b)
+                    summaries = {r[0] for r in self.conn.execute("SELECT summary FROM memories WHERE id IN (?, ?)", (a, b))}
+                    self.assertEqual(summaries, {first, second})
+
+    def test_default_merges_exact_content_only(self):
+        a, b = self._add_pair("Cache the FTS query plan.", "cache the fts   query plan", {})
+        self.assertEqual(a, b)
+        row = self.conn.execute("SELECT tags FROM memories WHERE id = ?", (a,)).fetchone()
+        self.assertEqual(row[0], "a,b")
+        # A rewording is kept as its own memory unless near-duplicates are enabled.
+        c = add_memory(
+            self.conn, "sqlite", _memory("Cache the FTS query plans for search"), dedup=Deduplicator(SETTINGS)
+        )
+        self.assertNotEqual(c, a)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import hashlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import support  # noqa: F401  (puts scripts/ on sys.path)
+
+from core import embeddings
+
+PAYLOAD = b"not really a model archive" * 1000
+
+
+class ModelDownloadTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = Path(self.tmp.name) / "onnx.tar.gz"
+        patcher = mock.patch.object(embeddings.urllib.request, "urlopen", lambda *a, **k: io.BytesIO(PAYLOAD))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_mismatched_archive_is_discarded(self):
+        with self.assertRaisesRegex(RuntimeError, "SHA-256"):
+            embeddings._download_model(self.archive)
+        self.assertEqual(list(Path(self.tmp.name).iterdir()), [])
+
+    def test_matching_archive_is_kept(self):
+        with mock.patch.object(embeddings, "MODEL_SHA256", hashlib.sha256(PAYLOAD).hexdigest()):
+            embeddings._download_model(self.archive)
+        self.assertEqual(self.archive.read_bytes(), PAYLOAD)
+        self.assertEqual([p.name for p in Path(self.tmp.name).iterdir()], ["onnx.tar.gz"])
+
+
+if __name__ == "__main__":
+    unittest.main()
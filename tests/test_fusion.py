@@ -0,0 +1,47 @@
+import unittest
+
+import support  # noqa: F401  (puts scripts/ on sys.path)
+
+from core.fusion import fuse, rank_lexical, vector_scored
+
+
+def _lexical(*ids):
+    return rank_lexical([{"id": i} for i in ids])
+
+
+def _vector(*ids):
+    return vector_scored([{"id": i} for i in ids], {i: 0.1 * n for n, i in enumerate(ids, start=1)})
+
+
+def _ids(rows):
+    return [row["id"] for row in rows]
+
+
+class RrfTest(unittest.TestCase):
+    def test_rows_in_both_lists_rank_first(self):
+        fused = fuse(_lexical(1, 2, 3), _vector(3, 4, 1), limit=10, rrf_k=60)
+        self.assertEqual(_ids(fused), [1, 3, 2, 4])
+        self.assertAlmostEqual(fused[0]["scores"]["fused"], 1 / 61 + 1 / 63, places=6)
+        self.assertEqual(fused[0]["scores"]["lexical_rank"], 1)
+        self.assertEqual(fused[0]["scores"]["vector_rank"], 3)
+        self.assertEqual(fused[0]["scores"]["vector_distance"], 0.3)
+
+    def test_ties_keep_lexical_then_vector_order(self):
+        # Same rank in one list each: equal scores, lexical hits stay ahead.
+        fused = fuse(_lexical(1, 2), _vector(3, 4), limit=10)
+        self.assertEqual(_ids(fused), [1, 3, 2, 4])
+        self.assertEqual(fused[0]["scores"]["fused"], fused[1]["scores"]["fused"])
+        # Symmetric overlap ties too, and keeps first-seen order.
+        self.assertEqual(_ids(fuse(_lexical(5, 6), _vector(6, 5), limit=10)), [5, 6])
+
+    def test_missing_list_keeps_the_other_order(self):
+        self.assertEqual(_ids(fuse([], _vector(4, 2, 9), limit=10)), [4, 2, 9])
+        self.assertEqual(_ids(fuse(_lexical(7, 3), [], limit=10)), [7, 3])
+        self.assertEqual(fuse([], [], limit=10), [])
+
+    def test_limit(self):
+        self.assertEqual(_ids(fuse(_lexical(1, 2, 3), _vector(3, 2, 1), limit=2)), [1, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from support import SCRIPTS, memory_db
+
+GOOD_MEMORY = {"project": "demo", "summary": "keep the cache warm"}
+GOOD_TURN = {"project": "demo", "session_id": "s1", "role": "user", "content": "hello"}
+
+BAD_MEMORIES = [
+    ("{not json", "Expecting property name"),
+    ("[1, 2]", "line must be a JSON object"),
+    (json.dumps({"project": "demo", "summary": "  "}), "summary required"),
+    (json.dumps({"summary": "no project"}), "project required"),
+    (json.dumps({**GOOD_MEMORY, "created_at_epoch": [1]}), ""),
+]
+BAD_TURNS = [
+    (json.dumps({**GOOD_TURN, "role": "robot"}), "role must be one of"),
+    (json.dumps({**GOOD_TURN, "session_id": ""}), "session_id required"),
+    (json.dumps({**GOOD_TURN, "context": [1]}), "context"),
+]
+
+
+class IngestErrorTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Path(self.tmp.name) / "codex-mem.db"
+        memory_db(str(self.db)).close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _ingest(self, kind: str, lines, *args: str) -> subprocess.CompletedProcess:
+        path = Path(self.tmp.name) / "in.jsonl"
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        env = {
+            **os.environ,
+            "CODEX_MEM_DATA_DIR": self.tmp.name,
+            "CODEX_MEM_DATABASE_URL": f"sqlite:///{self.db}",
+            "CODEX_MEM_SERVER_ENABLED": "false",
+            "CODEX_MEM_VECTOR_ENABLED": "false",
+        }
+        return subprocess.run(
+            [sys.executable, str(SCRIPTS / "memory_ingest.py"), "--kind", kind, *args, str(path)],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+
+    def _count(self, table: str) -> int:
+        conn = memory_db(str(self.db))
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_bad_line_aborts_with_its_line_number(self):
+        for kind, good, bad_lines in (("memories", GOOD_MEMORY, BAD_MEMORIES), ("turns", GOOD_TURN, BAD_TURNS)):
+            for bad, message in bad_lines:
+                with self.subTest(kind=kind, line=bad):
+                    proc = self._ingest(kind, [json.dumps(good), "", bad])
+                    self.assertEqual(proc.returncode, 1)
+                    self.assertIn("in.jsonl:3: ", proc.stderr)
+                    self.assertIn(message, proc.stderr)
+                    self.assertNotIn("Traceback", proc.stderr)
+
+    def test_skip_invalid_reports_and_keeps_good_lines(self):
+        lines = [json.dumps(GOOD_MEMORY)] + [bad for bad, _ in BAD_MEMORIES] + [json.dumps({**GOOD_MEMORY, "summary": "b"})]
+        proc = self._ingest("memories", lines, "--skip-invalid")
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        report = json.loads(proc.stdout)
+        self.assertEqual((report["rows"], report["skipped"]), (2, len(BAD_MEMORIES)))
+        self.assertEqual(self._count("memories"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from support import SCRIPTS, SETTINGS, memory_db
+
+from core.conversation_search import ConversationSearchOrchestrator, ConversationSearchRequest
+from core.records import build_memory_record, build_turn_record
+from core.search import SearchOrchestrator, SearchRequest
+from core.store import add_memories, add_turns
+
+
+def _memories(count: int, start: int = 0):
+    # Three rows per second, so pages break inside runs of equal timestamps.
+    return [
+        build_memory_record(project="demo", summary=f"{('cache', 'index')[i % 2]} note {i}", created_at_epoch=1700000000 + i // 3)
+        for i in range(start, start + count)
+    ]
+
+
+class KeysetPaginationTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Path(self.tmp.name) / "codex-mem.db"
+        self.conn = memory_db(str(self.db))
+        add_memories(self.conn, "sqlite", _memories(50))
+        self.memories = SearchOrchestrator(self.conn, "sqlite", SETTINGS, vector_enabled=False)
+        self.expected = [
+            row[0]
+            for row in self.conn.execute("SELECT id FROM memories ORDER BY created_at_epoch DESC, id DESC")
+        ]
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def _pages(self, query=None, limit=7, after_first=None):
+        ids, cursor, pages = [], None, 0
+        while True:
+            req = SearchRequest(project="demo", query=query, limit=limit, strategy="auto", cursor=cursor, paginate=True)
+            result = self.memories.search(req)
+            ids += [row["id"] for row in result["rows"]]
+            pages += 1
+            if pages == 1 and after_first:
+                after_first()
+            cursor = result.get("next_cursor")
+            if not cursor:
+                return ids, pages
+
+    def test_pages_have_no_gaps_or_duplicates(self):
+        ids, pages = self._pages()
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(pages, 8)
+
+    def test_query_pages_follow_the_filtered_order(self):
+        ids, _ = self._pages(query="cache", limit=4)
+        rows = self.conn.execute(
+            "SELECT id FROM memories WHERE summary LIKE 'cache %' ORDER BY created_at_epoch DESC, id DESC"
+        )
+        self.assertEqual(ids, [row[0] for row in rows])
+        self.assertEqual(len(ids), 25)
+
+    def test_rows_written_while_paging_do_not_shift_pages(self):
+        ids, _ = self._pages(after_first=lambda: add_memories(self.conn, "sqlite", _memories(5, start=1000)))
+        self.assertEqual(ids, self.expected)
+
+    def test_stream_matches_pages(self):
+        req = SearchRequest(project="demo", query=None, limit=0, strategy="sqlite")
+        self.assertEqual([row["id"] for row in self.memories.stream(req, page_size=6)], self.expected)
+        capped = SearchRequest(project="demo", query=None, limit=20, strategy="sqlite")
+        self.assertEqual([row["id"] for row in self.memories.stream(capped, page_size=6)], self.expected[:20])
+
+    def test_turn_stream_matches_pages(self):
+        add_turns(
+            self.conn,
+            "sqlite",
+            [
+                build_turn_record(
+                    project="demo", session_id="s1", role="user", content=f"turn {i}", created_at_epoch=1700000000 + i // 4
+                )
+                for i in range(30)
+            ],
+        )
+        turns = ConversationSearchOrchestrator(self.conn, "sqlite", SETTINGS, vector_enabled=False)
+        ids, cursor = [], None
+        while True:
+            req = ConversationSearchRequest(project="demo", query=None, limit=8, strategy="sqlite", cursor=cursor)
+            result = turns.search(req)
+            ids += [row["id"] for row in result["rows"]]
+            cursor = result.get("next_cursor")
+            if not cursor:
+                break
+        self.assertEqual(len(ids), 30)
+        self.assertEqual(len(set(ids)), 30)
+        req = ConversationSearchRequest(project="demo", query=None, limit=0, strategy="sqlite")
+        self.assertEqual([row["id"] for row in turns.stream(req, page_size=7)], ids)
+
+    def test_cli_stream_writes_ndjson(self):
+        env = {
+            **os.environ,
+            "CODEX_MEM_DATA_DIR": self.tmp.name,
+            "CODEX_MEM_DATABASE_URL": f"sqlite:///{self.db}",
+            "CODEX_MEM_SERVER_ENABLED": "false",
+            "CODEX_MEM_VECTOR_ENABLED": "false",
+        }
+        out = subprocess.run(
+            [sys.executable, str(SCRIPTS / "memory_search.py"), "--project", "demo", "--stream"],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        rows = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual([row["id"] for row in rows], self.expected)
+        self.assertEqual(rows[0]["summary"], "index note 49")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+"""PostgreSQL integration tests; set CODEX_MEM_TEST_POSTGRES_URL to run them.
+
+Each test works in a throwaway schema of that database. The pgvector and pg_trgm
+cases skip when the extension cannot be created there.
+"""
+
+import hashlib
+import os
+import threading
+import unittest
+import uuid
+
+from support import SETTINGS
+
+from core.pgvector_sync import DEFAULT_VECTOR_DIM, PgVectorSync
+from core.postgres import BufferedResult, PooledConnection, connect_kwargs, open_pool
+from core.records import build_memory_record
+from core.search import SearchOrchestrator, SearchRequest
+from core.store import add_memories
+from memory_init import ensure_postgres_migrations
+
+DSN = os.getenv("CODEX_MEM_TEST_POSTGRES_URL", "")
+
+try:
+    import psycopg  # type: ignore
+    from psycopg.conninfo import make_conninfo  # type: ignore
+except Exception:  # pragma: no cover - depends on the environment
+    psycopg = None
+
+NO_PREPARE = {**SETTINGS, "CODEX_MEM_PG_PREPARE": "false"}
+
+
+class HashEmbedder:
+    """Bag-of-words vectors, so texts sharing words are close without a model."""
+
+    available = True
+    error = None
+
+    def embed(self, texts):
+        out = []
+        for text in texts:
+            vector = [0.0] * DEFAULT_VECTOR_DIM
+            for word in text.lower().split():
+                vector[int(hashlib.sha1(word.encode()).hexdigest(), 16) % DEFAULT_VECTOR_DIM] += 1.0
+            norm = sum(x * x for x in vector) ** 0.5 or 1.0
+            out.append([x / norm for x in vector])
+        return out
+
+
+@unittest.skipUnless(DSN and psycopg is not None, "set CODEX_MEM_TEST_POSTGRES_URL (and install psycopg)")
+class PostgresTest(unittest.TestCase):
+    def setUp(self):
+        self.schema = f"codex_mem_test_{uuid.uuid4().hex[:12]}"
+        admin = psycopg.connect(DSN, autocommit=True)
+        admin.execute(f"CREATE SCHEMA {self.schema}")
+        admin.close()
+        # public stays on the path so extensions installed there resolve.
+        self.dsn = make_conninfo(DSN, options=f"-c search_path={self.schema},public")
+        self.conn = psycopg.connect(self.dsn, **connect_kwargs(NO_PREPARE, autocommit=True))
+
+    def tearDown(self):
+        self.conn.close()
+        admin = psycopg.connect(DSN, autocommit=True)
+        admin.execute(f"DROP SCHEMA {self.schema} CASCADE")
+        admin.close()
+
+    def _memories(self, conn, vectors=None, count=20):
+        words = ["cache", "query", "plan", "vector", "index"]
+        return add_memories(
+            conn,
+            "postgres",
+            [
+                build_memory_record(
+                    project="demo",
+                    summary=f"{words[i % 5]} {words[(i + 1) % 5]} note {i}",
+                    files_read=f"src/{words[i % 5]}.py",
+                    created_at_epoch=1700000000 + i,
+                )
+                for i in range(count)
+            ],
+            vectors,
+        )
+
+    def _search(self, conn, vectors=None, **fields):
+        orchestrator = SearchOrchestrator(conn, "postgres", NO_PREPARE, vector_enabled=vectors is not None, vectors=vectors)
+        return orchestrator.search(SearchRequest(project="demo", limit=5, **fields))
+
+    def test_tsvector_migration_backfills_existing_rows(self):
+        ensure_postgres_migrations(self.conn)
+        self.conn.execute("ALTER TABLE memories DROP COLUMN search_tsv")
+        ids = self._memories(self.conn)
+        ensure_postgres_migrations(self.conn)
+        indexes = {r[0] for r in self.conn.execute("SELECT indexname FROM pg_indexes WHERE schemaname = %s", (self.schema,))}
+        self.assertIn("memories_search_tsv_idx", indexes)
+        result = self._search(self.conn, query="vector", strategy="sqlite")
+        self.assertTrue(result["rows"])
+        self.assertTrue(set(r["id"] for r in result["rows"]) <= set(ids))
+        self.assertTrue(all("vector" in r["summary"] for r in result["rows"]))
+
+    def test_trigram_index_serves_file_filter(self):
+        ensure_postgres_migrations(self.conn)
+        has_trgm = self.conn.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'").fetchone()
+        if not has_trgm:
+            self.skipTest("pg_trgm is not available")
+        self._memories(self.conn)
+        indexes = {r[0] for r in self.conn.execute("SELECT indexname FROM pg_indexes WHERE schemaname = %s", (self.schema,))}
+        self.assertIn("memory_files_path_trgm_idx", indexes)
+        rows = self._search(self.conn, query=None, strategy="sqlite", file_filter="cache.py")["rows"]
+        self.assertEqual(len(rows), 4)
+
+    def test_pgvector_hybrid_search(self):
+        settings = {**NO_PREPARE, "CODEX_MEM_VECTOR_PROVIDER": "pgvector"}
+        try:
+            ensure_postgres_migrations(self.conn, settings)
+        except psycopg.Error as exc:
+            self.skipTest(f"pgvector is not available: {exc}")
+        vectors = PgVectorSync(settings, self.conn)
+        vectors.embedder = HashEmbedder()
+        vectors._ready = vectors._has_embedding_columns()
+        self.assertTrue(vectors.available, vectors.error)
+        ids = self._memories(self.conn, vectors)
+        embedded = self.conn.execute("SELECT COUNT(*) FROM memories WHERE embedding IS NOT NULL").fetchone()[0]
+        self.assertEqual(embedded, len(ids))
+
+        result = self._search(self.conn, vectors, query="vector index", strategy="hybrid")
+        self.assertEqual(result["strategy"], "hybrid")
+        self.assertFalse(result["fell_back"])
+        top = result["rows"][0]
+        self.assertIn("vector", top["summary"])
+        self.assertIn("vector_rank", top["scores"])
+
+        vectors.delete_memories(ids)
+        left = self.conn.execute("SELECT COUNT(*) FROM memories WHERE embedding IS NOT NULL").fetchone()[0]
+        self.assertEqual(left, 0)
+
+    def test_pooled_connection(self):
+        try:
+            pool = open_pool(self.dsn, {**NO_PREPARE, "CODEX_MEM_PG_POOL_MIN_SIZE": "1", "CODEX_MEM_PG_POOL_MAX_SIZE": "1"})
+        except SystemExit as exc:
+            self.skipTest(str(exc))
+        pooled = PooledConnection(pool)
+        try:
+            ensure_postgres_migrations(pooled)
+            self._memories(pooled)
+            first = pooled.execute("SELECT g FROM generate_series(1, 50) AS g")
+            self.assertIsInstance(first, BufferedResult)
+            # The only pooled connection is free again; another thread's statement must
+            # not disturb the rows already returned.
+            other = threading.Thread(target=lambda: pooled.execute("SELECT g FROM generate_series(100, 200) AS g"))
+            other.start()
+            other.join()
+            self.assertEqual(first.fetchone(), (1,))
+            self.assertEqual([r[0] for r in first.fetchall()], list(range(2, 51)))
+
+            with pooled.transaction():
+                self.assertNotIsInstance(pooled.execute("SELECT 1"), BufferedResult)
+            # Same query shape many times, past the prepare threshold, with prepares off.
+            for _ in range(8):
+                self.assertEqual(len(self._search(pooled, query="cache", strategy="sqlite")["rows"]), 5)
+        finally:
+            pooled.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from support import SETTINGS, memory_db
+
+from core.query_cache import FLUSH_EVERY, QueryCache
+from core.records import build_memory_record
+from core.search import SearchOrchestrator, SearchRequest
+from core.store import add_memory
+
+
+class _Unavailable:
+    available = False
+
+
+class QueryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings = {**SETTINGS, "CODEX_MEM_DATA_DIR": self.tmp.name, "CODEX_MEM_QUERY_CACHE_ENABLED": "true"}
+        self.cache = QueryCache(self.settings, "test")
+        self.conn = memory_db()
+        add_memory(
+            self.conn,
+            "sqlite",
+            build_memory_record(project="demo", summary="warm the query cache", created_at_epoch=1700000000),
+        )
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def _stored_stats(self) -> dict:
+        with sqlite3.connect(str(Path(self.tmp.name) / "query-cache.sqlite3")) as conn:
+            return dict(conn.execute("SELECT name, value FROM stats").fetchall())
+
+    def test_fallback_is_cached_when_provider_is_unavailable(self):
+        orchestrator = SearchOrchestrator(
+            self.conn, "sqlite", self.settings, vector_enabled=True, vectors=_Unavailable(), cache=self.cache
+        )
+        req = SearchRequest(project="demo", query="query cache", limit=5, strategy="auto")
+        first = orchestrator.search(req)
+        self.assertTrue(first["fell_back"])
+        self.assertEqual(first["cache"], "miss")
+        second = orchestrator.search(req)
+        self.assertEqual(second["cache"], "hit")
+        self.assertEqual([r["id"] for r in second["rows"]], [r["id"] for r in first["rows"]])
+
+    def test_lookups_do_not_write_until_flushed(self):
+        key = self.cache.key("memory", SearchRequest(project="demo", query="x", limit=5, strategy="sqlite"))
+        _, generation = self.cache.get(key, "demo")
+        self.cache.put(key, "demo", generation, {"rows": []})
+        self.assertEqual(self._stored_stats(), {"misses": 1})
+        for _ in range(FLUSH_EVERY - 1):
+            self.cache.get(key, "demo")
+        self.assertEqual(self._stored_stats(), {"misses": 1})
+        self.cache.get(key, "demo")
+        self.assertEqual(self._stored_stats(), {"misses": 1, "hits": FLUSH_EVERY})
+        self.cache.get(key, "demo")
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (FLUSH_EVERY + 1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
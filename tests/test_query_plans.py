@@ -0,0 +1,61 @@
+import unittest
+
+from support import memory_db
+
+from core.query_plans import check_search_plans, search_shapes
+from core.records import build_memory_record, build_turn_record
+from core.store import add_memories, add_turns
+
+
+class SearchPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = memory_db()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _fill(self) -> None:
+        memories, turns = [], []
+        for i in range(400):
+            project = f"p{i % 4}"
+            memories.append(
+                build_memory_record(
+                    project=project,
+                    summary=f"cache note {i}",
+                    created_at_epoch=1700000000 + i,
+                    memory_type=("bugfix", "discovery")[i % 2],
+                    tags=("api", "db")[i % 2],
+                )
+            )
+            turns.append(
+                build_turn_record(
+                    project=project,
+                    session_id=f"session-{i % 10}",
+                    role=("user", "assistant")[i % 2],
+                    content=f"turn {i}",
+                    created_at_epoch=1700000000 + i,
+                )
+            )
+        add_memories(self.conn, "sqlite", memories)
+        add_turns(self.conn, "sqlite", turns)
+        self.conn.execute("ANALYZE")
+
+    def assert_indexed(self) -> None:
+        results = check_search_plans(self.conn, "p1", "session-1", 1700000100)
+        self.assertEqual([r["shape"] for r in results], [name for name, _ in search_shapes("p1", "s", 0)])
+        for result in results:
+            with self.subTest(shape=result["shape"]):
+                self.assertTrue(result["plan"])
+                self.assertFalse(result["sorts"], result["plan"])
+                self.assertFalse([step for step in result["plan"] if step.startswith("SCAN")], result["plan"])
+
+    def test_empty_database(self):
+        self.assert_indexed()
+
+    def test_analyzed_database(self):
+        self._fill()
+        self.assert_indexed()
+
+
+if __name__ == "__main__":
+    unittest.main()
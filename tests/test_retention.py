@@ -0,0 +1,63 @@
+import unittest
+
+from support import SETTINGS, memory_db
+
+from core.records import build_turn_record
+from core.retention import Retention, RetentionPolicy
+from core.store import add_turns
+
+
+class RetentionTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = memory_db()
+        add_turns(
+            self.conn,
+            "sqlite",
+            [
+                build_turn_record(
+                    project="demo",
+                    session_id=f"s{i % 3}",
+                    role=("user", "assistant")[i % 2],
+                    content=f"turn {i} é ✓",
+                    created_at_epoch=1700000000 + i,
+                    context={"step": i},
+                    meta={"source": "test"},
+                )
+                for i in range(20)
+            ],
+        )
+        self.retention = Retention(self.conn, "sqlite", SETTINGS)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _turns(self):
+        return [tuple(row) for row in self.conn.execute("SELECT * FROM conversation_turns ORDER BY id")]
+
+    def test_archive_then_restore_returns_the_same_rows(self):
+        before = self._turns()
+        stats = self.retention.apply("demo", RetentionPolicy(max_turns_per_session=2), batch_size=4)
+        self.assertEqual((stats["expired"], stats["archived"], stats["batches"]), (14, 14, 4))
+        self.assertEqual(len(self._turns()), 6)
+        archived = list(self.retention.archived_turns("demo"))
+        self.assertEqual(len(archived), 14)
+        self.assertEqual(len({row["id"] for row in archived}), 14)
+
+        self.assertEqual(self.retention.restore("demo"), 14)
+        self.assertEqual(self._turns(), before)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM conversation_turns_archive").fetchone()[0], 0)
+        # Nothing is left to restore a second time.
+        self.assertEqual(self.retention.restore("demo"), 0)
+
+    def test_keep_last_and_dry_run(self):
+        policy = RetentionPolicy(max_turns_per_session=2, keep_last=10)
+        stats = self.retention.apply("demo", policy, dry_run=True)
+        self.assertEqual(stats["expired"], 10)
+        self.assertEqual(len(self._turns()), 20)
+        self.retention.apply("demo", policy)
+        kept = [row[0] for row in self.conn.execute("SELECT id FROM conversation_turns ORDER BY id")]
+        self.assertEqual(kept[-10:], list(range(11, 21)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+from typing import Dict, List
+from unittest import mock
+
+from support import SETTINGS, memory_db
+
+from core import search
+from core.records import build_memory_record
+from core.search import SearchOrchestrator, SearchRequest
+from core.store import add_memories
+from core.vector_index import MEMORY_KIND, VectorIndex
+
+_OPS = {"=": lambda a, b: a == b, ">=": lambda a, b: a >= b, "<=": lambda a, b: a <= b}
+
+
+class WordOverlapIndex(VectorIndex):
+    """Deterministic stand-in for an embedding index: distance falls with shared words."""
+
+    def __init__(self):
+        super().__init__({})
+        self.records: Dict[str, list] = {MEMORY_KIND: []}
+        self.batches = 0
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def _upsert(self, kind, records):
+        self.records.setdefault(kind, []).extend(records)
+
+    def _delete(self, kind, row_ids):
+        pass
+
+    def _nearest_many(self, kind, queries, limit, where):
+        self.batches += 1
+        return super()._nearest_many(kind, queries, limit, where)
+
+    def _nearest(self, kind, query, limit, where):
+        words = set(query.lower().split())
+        scored = []
+        for _, document, metadata in self.records.get(kind, []):
+            if all(key in metadata and _OPS[op](metadata[key], value) for key, op, value in where):
+                overlap = len(words & set(document.lower().split()))
+                if overlap:
+                    scored.append((1.0 - overlap / len(words), metadata["sqlite_id"], metadata))
+        scored.sort(key=lambda item: (item[0], item[1]))
+        scored = scored[:limit]
+        return {
+            "ids": [s[1] for s in scored],
+            "distances": [s[0] for s in scored],
+            "metadatas": [s[2] for s in scored],
+        }
+
+
+QUERIES = ["cache", "query plan", "sqlite cache warm", "nothing matches this", "Cache"]
+
+
+def _comparable(result) -> List[tuple]:
+    return [(row["id"], row.get("scores")) for row in result["rows"]]
+
+
+class SearchManyTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = memory_db()
+        self.vectors = WordOverlapIndex()
+        words = ["cache", "query", "plan", "sqlite", "warm", "index"]
+        add_memories(
+            self.conn,
+            "sqlite",
+            [
+                build_memory_record(
+                    project="demo" if i % 5 else "other",
+                    summary=" ".join(words[j % len(words)] for j in range(i, i + 1 + i % 3)) + f" n{i}",
+                    memory_type=("bugfix", "discovery")[i % 2],
+                    created_at_epoch=1700000000 + i,
+                )
+                for i in range(60)
+            ],
+            vectors=self.vectors,
+        )
+        self.orchestrator = SearchOrchestrator(self.conn, "sqlite", SETTINGS, vector_enabled=True, vectors=self.vectors)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _check(self, **fields):
+        req = SearchRequest(project="demo", query=None, limit=5, **fields)
+        batch = self.orchestrator.search_many(req, QUERIES)
+        self.assertEqual(len(batch), len(QUERIES))
+        for query, result in zip(QUERIES, batch):
+            with self.subTest(query=query, **fields):
+                single = self.orchestrator.search(SearchRequest(project="demo", query=query, limit=5, **fields))
+                self.assertEqual(_comparable(result), _comparable(single))
+                self.assertEqual(result["strategy"], single["strategy"])
+
+    def test_matches_single_searches(self):
+        for strategy in ("sqlite", "auto", "chroma", "hybrid"):
+            self._check(strategy=strategy)
+            self._check(strategy=strategy, type_filter="bugfix")
+
+    def test_one_vector_query_per_batch(self):
+        for strategy in ("chroma", "hybrid"):
+            self.vectors.batches = 0
+            req = SearchRequest(project="demo", query=None, limit=5, strategy=strategy)
+            self.orchestrator.search_many(req, QUERIES)
+            self.assertEqual(self.vectors.batches, 1, strategy)
+
+    def test_hydrates_in_chunks(self):
+        with mock.patch.object(search, "HYDRATE_CHUNK", 3):
+            self._check(strategy="hybrid")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from core.dedup import Deduplicator  # noqa: E402
+from core.records import build_memory_record, build_turn_record  # noqa: E402
+from core.search import SearchOrchestrator, SearchRequest  # noqa: E402
+from core.store import add_memories, add_memory, add_turn  # noqa: E402
+from memory_init import ensure_sqlite_migrations  # noqa: E402
+
+# db/schema_sqlite.sql before FTS, facet and signature tables existed.
+BASELINE_SCHEMA = """
+CREATE TABLE memories (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  created_at_epoch INTEGER NOT NULL DEFAULT (CAST(strftime('%s','now') AS INTEGER)),
+  project TEXT NOT NULL,
+  type TEXT NOT NULL DEFAULT 'discovery',
+  tags TEXT NOT NULL DEFAULT '',
+  summary TEXT NOT NULL,
+  details TEXT NOT NULL DEFAULT '',
+  concepts TEXT NOT NULL DEFAULT '[]',
+  files_read TEXT NOT NULL DEFAULT '[]',
+  files_modified TEXT NOT NULL DEFAULT '[]',
+  metadata_json TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX memories_project_idx ON memories(project);
+CREATE INDEX memories_created_at_idx ON memories(created_at);
+CREATE INDEX memories_created_at_epoch_idx ON memories(created_at_epoch);
+CREATE INDEX memories_type_idx ON memories(type);
+
+CREATE TABLE conversation_turns (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  created_at_epoch INTEGER NOT NULL DEFAULT (CAST(strftime('%s','now') AS INTEGER)),
+  project TEXT NOT NULL,
+  session_id TEXT NOT NULL,
+  role TEXT NOT NULL,
+  content TEXT NOT NULL,
+  context_json TEXT NOT NULL DEFAULT '{}',
+  metadata_json TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX conversation_turns_project_idx ON conversation_turns(project);
+CREATE INDEX conversation_turns_session_idx ON conversation_turns(session_id);
+CREATE INDEX conversation_turns_created_at_epoch_idx ON conversation_turns(created_at_epoch);
+CREATE INDEX conversation_turns_role_idx ON conversation_turns(role);
+"""
+
+SETTINGS = {"CODEX_MEM_FTS_ENABLED": "true", "CODEX_MEM_DEDUP_MAX_DISTANCE": "3"}
+
+
+def _memory(summary: str, epoch: int, concepts: str = "cache,sqlite"):
+    return build_memory_record(
+        project="demo",
+        summary=summary,
+        created_at_epoch=epoch,
+        tags="perf",
+        concepts=concepts,
+        files_read="src/cache.py",
+    )
+
+
+class UpgradeFromBaselineTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(BASELINE_SCHEMA)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _search(self, **filters):
+        orchestrator = SearchOrchestrator(self.conn, "sqlite", SETTINGS, vector_enabled=False)
+        req = SearchRequest(project="demo", query=None, limit=10, strategy="sqlite", **filters)
+        return [row["id"] for row in orchestrator.search(req)["rows"]]
+
+    def test_writes_before_migrating(self):
+        dedup = Deduplicator(SETTINGS)
+        first = add_memory(self.conn, "sqlite", _memory("warm the query cache", 1700000000), dedup=dedup)
+        ids = add_memories(
+            self.conn,
+            "sqlite",
+            [_memory("index the turns table", 1700000060), _memory("index the turns table", 1700000120)],
+            dedup=dedup,
+        )
+        add_turn(
+            self.conn,
+            "sqlite",
+            build_turn_record(
+                project="demo", session_id="s1", role="user", content="why is search slow", created_at_epoch=1700000000
+            ),
+        )
+        # Without memory_signatures, duplicates are still folded within a batch.
+        self.assertEqual(ids[0], ids[1])
+        self.assertEqual(dedup.merged, 1)
+        self.assertEqual(set(self._search(concept_filter="cache")), {first, ids[0]})
+
+    def test_migration_backfills_rows_written_before_it(self):
+        dedup = Deduplicator(SETTINGS)
+        first = add_memory(self.conn, "sqlite", _memory("warm the query cache", 1700000000), dedup=dedup)
+        with self.conn:
+            ensure_sqlite_migrations(self.conn)
+
+        self.assertEqual(self._search(concept_filter="cache"), [first])
+        self.assertEqual(self._search(file_filter="src/cache.py"), [first])
+        # The backfilled signature lets a later duplicate merge into the stored row.
+        again = add_memory(self.conn, "sqlite", _memory("warm the query cache", 1700000060), dedup=dedup)
+        self.assertEqual(again, first)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()